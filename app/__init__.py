@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from flask import Flask
+from flask import Flask, flash, redirect, request
 from sqlalchemy.exc import OperationalError
 
 from .config import get_config
@@ -18,6 +18,7 @@ def create_app(config_name: str | None = None) -> Flask:
     register_blueprints(app)
     register_shellcontext(app)
     register_template_filters(app)
+    register_error_handlers(app)
     seed_default_groups(app)
 
     return app
@@ -43,11 +44,29 @@ def register_blueprints(app: Flask) -> None:
 def register_template_filters(app: Flask) -> None:
     """Register custom Jinja2 template filters."""
     from .utils.currency import get_currency_symbol
+    from .utils.upload import build_srcset
     
     @app.template_filter('currency_symbol')
     def currency_symbol_filter(currency_code):
         """Convert currency code to symbol (e.g., BRL -> R$)"""
         return get_currency_symbol(currency_code)
+    
+    @app.template_filter('srcset')
+    def srcset_filter(image_variants, image_format='webp'):
+        """Build a srcset attribute from Product.image_variants"""
+        return build_srcset(image_variants, image_format)
+
+
+def register_error_handlers(app: Flask) -> None:
+    @app.errorhandler(413)
+    def request_too_large(error):
+        """Body above MAX_CONTENT_LENGTH, refused before it was read"""
+        max_mb = app.config["MAX_CONTENT_LENGTH"] / (1024 * 1024)
+        message = f"Arquivo muito grande. Tamanho máximo da requisição: {max_mb:.1f}MB"
+        if request.path.startswith("/api/"):
+            return {"message": message}, 413
+        flash(message, "warning")
+        return redirect(request.referrer or request.url)
 
 
 def register_shellcontext(app: Flask) -> None:
@@ -0,0 +1,515 @@
+"""
+Caption engine for sharing offers on social networks
+
+Templates are parsed once into a compiled token list (literal text and
+placeholders) and rendered in a single pass. Compiled templates are cached per
+``(template, updated_at)`` so editing a template invalidates its entry.
+
+Placeholders are case-insensitive and accept Portuguese aliases, e.g.
+``{price}``/``{valor}`` or ``{all_coupons}``/``{cupons}``. Unknown placeholders
+are kept as-is in the output.
+"""
+
+from __future__ import annotations
+
+import html
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+
+from .models import (
+    Coupon,
+    Offer,
+    SocialNetworkConfig,
+    Template,
+    TemplateSocialNetwork,
+    User,
+)
+from .utils.currency import get_currency_symbol
+
+
+# Canonical placeholder name -> accepted aliases
+PLACEHOLDER_ALIASES = {
+    # Offer
+    'product_name': ('product',),
+    'product_description': ('description', 'descricao'),
+    'price': ('valor',),
+    'old_price': ('preco_antigo',),
+    'discount': ('desconto',),
+    'vendor_name': ('vendor', 'loja'),
+    'seller': (),
+    'seller_name': (),
+    'offer_url': ('url', 'link'),
+    'category': (),
+    'manufacturer': (),
+    # Installments
+    'installment_count': (),
+    'installment_value': (),
+    'installment_interest_free': (),
+    'installment_full': ('parcelamento',),
+    # Coupons
+    'price_with_coupon': ('preco_com_cupom',),
+    'all_coupons': ('todos_cupons', 'cupons'),
+    'coupon_code': ('code',),
+    'coupon_seller': (),
+    'coupon_discount_type': ('tipo_desconto',),
+    'coupon_discount_value': ('valor_desconto',),
+    'porcentagem': ('desconto_porcentagem', 'percentual'),
+    'desconto_fixo': ('valor_fixo',),
+    'min_purchase_value': ('compra_minima', 'valor_minimo', 'valor_minimo_compra', 'minimo'),
+    'max_discount_value': (
+        'limite_desconto', 'coupon_max_discount', 'limite', 'valor_maximo_desconto', 'maximo',
+    ),
+    'coupon_expires': ('validade_cupom', 'expira_em'),
+    # User (global)
+    'user_phone': ('telefone', 'celular'),
+    'user_address': ('endereco',),
+    'user_website': ('site',),
+    'user_instagram': ('instagram',),
+    'user_facebook': ('facebook',),
+    'user_twitter': ('twitter',),
+    'user_linkedin': ('linkedin',),
+    'user_youtube': ('youtube',),
+    'user_tiktok': ('tiktok',),
+}
+
+# Any accepted name (lowercase) -> canonical name
+CANONICAL_NAMES = {
+    alias: name
+    for name, aliases in PLACEHOLDER_ALIASES.items()
+    for alias in (name, *aliases)
+}
+
+PLACEHOLDER_RE = re.compile(r'\{([A-Za-z_]+)\}')
+
+# Maximum number of compiled templates kept in memory
+COMPILED_CACHE_SIZE = 512
+
+# Maximum offers x networks rendered by a single batch request
+MAX_BATCH_CAPTIONS = 5000
+
+
+# ============================================================================
+# COMPILED TEMPLATES
+# ============================================================================
+
+class CompiledTemplate:
+    """Template body parsed into literal text and placeholder tokens"""
+
+    __slots__ = ('tokens', 'fields')
+
+    def __init__(self, body: str):
+        # Bodies may carry HTML entities from the editor (e.g. &amp;)
+        parts = PLACEHOLDER_RE.split(html.unescape(body or ''))
+
+        # re.split with one group alternates literal / placeholder name
+        tokens: list[str] = []
+        literal = parts[0]
+        for index in range(1, len(parts), 2):
+            name = CANONICAL_NAMES.get(parts[index].lower())
+            if name is None:
+                literal += '{' + parts[index] + '}' + parts[index + 1]
+                continue
+            tokens.extend((literal, name))
+            literal = parts[index + 1]
+        tokens.append(literal)
+
+        self.tokens = tuple(tokens)
+        self.fields = frozenset(self.tokens[1::2])
+
+    def render(self, values: dict) -> str:
+        """Render in a single pass; missing values render as empty strings"""
+        tokens = self.tokens
+        chunks = [tokens[0]]
+        for index in range(1, len(tokens), 2):
+            chunks.append(values.get(tokens[index], ''))
+            chunks.append(tokens[index + 1])
+        return ''.join(chunks)
+
+
+_compiled_cache: OrderedDict = OrderedDict()
+_compiled_cache_lock = threading.Lock()
+
+
+def compile_template(source: Template | TemplateSocialNetwork) -> CompiledTemplate:
+    """
+    Get the compiled form of a template or of a per-network custom template
+
+    The compiled form is cached per (table, id, updated_at).
+    """
+    body = source.custom_body if isinstance(source, TemplateSocialNetwork) else source.body
+    if source.id is None:
+        return CompiledTemplate(body)
+
+    key = (source.__tablename__, source.id, source.updated_at)
+    with _compiled_cache_lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is not None:
+            _compiled_cache.move_to_end(key)
+            return compiled
+
+    compiled = CompiledTemplate(body)
+    with _compiled_cache_lock:
+        _compiled_cache[key] = compiled
+        while len(_compiled_cache) > COMPILED_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+# ============================================================================
+# HTML -> NETWORK FORMATTED TEXT
+# ============================================================================
+
+VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'wbr'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+PLAIN_TEXT_NETWORKS = {'instagram', 'facebook', 'twitter', 'x', 'tiktok'}
+HORIZONTAL_RULE = '\n━━━━━━━━━━━━━━━━━━\n\n'
+
+# Inline formatting per network: tag -> format string
+INLINE_FORMATS = {
+    'whatsapp': {
+        'strong': '*{}*', 'b': '*{}*', 'u': '*{}*',
+        'em': '_{}_', 'i': '_{}_',
+        's': '~{}~', 'strike': '~{}~', 'del': '~{}~',
+        'code': '```{}```', 'pre': '```{}```',
+    },
+    'telegram': {
+        'strong': '**{}**', 'b': '**{}**',
+        'em': '__{}__', 'i': '__{}__', 'u': '__{}__',
+        's': '~~{}~~', 'strike': '~~{}~~', 'del': '~~{}~~',
+        'code': '`{}`', 'pre': '```\n{}\n```',
+    },
+}
+
+HEADING_FORMATS = {'whatsapp': '*{}*\n\n', 'telegram': '**{}**\n\n'}
+BLOCKQUOTE_FORMATS = {'whatsapp': '❝ {} ❞\n\n', 'telegram': '> {}\n\n'}
+LINK_FORMATS = {'telegram': '[{0}]({1})', 'linkedin': '{0}: {1}'}
+
+
+class _HTMLTreeBuilder(HTMLParser):
+    """Builds a minimal (tag, attrs, children) tree from editor HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = ('', {}, [])
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = (tag, dict(attrs), [])
+        self.stack[-1][2].append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1][2].append((tag, dict(attrs), []))
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth][0] == tag:
+                del self.stack[depth:]
+                break
+
+    def handle_data(self, data):
+        self.stack[-1][2].append(data)
+
+
+def _format_node(node, network: str) -> str:
+    if isinstance(node, str):
+        return node
+
+    tag, attrs, children = node
+    content = ''.join(_format_node(child, network) for child in children)
+    structured = network in INLINE_FORMATS or network == 'linkedin' or network in PLAIN_TEXT_NETWORKS
+
+    if tag == 'br':
+        return '\n'
+    if tag == 'p':
+        return content + '\n\n'
+    if tag in ('ul', 'ol'):
+        return '\n' + content
+    if tag == 'li':
+        return f'• {content}\n'
+    if not structured:
+        return content
+
+    inline = INLINE_FORMATS.get(network, {})
+    if tag in inline:
+        return inline[tag].format(content)
+    if tag in HEADING_TAGS:
+        return HEADING_FORMATS.get(network, '{}\n\n').format(content.upper())
+    if tag == 'blockquote':
+        return BLOCKQUOTE_FORMATS.get(network, '"{}"\n\n').format(content.strip())
+    if tag == 'a':
+        href = attrs.get('href')
+        return LINK_FORMATS.get(network, '{0} ({1})').format(content, href) if href else content
+    if tag == 'hr':
+        return HORIZONTAL_RULE
+    return content
+
+
+def html_to_formatted_text(value: Optional[str], network: str) -> str:
+    """
+    Convert editor HTML to text formatted for a social network
+
+    WhatsApp and Telegram get their markdown-like syntax, LinkedIn and the
+    plain-text networks keep only structure (lists, headings, links).
+    """
+    if not value:
+        return ''
+
+    builder = _HTMLTreeBuilder()
+    builder.feed(value)
+    builder.close()
+
+    text = _format_node(builder.root, (network or '').lower())
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r'  +', ' ', text)
+    return text.strip()
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def _money(value) -> str:
+    return f"{float(value):.2f}" if value else ''
+
+
+def _number(value) -> str:
+    return f"{float(value):g}"
+
+
+def build_caption_values(
+    offer: Offer,
+    network: str,
+    coupons: Iterable[Coupon] = (),
+    user: Optional[User] = None,
+    fields: Optional[frozenset] = None,
+) -> dict:
+    """
+    Build placeholder values for an offer
+
+    Args:
+        offer: Offer being shared (with product, seller, category and manufacturer loaded)
+        network: Social network name, used to format the product description
+        coupons: Selected coupons; the first one feeds the individual coupon placeholders
+        user: User sharing the offer, for the global contact placeholders
+        fields: Canonical names actually used by the template (None = all)
+    """
+    coupons = list(coupons)
+    product = offer.product
+    seller_name = offer.seller.name if offer.seller else ''
+    price = float(offer.price or 0)
+    old_price = float(offer.old_price or 0)
+
+    values = {
+        'product_name': product.name if product else '',
+        'price': _money(offer.price),
+        'old_price': _money(offer.old_price),
+        'discount': f"{round((old_price - price) / old_price * 100)}%" if old_price > price else '',
+        'vendor_name': offer.vendor_name or '',
+        'seller': seller_name or offer.vendor_name or '',
+        'seller_name': seller_name,
+        'offer_url': offer.offer_url or '',
+        'category': offer.category.name if offer.category else '',
+        'manufacturer': offer.manufacturer.name if offer.manufacturer else '',
+    }
+
+    # The description conversion is the only costly value; skip it when unused
+    if fields is None or 'product_description' in fields:
+        description = product.description if product else ''
+        values['product_description'] = html_to_formatted_text(description, network)
+
+    if offer.installment_count and offer.installment_value:
+        interest = 'sem juros' if offer.installment_interest_free else 'com juros'
+        installment_value = _money(offer.installment_value)
+        values.update({
+            'installment_count': str(offer.installment_count),
+            'installment_value': installment_value,
+            'installment_interest_free': interest,
+            'installment_full': (
+                f"{offer.installment_count}x de {get_currency_symbol(offer.currency or 'BRL')} "
+                f"{installment_value} {interest}"
+            ),
+        })
+
+    best_price = min((coupon.calculate_discount(price) for coupon in coupons), default=price)
+    values['price_with_coupon'] = f"{best_price:.2f}" if best_price < price else values['price']
+
+    if coupons:
+        first = coupons[0]
+        discount_value = float(first.discount_value or 0)
+        is_percentage = first.discount_type == 'percentage'
+        values.update({
+            'all_coupons': 'CUPONS: ' + ', '.join(coupon.code for coupon in coupons),
+            'coupon_code': first.code,
+            'coupon_seller': first.seller.name if first.seller else 'N/A',
+            'coupon_discount_type': 'Porcentagem (%)' if is_percentage else 'Valor Fixo (R$)',
+            'coupon_discount_value': (
+                f"{_number(discount_value)}%" if is_percentage else f"R$ {discount_value:.2f}"
+            ),
+            'porcentagem': f"{_number(discount_value)}%" if is_percentage else '',
+            'desconto_fixo': f"R$ {discount_value:.2f}" if first.discount_type == 'fixed' else '',
+            'min_purchase_value': (
+                f"R$ {float(first.min_purchase_value):.2f}" if first.min_purchase_value else 'Sem mínimo'
+            ),
+            'max_discount_value': (
+                f"R$ {float(first.max_discount_value):.2f}" if first.max_discount_value else 'Sem limite'
+            ),
+            'coupon_expires': (
+                first.expires_at.strftime('%d/%m/%Y') if first.expires_at else 'Sem validade'
+            ),
+        })
+
+    if user is not None:
+        for name in ('phone', 'address', 'website', 'instagram', 'facebook',
+                     'twitter', 'linkedin', 'youtube', 'tiktok'):
+            values[f'user_{name}'] = getattr(user, name) or ''
+
+    return values
+
+
+def render_caption(
+    compiled: CompiledTemplate,
+    offer: Offer,
+    network: str,
+    coupons: Iterable[Coupon] = (),
+    user: Optional[User] = None,
+    network_config: Optional[SocialNetworkConfig] = None,
+) -> str:
+    """
+    Render the caption of an offer for a network
+
+    Appends the selected coupons list and wraps the text with the network
+    prefix/suffix when an active configuration is given. Does not query the
+    database for anything that is not already loaded on the arguments.
+    """
+    coupons = list(coupons)
+    text = compiled.render(build_caption_values(offer, network, coupons, user, compiled.fields))
+
+    if coupons:
+        text += '\n\n🎟️ CUPONS DISPONÍVEIS:\n'
+        text += ''.join(
+            f"• {coupon.code} - {coupon.seller.name if coupon.seller else 'N/A'}\n"
+            for coupon in coupons
+        )
+
+    if network_config is not None and network_config.active:
+        if network_config.prefix_text:
+            text = network_config.prefix_text + '\n\n' + text
+        if network_config.suffix_text:
+            text = text + '\n\n' + network_config.suffix_text
+
+    return text
+
+
+def render_offer_caption(
+    template: Template,
+    offer: Offer,
+    network: str,
+    coupons: Iterable[Coupon] = (),
+    user: Optional[User] = None,
+) -> tuple[str, bool]:
+    """
+    Render a caption, loading the network custom template and configuration
+
+    Returns:
+        Tuple of (caption, used_custom_template)
+    """
+    network = network.lower()
+    custom = TemplateSocialNetwork.query.filter_by(
+        template_id=template.id,
+        social_network=network,
+    ).first()
+    compiled = compile_template(custom or template)
+    caption = render_caption(
+        compiled,
+        offer,
+        network,
+        coupons,
+        user,
+        SocialNetworkConfig.get_config(network),
+    )
+    return caption, custom is not None
+
+
+def render_offer_captions(
+    template: Template,
+    offer_ids: Iterable[int],
+    networks: Iterable[str],
+    user: Optional[User] = None,
+    coupon_ids: Optional[Iterable[int]] = None,
+) -> tuple[list[dict], list[int]]:
+    """
+    Render captions for many offers and networks at once
+
+    Offers, coupons, network configurations and custom templates are loaded
+    in one query each; each template body is compiled once per network.
+
+    Args:
+        template: Base template
+        offer_ids: Offers to render, in output order
+        networks: Social networks to render each offer for
+        user: User sharing the offers, for the global contact placeholders
+        coupon_ids: Coupons to include (None = every active coupon of the
+            offer's seller, as preselected on the share page)
+
+    Returns:
+        Tuple of (captions, missing_offer_ids); each caption is a dict with
+        offer_id, network, text and custom
+    """
+    offer_ids = list(dict.fromkeys(offer_ids))
+    networks = list(dict.fromkeys(network.lower() for network in networks))
+
+    offers = {
+        offer.id: offer
+        for offer in Offer.query.options(
+            *Offer.eager_options("seller", "category", "manufacturer")
+        ).filter(Offer.id.in_(offer_ids))
+    }
+
+    coupons_by_seller: dict[int, list[Coupon]] = {}
+    seller_ids = {offer.seller_id for offer in offers.values() if offer.seller_id}
+    if seller_ids and coupon_ids != []:
+        coupon_query = Coupon.query.options(*Coupon.eager_options()).filter(
+            Coupon.active == True,
+            Coupon.seller_id.in_(seller_ids),
+        )
+        if coupon_ids is not None:
+            coupon_query = coupon_query.filter(Coupon.id.in_(list(coupon_ids)))
+        for coupon in coupon_query.order_by(Coupon.code):
+            coupons_by_seller.setdefault(coupon.seller_id, []).append(coupon)
+
+    configs = {
+        config.network: config
+        for config in SocialNetworkConfig.query.filter(SocialNetworkConfig.network.in_(networks))
+    }
+    customs = {
+        custom.social_network: custom
+        for custom in TemplateSocialNetwork.query.filter(
+            TemplateSocialNetwork.template_id == template.id,
+            TemplateSocialNetwork.social_network.in_(networks),
+        )
+    }
+    compiled = {network: compile_template(customs.get(network) or template) for network in networks}
+
+    captions = []
+    for offer_id in offer_ids:
+        offer = offers.get(offer_id)
+        if offer is None:
+            continue
+        coupons = coupons_by_seller.get(offer.seller_id, [])
+        for network in networks:
+            captions.append({
+                "offer_id": offer_id,
+                "network": network,
+                "text": render_caption(
+                    compiled[network], offer, network, coupons, user, configs.get(network)
+                ),
+                "custom": network in customs,
+            })
+
+    missing = [offer_id for offer_id in offer_ids if offer_id not in offers]
+    return captions, missing
@@ -0,0 +1,418 @@
+"""
+Bulk import of scraper results
+
+Loads the files written by the MercadoLivre scrapers (``result_data/``: JSON
+arrays, JSON Lines or CSV) into ``Product``, ``Offer`` and ``Seller``.
+
+Records are streamed from the file (never loaded whole) and written in chunks
+with the database's native upsert: ``INSERT ... ON CONFLICT`` on SQLite and
+PostgreSQL, ``INSERT ... ON DUPLICATE KEY UPDATE`` on MariaDB/MySQL. Products
+are keyed on their slug (made from the title) and offers on their URL, so
+importing the same file again updates prices instead of duplicating rows.
+Each chunk is committed on its own.
+
+Core statements skip the ORM mapper events, so the search documents of the
+touched offers are rebuilt per chunk, the new and repriced offers get a price
+history point and the dashboard/reference data caches are invalidated
+explicitly.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from slugify import slugify
+from sqlalchemy import func, literal, literal_column, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from .extensions import db
+from .models import Offer, Product, Seller
+from .price_history import record_offer_prices, to_cents
+from .reference_data import invalidate_reference_data
+from .search import index_offers
+from .stats import invalidate_dashboard_stats
+
+# Records written per transaction
+DEFAULT_CHUNK_SIZE = 2000
+
+# Characters read at a time when streaming a JSON array
+JSON_READ_SIZE = 64 * 1024
+
+# Titles whose slug is kept in memory (re-imports repeat the same titles)
+SLUG_CACHE_SIZE = 100_000
+
+_SLUG_DISALLOWED_RE = re.compile(r"[^-a-z0-9]+")
+_SLUG_DASHES_RE = re.compile(r"-{2,}")
+
+
+@dataclass
+class ImportStats:
+    """Counters of one import run"""
+
+    read: int = 0
+    skipped: int = 0
+    products: int = 0
+    offers: int = 0
+    sellers: int = 0
+    price_changes: int = 0
+    chunks: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _iter_json_array(stream, read_size: int = JSON_READ_SIZE) -> Iterator[dict]:
+    """Yield the objects of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("O arquivo JSON deve conter uma lista de produtos.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                position = end
+                yield record
+                continue
+        if eof:
+            if started:
+                raise ValueError("Arquivo JSON incompleto.")
+            return
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_records(path: str | Path) -> Iterator[dict]:
+    """
+    Stream the records of a scraper output file
+
+    Args:
+        path: ``.json`` (array), ``.jsonl``/``.ndjson`` or ``.csv`` file
+
+    Yields:
+        One dict per scraped product
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, encoding="utf-8", newline="" if suffix == ".csv" else None) as stream:
+        if suffix == ".csv":
+            yield from csv.DictReader(stream)
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(stream)
+
+
+def seller_name_from_filename(path: str | Path) -> Optional[str]:
+    """Seller nickname of ``ml_<seller>_<YYYYmmdd>_<HHMMSS>`` style filenames"""
+    parts = Path(path).stem.split("_")
+    if len(parts) >= 4 and parts[0] in ("ml", "mercadolivre") and parts[-2].isdigit() and parts[-1].isdigit():
+        return "_".join(parts[1:-2]) or None
+    return None
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    """Price from a number or a string ("99.90", "R$ 1.299,90")"""
+    if value is None or value == "":
+        return None
+    text = str(value).replace("R$", "").strip()
+    if isinstance(value, str) and "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        price = Decimal(text)
+    except InvalidOperation:
+        return None
+    return price if price.is_finite() and price >= 0 else None
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def _slug(title: str) -> str:
+    """Product slug of a title, as ``slugify(title)[:200]``"""
+    if title.isascii() and "&" not in title and "," not in title:
+        # Without accents, HTML entities or digit groups python-slugify only
+        # lowercases and turns runs of other characters into one dash
+        slug = _SLUG_DASHES_RE.sub("-", _SLUG_DISALLOWED_RE.sub("-", title.lower())).strip("-")
+    else:
+        slug = slugify(title)
+    return slug[:200]
+
+
+def map_record(record: dict, default_seller: Optional[str] = None) -> Optional[dict]:
+    """
+    Map a scraped product onto product/offer fields
+
+    Accepts the field names of both scrapers (``permalink``/``link``,
+    ``thumbnail``/``image``).
+
+    Returns:
+        Dict with the mapped fields, or None if title, URL or price is missing
+    """
+    title = (record.get("title") or "").strip()
+    offer_url = (record.get("permalink") or record.get("link") or record.get("offer_url") or "").strip()
+    price = _to_decimal(record.get("price"))
+    slug = _slug(title)
+    if not slug or not offer_url or len(offer_url) > 255 or price is None:
+        return None
+
+    description = (record.get("description") or "").strip()
+    seller = (record.get("seller") or default_seller or "").strip()
+    return {
+        "name": title[:200],
+        "slug": slug,
+        "description": description if description and description != "N/A" else None,
+        "image_url": (record.get("thumbnail") or record.get("image") or "").strip()[:500] or None,
+        "offer_url": offer_url,
+        "price": price,
+        "currency": (record.get("currency_id") or record.get("currency") or "BRL").strip()[:3].upper(),
+        "seller": seller[:120] or None,
+    }
+
+
+def _upsert(table, rows: list[dict], key: str, update: Callable, constants: Optional[dict] = None) -> None:
+    """
+    Insert rows, updating the ones whose ``key`` already exists
+
+    Args:
+        table: Table to write
+        rows: Rows with the same keys
+        key: Column of the unique index the conflict is detected on
+        update: Function receiving the "new row" columns (``excluded`` /
+            ``VALUES()``) and returning the {column: expression} to update
+        constants: {column: value} shared by every row, written into the
+            statement instead of being bound (and converted) once per row
+    """
+    if not rows:
+        return
+    bind_dialect = db.session.get_bind().dialect
+    dialect = bind_dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=[key], set_=update(stmt.excluded))
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update(update(stmt.inserted))
+    else:
+        raise NotImplementedError(f"Upsert não suportado para o banco {dialect}.")
+    if constants:
+        stmt = stmt.values({
+            name: literal_column(
+                str(literal(value, table.c[name].type).compile(
+                    dialect=bind_dialect, compile_kwargs={"literal_binds": True}
+                )),
+                table.c[name].type,
+            )
+            for name, value in constants.items()
+        })
+    db.session.execute(stmt, rows)
+
+
+class CatalogImporter:
+    """Upsert scraped products into the catalog, one chunk per transaction"""
+
+    def __init__(self, default_seller: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.default_seller = default_seller
+        self.chunk_size = max(chunk_size, 1)
+        self.stats = ImportStats()
+        self._seller_ids: dict[str, int] = {}
+
+    def import_records(self, records: Iterable[dict]) -> ImportStats:
+        """Import an iterable of scraped records (streamed, chunk by chunk)"""
+        chunk = []
+        for record in records:
+            self.stats.read += 1
+            mapped = map_record(record, self.default_seller)
+            if mapped is None:
+                self.stats.skipped += 1
+                continue
+            chunk.append(mapped)
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk)
+        return self.stats
+
+    def import_file(self, path: str | Path) -> ImportStats:
+        """Import a scraper output file; the seller defaults to the one in its name"""
+        default_seller = self.default_seller
+        if default_seller is None:
+            self.default_seller = seller_name_from_filename(path)
+        try:
+            return self.import_records(iter_records(path))
+        finally:
+            self.default_seller = default_seller
+
+    def _write_chunk(self, chunk: list[dict]) -> None:
+        now = datetime.utcnow()
+        try:
+            seller_ids, new_sellers = self._resolve_sellers({row["seller"] for row in chunk if row["seller"]}, now)
+
+            # Last occurrence wins when a key repeats inside the chunk
+            products = {}
+            offers = {}
+            for row in chunk:
+                products[row["slug"]] = {
+                    "name": row["name"],
+                    "slug": row["slug"],
+                    "description": row["description"],
+                    "image_url": row["image_url"],
+                }
+                offers[row["offer_url"]] = row
+
+            product_table = Product.__table__
+            _upsert(
+                product_table,
+                list(products.values()),
+                "slug",
+                lambda new: {
+                    "description": func.coalesce(new.description, product_table.c.description),
+                    "image_url": func.coalesce(product_table.c.image_url, new.image_url),
+                    "updated_at": new.updated_at,
+                },
+                constants={"created_at": now, "updated_at": now},
+            )
+            connection = db.session.connection()
+            product_ids = dict(
+                connection.execute(
+                    select(product_table.c.slug, product_table.c.id).where(product_table.c.slug.in_(list(products)))
+                ).all()
+            )
+
+            # Prices before the upsert: only new offers and price changes go to the history
+            offer_table = Offer.__table__
+            previous_prices = dict(
+                connection.execute(
+                    select(offer_table.c.offer_url, offer_table.c.price).where(offer_table.c.offer_url.in_(list(offers)))
+                ).all()
+            )
+
+            _upsert(
+                offer_table,
+                [
+                    {
+                        "product_id": product_ids[row["slug"]],
+                        "vendor_name": row["seller"] or "Mercado Livre",
+                        "seller_id": seller_ids.get(row["seller"]),
+                        "price": row["price"],
+                        "currency": row["currency"],
+                        "offer_url": row["offer_url"],
+                    }
+                    for row in offers.values()
+                ],
+                "offer_url",
+                lambda new: {
+                    "product_id": new.product_id,
+                    "vendor_name": new.vendor_name,
+                    "seller_id": func.coalesce(new.seller_id, offer_table.c.seller_id),
+                    "price": new.price,
+                    "currency": new.currency,
+                    "updated_at": new.updated_at,
+                },
+                constants={"installment_interest_free": True, "created_at": now, "updated_at": now},
+            )
+
+            # Offers of these products: new, repriced or with a new description
+            offer_ids_by_url = dict(
+                connection.execute(
+                    select(offer_table.c.offer_url, offer_table.c.id)
+                    .where(offer_table.c.product_id.in_(list(product_ids.values())))
+                ).all()
+            )
+            price_changes = record_offer_prices(
+                connection,
+                [
+                    offer_ids_by_url[url]
+                    for url, row in offers.items()
+                    if url not in previous_prices or to_cents(previous_prices[url]) != to_cents(row["price"])
+                ],
+                now,
+            )
+            index_offers(connection, offer_ids_by_url.values())
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self._seller_ids.update(seller_ids)
+        if new_sellers:
+            invalidate_reference_data(Seller)
+        invalidate_dashboard_stats()
+
+        self.stats.sellers += new_sellers
+        self.stats.products += len(products)
+        self.stats.offers += len(offers)
+        self.stats.price_changes += price_changes
+        self.stats.chunks += 1
+
+    def _resolve_sellers(self, names: set[str], now: datetime) -> tuple[dict[str, int], int]:
+        """
+        Ids of the given sellers, creating the missing ones
+
+        The ids are only added to the importer's cache once the chunk commits
+        (see ``_write_chunk``), so a rolled back chunk leaves no stale ids.
+
+        Returns:
+            ({name: seller id}, number of sellers created)
+        """
+        seller_ids = {name: self._seller_ids[name] for name in names if name in self._seller_ids}
+        missing = sorted(name for name in names if name not in self._seller_ids)
+        if not missing:
+            return seller_ids, 0
+
+        slugs = {name: slugify(name)[:120] or "vendedor" for name in missing}
+        existing = db.session.execute(
+            select(Seller.id, Seller.name, Seller.slug).where(
+                Seller.name.in_(missing) | Seller.slug.in_(list(slugs.values()))
+            )
+        ).all()
+        by_name = {row.name: row.id for row in existing}
+        by_slug = {row.slug: row.id for row in existing}
+        # One row per slug: names differing only in case/accents ("Loja Á", "loja a")
+        # are the same seller, and an upsert can't touch a row twice
+        new_rows = {}
+        for name in missing:
+            seller_id = by_name.get(name) or by_slug.get(slugs[name])
+            if seller_id:
+                seller_ids[name] = seller_id
+            elif slugs[name] not in new_rows:
+                new_rows[slugs[name]] = {"name": name, "slug": slugs[name], "active": True,
+                                         "created_at": now, "updated_at": now}
+        if not new_rows:
+            return seller_ids, 0
+
+        seller_table = Seller.__table__
+        _upsert(seller_table, list(new_rows.values()), "slug", lambda new: {"updated_at": seller_table.c.updated_at})
+        ids_by_slug = dict(
+            db.session.execute(select(Seller.slug, Seller.id).where(Seller.slug.in_(list(new_rows)))).all()
+        )
+        for name in missing:
+            if name not in seller_ids and slugs[name] in ids_by_slug:
+                seller_ids[name] = ids_by_slug[slugs[name]]
+        return seller_ids, len(new_rows)
@@ -51,7 +51,35 @@ class Config:
     WTF_CSRF_ENABLED = True
     SESSION_COOKIE_SECURE = False
     REMEMBER_COOKIE_DURATION = 60 * 60 * 24 * 7
+    # Larger request bodies are refused (413) before being read; leaves room
+    # for the form fields around a 5MB image (utils.upload.MAX_FILE_SIZE)
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(6 * 1024 * 1024)))
     TOKEN_EXPIRATION_MINUTES = int(os.getenv("TOKEN_EXPIRATION_MINUTES", "60"))
+    TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+    DASHBOARD_STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL", "60"))
+    REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "300"))
+
+    # Publication workers (scripts/publication_worker.py)
+    PUBLICATION_DEFAULT_ADAPTER = os.getenv("PUBLICATION_DEFAULT_ADAPTER", "file")
+    PUBLICATION_ADAPTERS = os.getenv("PUBLICATION_ADAPTERS", "")
+    PUBLICATION_OUTBOX_DIR = os.getenv("PUBLICATION_OUTBOX_DIR") or str(INSTANCE_DIR / "publications")
+    PUBLICATION_WEBHOOK_URL = os.getenv("PUBLICATION_WEBHOOK_URL", "")
+    PUBLICATION_WEBHOOK_TIMEOUT = int(os.getenv("PUBLICATION_WEBHOOK_TIMEOUT", "10"))
+    PUBLICATION_WORKER_THREADS = int(os.getenv("PUBLICATION_WORKER_THREADS", "16"))
+    PUBLICATION_NETWORK_CONCURRENCY = int(os.getenv("PUBLICATION_NETWORK_CONCURRENCY", "4"))
+    PUBLICATION_NETWORK_RATE = float(os.getenv("PUBLICATION_NETWORK_RATE", "5"))
+    PUBLICATION_NETWORK_LIMITS = os.getenv("PUBLICATION_NETWORK_LIMITS", "")
+    PUBLICATION_MAX_ATTEMPTS = int(os.getenv("PUBLICATION_MAX_ATTEMPTS", "5"))
+    PUBLICATION_RETRY_DELAY = int(os.getenv("PUBLICATION_RETRY_DELAY", "30"))
+    PUBLICATION_JOB_TIMEOUT = int(os.getenv("PUBLICATION_JOB_TIMEOUT", "300"))
+    PUBLICATION_POLL_INTERVAL = float(os.getenv("PUBLICATION_POLL_INTERVAL", "2"))
+    PUBLICATION_SCHEDULER_BATCH = int(os.getenv("PUBLICATION_SCHEDULER_BATCH", "500"))
+
+    # Price history retention (scripts/rollup_price_history.py): raw points
+    # and hourly buckets are deleted after these many days; daily buckets are kept
+    PRICE_HISTORY_RAW_DAYS = int(os.getenv("PRICE_HISTORY_RAW_DAYS", "30"))
+    PRICE_HISTORY_HOURLY_DAYS = int(os.getenv("PRICE_HISTORY_HOURLY_DAYS", "365"))
 
 
 class DevelopmentConfig(Config):
@@ -6,7 +6,7 @@ from secrets import token_hex
 
 from flask import current_app
 from flask_login import UserMixin
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import joinedload, selectinload, validates
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from .extensions import db, login_manager
@@ -19,6 +19,29 @@ class TimestampMixin:
     )
 
 
+class SerializerMixin:
+    """Declares the relationships read by ``to_dict()`` so list queries can
+    eager-load them and serialize N rows in a constant number of queries."""
+
+    serialize_relationships: tuple[str, ...] = ()
+
+    @classmethod
+    def eager_options(cls, *extra: str) -> list:
+        """Loader options for ``serialize_relationships`` plus any ``extra`` names.
+
+        Many-to-one relationships are joined in the same SELECT; collections
+        are fetched with one additional ``IN`` query each.
+        """
+        options = []
+        for name in (*cls.serialize_relationships, *extra):
+            attribute = getattr(cls, name)
+            if attribute.property.uselist:
+                options.append(selectinload(attribute))
+            else:
+                options.append(joinedload(attribute))
+        return options
+
+
 class RoleEnum(str, Enum):
     ADMIN = "admin"
     EDITOR = "editor"
@@ -38,6 +61,14 @@ class WishlistVisibility(str, Enum):
     PUBLIC = "public"
 
 
+class PublicationJobStatus(str, Enum):
+    SCHEDULED = "scheduled"
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 user_groups = db.Table(
     "user_groups",
     db.Column("user_id", db.Integer, db.ForeignKey("users.id"), primary_key=True),
@@ -45,7 +76,7 @@ user_groups = db.Table(
 )
 
 
-class User(UserMixin, TimestampMixin, db.Model):
+class User(SerializerMixin, UserMixin, TimestampMixin, db.Model):
     __tablename__ = "users"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -151,7 +182,7 @@ class Group(TimestampMixin, db.Model):
         }
 
 
-class Wishlist(TimestampMixin, db.Model):
+class Wishlist(SerializerMixin, TimestampMixin, db.Model):
     __tablename__ = "wishlists"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -183,6 +214,7 @@ class Product(TimestampMixin, db.Model):
     category = db.Column(db.String(120))
     manufacturer = db.Column(db.String(120))
     image_url = db.Column(db.String(500), nullable=True)  # Path to uploaded image
+    image_variants = db.Column(db.JSON, nullable=True)  # Resized WebP/JPEG copies (see utils.upload)
 
     offers = db.relationship("Offer", back_populates="product", lazy="dynamic")
 
@@ -203,7 +235,7 @@ class Product(TimestampMixin, db.Model):
         }
 
 
-class Offer(TimestampMixin, db.Model):
+class Offer(SerializerMixin, TimestampMixin, db.Model):
     __tablename__ = "offers"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -215,7 +247,9 @@ class Offer(TimestampMixin, db.Model):
     offer_url = db.Column(db.String(255))
     expires_at = db.Column(db.DateTime)
     created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"))
-    
+    # Required here: the offer lists page by (created_at, id)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
     # Installment fields
     installment_count = db.Column(db.Integer, nullable=True)  # Number of installments (e.g., 5)
     installment_value = db.Column(db.Numeric(10, 2), nullable=True)  # Value per installment (e.g., 72.00)
@@ -230,6 +264,22 @@ class Offer(TimestampMixin, db.Model):
     created_by = db.relationship("User")
     namespaces = db.relationship("OfferNamespaceValue", back_populates="offer", cascade="all, delete-orphan")
 
+    serialize_relationships = ("product",)
+
+    # Access paths of /ofertas and /api/offers: newest first (keyset on
+    # created_at, id), optionally narrowed by seller/category/manufacturer.
+    # offer_url identifies an offer for bulk imports (upsert key)
+    __table_args__ = (
+        db.Index("uq_offers_offer_url", "offer_url", unique=True),
+        db.Index("ix_offers_created_at_id", "created_at", "id"),
+        db.Index("ix_offers_seller_id_created_at", "seller_id", "created_at"),
+        db.Index("ix_offers_category_id_created_at", "category_id", "created_at"),
+        db.Index("ix_offers_manufacturer_id_created_at", "manufacturer_id", "created_at"),
+        db.Index("ix_offers_product_id", "product_id"),
+        db.Index("ix_offers_price", "price"),
+        db.Index("ix_offers_expires_at", "expires_at"),
+    )
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -254,6 +304,33 @@ class Offer(TimestampMixin, db.Model):
         return float(self.installment_value or 0) if self.installment_value else 0.0
 
 
+# Every price an offer took (append-only, see app/price_history.py). Prices in
+# integer cents; range queries of one offer use (offer_id, ts), the rollup job
+# and the retention pruning use ts
+price_history = db.Table(
+    "price_history",
+    db.Column("offer_id", db.Integer, db.ForeignKey("offers.id"), nullable=False),
+    db.Column("ts", db.DateTime, nullable=False),
+    db.Column("price", db.Integer, nullable=False),
+    db.Index("ix_price_history_offer_id_ts", "offer_id", "ts"),
+    db.Index("ix_price_history_ts", "ts"),
+)
+
+# Hourly and daily downsampling of price_history: min, max and last price
+# (cents) of each offer in each bucket
+price_rollups = db.Table(
+    "price_rollups",
+    db.Column("offer_id", db.Integer, db.ForeignKey("offers.id"), primary_key=True),
+    db.Column("period", db.String(4), primary_key=True),  # "hour" or "day"
+    db.Column("bucket", db.DateTime, primary_key=True),  # Start of the hour/day
+    db.Column("min_price", db.Integer, nullable=False),
+    db.Column("max_price", db.Integer, nullable=False),
+    db.Column("last_price", db.Integer, nullable=False),
+    db.Column("samples", db.Integer, nullable=False),  # Raw points in the bucket
+    db.Index("ix_price_rollups_period_bucket", "period", "bucket"),
+)
+
+
 class WishlistItem(TimestampMixin, db.Model):
     __tablename__ = "wishlist_items"
 
@@ -306,7 +383,7 @@ class TemplateSocialNetwork(TimestampMixin, db.Model):
         }
 
 
-class Template(TimestampMixin, db.Model):
+class Template(SerializerMixin, TimestampMixin, db.Model):
     __tablename__ = "templates"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -321,6 +398,8 @@ class Template(TimestampMixin, db.Model):
                                      secondary=template_social_networks,
                                      backref=db.backref('templates', lazy='dynamic'))
 
+    serialize_relationships = ("social_networks",)
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -339,7 +418,7 @@ class Template(TimestampMixin, db.Model):
         return [channel.strip() for channel in self.channels.split(",") if channel.strip()]
 
 
-class Namespace(TimestampMixin, db.Model):
+class Namespace(SerializerMixin, TimestampMixin, db.Model):
     __tablename__ = "namespaces"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -390,7 +469,7 @@ class OfferNamespaceValue(TimestampMixin, db.Model):
     )
 
 
-class Publication(TimestampMixin, db.Model):
+class Publication(SerializerMixin, TimestampMixin, db.Model):
     __tablename__ = "publications"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -398,12 +477,21 @@ class Publication(TimestampMixin, db.Model):
     template_id = db.Column(db.Integer, db.ForeignKey("templates.id"), nullable=False)
     caption = db.Column(db.Text, nullable=False)
     published_at = db.Column(db.DateTime)
+    scheduled_for = db.Column(db.DateTime)  # UTC; jobs stay scheduled until then
     published_by_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     channels = db.Column(db.String(255))
 
     offer = db.relationship("Offer")
     template = db.relationship("Template")
     published_by = db.relationship("User")
+    jobs = db.relationship(
+        "PublicationJob",
+        back_populates="publication",
+        cascade="all, delete-orphan",
+        order_by="PublicationJob.id",
+    )
+
+    serialize_relationships = ("jobs",)
 
     def to_dict(self) -> dict:
         return {
@@ -413,10 +501,54 @@ class Publication(TimestampMixin, db.Model):
             "caption": self.caption,
             "channels": self.channels.split(",") if self.channels else [],
             "published_at": self.published_at.isoformat() if self.published_at else None,
+            "scheduled_for": self.scheduled_for.isoformat() if self.scheduled_for else None,
+            "jobs": [job.to_dict() for job in self.jobs],
         }
 
 
-class Seller(TimestampMixin, db.Model):
+class PublicationJob(TimestampMixin, db.Model):
+    """Delivery of a publication to one social network (durable work queue)"""
+    __tablename__ = "publication_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    publication_id = db.Column(db.Integer, db.ForeignKey("publications.id"), nullable=False)
+    network = db.Column(db.String(50), nullable=False)
+    caption = db.Column(db.Text, nullable=False)
+    status = db.Column(
+        db.Enum(PublicationJobStatus), default=PublicationJobStatus.PENDING, nullable=False
+    )
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Schedule/retry backoff
+    locked_by = db.Column(db.String(120))  # Worker that claimed the job
+    locked_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    external_id = db.Column(db.String(255))  # Post id returned by the network adapter
+    last_error = db.Column(db.Text)
+
+    publication = db.relationship("Publication", back_populates="jobs")
+
+    # Workers claim the oldest available jobs of each network; the scheduler
+    # looks up the next scheduled job
+    __table_args__ = (
+        db.Index("ix_publication_jobs_status_network_available_at", "status", "network", "available_at"),
+        db.Index("ix_publication_jobs_status_available_at", "status", "available_at"),
+        db.Index("ix_publication_jobs_publication_id", "publication_id"),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "publication_id": self.publication_id,
+            "network": self.network,
+            "status": self.status.value,
+            "attempts": self.attempts,
+            "external_id": self.external_id,
+            "last_error": self.last_error,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class Seller(SerializerMixin, TimestampMixin, db.Model):
     """Marketplace sellers/vendors"""
     __tablename__ = "sellers"
 
@@ -444,7 +576,7 @@ class Seller(TimestampMixin, db.Model):
         }
 
 
-class Category(TimestampMixin, db.Model):
+class Category(SerializerMixin, TimestampMixin, db.Model):
     """Product categories"""
     __tablename__ = "categories"
 
@@ -470,7 +602,7 @@ class Category(TimestampMixin, db.Model):
         }
 
 
-class Manufacturer(TimestampMixin, db.Model):
+class Manufacturer(SerializerMixin, TimestampMixin, db.Model):
     """Product manufacturers/brands"""
     __tablename__ = "manufacturers"
 
@@ -569,7 +701,7 @@ class AppSettings(db.Model):
         }
 
 
-class Coupon(TimestampMixin, db.Model):
+class Coupon(SerializerMixin, TimestampMixin, db.Model):
     """Discount coupons for sellers"""
     __tablename__ = "coupons"
 
@@ -589,6 +721,22 @@ class Coupon(TimestampMixin, db.Model):
     # Relationships
     seller = db.relationship("Seller", backref=db.backref("coupons", lazy="dynamic"))
     created_by = db.relationship("User")
+
+    serialize_relationships = ("seller",)
+
+    # Partial indexes (SQLite/PostgreSQL) cover only active coupons: the
+    # share dialogs list a seller's active coupons by code
+    __table_args__ = (
+        db.Index(
+            "ix_coupons_active_seller_id_code", "seller_id", "code",
+            sqlite_where=db.text("active = 1"), postgresql_where=db.text("active"),
+        ),
+        db.Index(
+            "ix_coupons_active_expires_at", "expires_at",
+            sqlite_where=db.text("active = 1"), postgresql_where=db.text("active"),
+        ),
+        db.Index("ix_coupons_active_created_at", "active", "created_at"),
+    )
     
     def calculate_discount(self, original_price):
         """Calculate discounted price based on coupon type, min purchase value and max discount limit"""
@@ -0,0 +1,388 @@
+"""
+Price history of offers
+
+Every price an offer takes is appended to ``price_history`` (offer id,
+timestamp, price in integer cents): one point when the offer is created and
+one whenever its price changes. ORM writes (offer forms and API) are recorded
+by mapper events on ``Offer``; the bulk importer, whose Core statements skip
+the events, records the prices it changed itself.
+
+``rollup_price_history()`` (run by ``scripts/rollup_price_history.py``)
+downsamples the points into hourly buckets and the hourly buckets into daily
+ones, keeping the min, max and last price of each offer in each bucket
+(``price_rollups``). Only complete buckets are stored. Afterwards, raw points
+older than ``PRICE_HISTORY_RAW_DAYS`` and hourly buckets older than
+``PRICE_HISTORY_HOURLY_DAYS`` are deleted (never before they were rolled up),
+so old history costs at most one row per offer per day.
+
+``price_series()`` reads a range at one resolution: stored buckets up to the
+last rollup and, after it, buckets computed on the fly from the finer data,
+so a series is current without waiting for the next rollup.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import Integer, bindparam, cast, delete, event, func, insert, inspect, literal, select
+
+from .extensions import db
+from .models import Offer, price_history, price_rollups
+
+
+# Bucket size of each rollup period, finest first
+PERIODS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+RESOLUTIONS = ("raw", *PERIODS)
+
+# Range rolled up per transaction
+ROLLUP_SLICES = {"hour": timedelta(days=1), "day": timedelta(days=31)}
+
+# Longest range served at each resolution when none is requested
+AUTO_RESOLUTION_SPANS = {"raw": timedelta(days=2), "hour": timedelta(days=90)}
+
+
+def to_cents(price) -> int:
+    """Integer cents of a price (Decimal, float, int or numeric string)"""
+    return int((Decimal(str(price)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def bucket_start(ts: datetime, period: str) -> datetime:
+    """Start of the hour/day containing ``ts``"""
+    if period == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _finer(period: str) -> Optional[str]:
+    """Period a rollup is computed from (None = raw points)"""
+    periods = list(PERIODS)
+    index = periods.index(period)
+    return periods[index - 1] if index else None
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+def record_prices(connection, prices: Iterable[tuple[int, object]], ts: Optional[datetime] = None) -> int:
+    """
+    Append price points
+
+    Args:
+        connection: Connection of the transaction writing the offers
+        prices: (offer id, price) pairs; None prices are skipped
+        ts: Time of the points (default: now, UTC)
+
+    Returns:
+        Number of points written
+    """
+    ts = ts or datetime.utcnow()
+    rows = [
+        {"offer_id": offer_id, "ts": ts, "price": to_cents(price)}
+        for offer_id, price in prices
+        if price is not None
+    ]
+    if rows:
+        connection.execute(insert(price_history), rows)
+    return len(rows)
+
+
+def record_offer_prices(connection, offer_ids: Iterable[int], ts: Optional[datetime] = None) -> int:
+    """
+    Append the current price of the given offers
+
+    Same points as ``record_prices()`` for offers just written with Core
+    statements, in one ``INSERT ... SELECT`` reading the prices from
+    ``offers`` instead of one bound row per offer.
+
+    Returns:
+        Number of points written
+    """
+    offer_ids = list(offer_ids)
+    if not offer_ids:
+        return 0
+    offers = Offer.__table__
+    prices = select(
+        offers.c.id,
+        literal(ts or datetime.utcnow(), price_history.c.ts.type),
+        cast(func.round(offers.c.price * 100), Integer),
+    ).where(offers.c.id.in_(bindparam("offer_ids", expanding=True)), offers.c.price.isnot(None))
+    result = connection.execute(
+        insert(price_history).from_select(["offer_id", "ts", "price"], prices),
+        {"offer_ids": offer_ids},
+    )
+    return result.rowcount
+
+
+def delete_price_history(connection, offer_ids: Iterable[int]) -> None:
+    """Remove the points and buckets of the given offers"""
+    offer_ids = list(offer_ids)
+    if not offer_ids:
+        return
+    for table in (price_history, price_rollups):
+        connection.execute(
+            delete(table).where(table.c.offer_id.in_(bindparam("offer_ids", expanding=True))),
+            {"offer_ids": offer_ids},
+        )
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def _aggregate(rows: Iterable[tuple], period: str) -> list[tuple]:
+    """
+    Group points/buckets (in time order) into buckets of ``period``
+
+    Rows and results are (offer_id, ts, min, max, last, samples) tuples;
+    results are ordered by bucket.
+    """
+    buckets = {}
+    for offer_id, ts, low, high, last, samples in rows:
+        key = (offer_id, bucket_start(ts, period))
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [low, high, last, samples]
+        else:
+            bucket[0] = min(bucket[0], low)
+            bucket[1] = max(bucket[1], high)
+            bucket[2] = last
+            bucket[3] += samples
+    return sorted(
+        ((offer_id, bucket, *values) for (offer_id, bucket), values in buckets.items()),
+        key=lambda row: (row[1], row[0]),
+    )
+
+
+def _last_bucket(connection, period: str) -> Optional[datetime]:
+    """Start of the newest stored bucket of a period (None before the first rollup)"""
+    return connection.execute(
+        select(func.max(price_rollups.c.bucket)).where(price_rollups.c.period == period)
+    ).scalar()
+
+
+def _rolled_up_until(connection, period: str) -> Optional[datetime]:
+    """End of the newest stored bucket of a period"""
+    last = _last_bucket(connection, period)
+    return last + PERIODS[period] if last else None
+
+
+def _rows(connection, period: Optional[str], start: datetime, end: datetime,
+          offer_id: Optional[int] = None) -> list[tuple]:
+    """
+    Points (period None) or buckets of ``period`` in [start, end), in time order
+
+    Buckets come from ``price_rollups`` up to the last rollup and are
+    computed from the finer data after it.
+    """
+    if period is None:
+        statement = select(
+            price_history.c.offer_id, price_history.c.ts, price_history.c.price
+        ).where(price_history.c.ts >= start, price_history.c.ts < end)
+        if offer_id is not None:
+            statement = statement.where(price_history.c.offer_id == offer_id)
+        return [
+            (row.offer_id, row.ts, row.price, row.price, row.price, 1)
+            for row in connection.execute(statement.order_by(price_history.c.ts))
+        ]
+
+    start = bucket_start(start, period)
+    stored_until = min(_rolled_up_until(connection, period) or start, end)
+    rows = []
+    if stored_until > start:
+        statement = select(
+            price_rollups.c.offer_id,
+            price_rollups.c.bucket,
+            price_rollups.c.min_price,
+            price_rollups.c.max_price,
+            price_rollups.c.last_price,
+            price_rollups.c.samples,
+        ).where(
+            price_rollups.c.period == period,
+            price_rollups.c.bucket >= start,
+            price_rollups.c.bucket < stored_until,
+        )
+        if offer_id is not None:
+            statement = statement.where(price_rollups.c.offer_id == offer_id)
+        rows = [tuple(row) for row in connection.execute(statement.order_by(price_rollups.c.bucket))]
+    if end > max(start, stored_until):
+        rows += _aggregate(_rows(connection, _finer(period), max(start, stored_until), end, offer_id), period)
+    return rows
+
+
+def pick_resolution(start: datetime, end: datetime, now: Optional[datetime] = None,
+                    raw_days: Optional[int] = None, hourly_days: Optional[int] = None) -> str:
+    """
+    Resolution for a range: raw points for short recent ranges, hourly up to
+    a few months, daily beyond (or when the finer data was already pruned)
+    """
+    now = now or datetime.utcnow()
+    raw_days = raw_days if raw_days is not None else current_app.config.get("PRICE_HISTORY_RAW_DAYS", 30)
+    hourly_days = hourly_days if hourly_days is not None else current_app.config.get("PRICE_HISTORY_HOURLY_DAYS", 365)
+
+    span = end - start
+    if span <= AUTO_RESOLUTION_SPANS["raw"] and start >= now - timedelta(days=raw_days):
+        return "raw"
+    if span <= AUTO_RESOLUTION_SPANS["hour"] and start >= now - timedelta(days=hourly_days):
+        return "hour"
+    return "day"
+
+
+def price_series(offer_id: int, start: datetime, end: datetime, resolution: str = "raw") -> list[dict]:
+    """
+    Price history of one offer in [start, end)
+
+    Args:
+        offer_id: Offer
+        start: Range start (UTC)
+        end: Range end (UTC, exclusive)
+        resolution: ``raw`` (every change), ``hour`` or ``day``
+
+    Returns:
+        Raw: ``{"ts", "price"}`` points. Hour/day: ``{"ts", "min", "max",
+        "last", "samples"}`` buckets (``ts`` is the bucket start). Prices in
+        currency units; buckets without changes are omitted (the price is the
+        ``last`` of the previous bucket).
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolução inválida: use {', '.join(RESOLUTIONS)}.")
+
+    rows = _rows(db.session.connection(), None if resolution == "raw" else resolution, start, end, offer_id)
+    if resolution == "raw":
+        return [{"ts": ts.isoformat(), "price": price / 100} for _, ts, price, _, _, _ in rows]
+    return [
+        {"ts": ts.isoformat(), "min": low / 100, "max": high / 100, "last": last / 100, "samples": samples}
+        for _, ts, low, high, last, samples in rows
+    ]
+
+
+# ============================================================================
+# ROLLUP AND RETENTION
+# ============================================================================
+
+def _rollup_period(period: str, now: datetime) -> int:
+    """Store the complete buckets of a period not rolled up yet; returns buckets written"""
+    connection = db.session.connection()
+    end = bucket_start(now, period)
+    start = _rolled_up_until(connection, period)
+    if start is None:
+        # First rollup: from the oldest data
+        firsts = [
+            connection.execute(select(func.min(price_history.c.ts))).scalar(),
+            connection.execute(select(func.min(price_rollups.c.bucket))).scalar(),
+        ]
+        firsts = [first for first in firsts if first is not None]
+        if not firsts:
+            return 0
+        start = bucket_start(min(firsts), period)
+
+    written = 0
+    while start < end:
+        slice_end = min(start + ROLLUP_SLICES[period], end)
+        buckets = _aggregate(_rows(connection, _finer(period), start, slice_end), period)
+        if buckets:
+            connection.execute(
+                insert(price_rollups),
+                [
+                    {
+                        "offer_id": offer_id,
+                        "period": period,
+                        "bucket": bucket,
+                        "min_price": low,
+                        "max_price": high,
+                        "last_price": last,
+                        "samples": samples,
+                    }
+                    for offer_id, bucket, low, high, last, samples in buckets
+                ],
+            )
+        db.session.commit()
+        connection = db.session.connection()
+        written += len(buckets)
+        start = slice_end
+    return written
+
+
+def prune_price_history(now: Optional[datetime] = None, raw_days: Optional[int] = None,
+                        hourly_days: Optional[int] = None) -> dict:
+    """
+    Delete raw points and hourly buckets past their retention, never before
+    they were rolled up into the next period
+
+    Returns:
+        Rows deleted: ``{"raw": n, "hour": n}``
+    """
+    now = now or datetime.utcnow()
+    raw_days = raw_days if raw_days is not None else current_app.config.get("PRICE_HISTORY_RAW_DAYS", 30)
+    hourly_days = hourly_days if hourly_days is not None else current_app.config.get("PRICE_HISTORY_HOURLY_DAYS", 365)
+    connection = db.session.connection()
+
+    deleted = {"raw": 0, "hour": 0}
+    hourly_until = _rolled_up_until(connection, "hour")
+    if hourly_until:
+        cutoff = min(now - timedelta(days=raw_days), hourly_until)
+        deleted["raw"] = connection.execute(delete(price_history).where(price_history.c.ts < cutoff)).rowcount
+
+    daily_until = _rolled_up_until(connection, "day")
+    if daily_until:
+        cutoff = min(now - timedelta(days=hourly_days), daily_until)
+        deleted["hour"] = connection.execute(
+            delete(price_rollups).where(price_rollups.c.period == "hour", price_rollups.c.bucket < cutoff)
+        ).rowcount
+    db.session.commit()
+    return deleted
+
+
+def rollup_price_history(now: Optional[datetime] = None, prune: bool = True) -> dict:
+    """
+    Roll up the hours and days completed since the last run, then apply the
+    retention (run it periodically, one process at a time)
+
+    Returns:
+        Buckets written per period and rows pruned
+    """
+    now = now or datetime.utcnow()
+    try:
+        result = {period: _rollup_period(period, now) for period in PERIODS}
+        if prune:
+            result["pruned"] = prune_price_history(now)
+    except Exception:
+        db.session.rollback()
+        raise
+    return result
+
+
+# ============================================================================
+# SYNC EVENTS
+# ============================================================================
+
+@event.listens_for(Offer, "after_insert")
+def _offer_inserted(mapper, connection, target):
+    record_prices(connection, [(target.id, target.price)])
+
+
+@event.listens_for(Offer, "after_update")
+def _offer_updated(mapper, connection, target):
+    history = inspect(target).attrs.price.history
+    if not history.has_changes() or target.price is None:
+        return
+    if history.deleted and history.deleted[0] is not None:
+        previous = to_cents(history.deleted[0])
+    else:
+        # Price set on an expired instance: the old value was never loaded
+        previous = connection.execute(
+            select(price_history.c.price)
+            .where(price_history.c.offer_id == target.id)
+            .order_by(price_history.c.ts.desc())
+            .limit(1)
+        ).scalar()
+    if previous != to_cents(target.price):
+        record_prices(connection, [(target.id, target.price)])
+
+
+@event.listens_for(Offer, "before_delete")
+def _offer_deleted(mapper, connection, target):
+    delete_price_history(connection, [target.id])
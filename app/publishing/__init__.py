@@ -0,0 +1,50 @@
+"""
+Asynchronous publication dispatch
+
+``POST /api/publications`` only records a publication and one queued job per
+network; worker processes (``scripts/publication_worker.py``) deliver the
+jobs in parallel through pluggable network adapters, within per-network
+concurrency and rate limits. Publications with ``scheduled_for`` wait in the
+queue until they are due.
+"""
+
+from .adapters import (
+    ADAPTERS,
+    FileAdapter,
+    PublicationAdapter,
+    PublicationError,
+    PublicationMessage,
+    WebhookAdapter,
+    adapter_name_for,
+    register_adapter,
+)
+from .queue import (
+    JobResult,
+    claim_jobs,
+    enqueue_publication,
+    record_results,
+    requeue_stale_jobs,
+)
+from .scheduler import PublicationScheduler, next_due_at, promote_due_jobs
+from .worker import PublicationWorker, RateLimiter
+
+__all__ = [
+    'ADAPTERS',
+    'FileAdapter',
+    'PublicationAdapter',
+    'PublicationError',
+    'PublicationMessage',
+    'WebhookAdapter',
+    'adapter_name_for',
+    'register_adapter',
+    'JobResult',
+    'claim_jobs',
+    'enqueue_publication',
+    'record_results',
+    'requeue_stale_jobs',
+    'PublicationScheduler',
+    'next_due_at',
+    'promote_due_jobs',
+    'PublicationWorker',
+    'RateLimiter',
+]
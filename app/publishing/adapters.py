@@ -0,0 +1,150 @@
+"""
+Social network adapters
+
+An adapter delivers one rendered caption to one network and returns the id of
+the created post (if the network gives one). Adapters are looked up by name in
+``ADAPTERS``; each network uses the adapter set in ``PUBLICATION_ADAPTERS``
+(``network=adapter`` pairs) or ``PUBLICATION_DEFAULT_ADAPTER``.
+
+Built-in adapters:
+
+- ``file``: appends the message as a JSON line to
+  ``PUBLICATION_OUTBOX_DIR/<network>.jsonl`` (local stand-in, used in tests)
+- ``webhook``: POSTs the message as JSON to ``PUBLICATION_WEBHOOK_URL``
+  (``{network}`` in the URL is replaced by the network name), reusing
+  keep-alive connections
+
+Adapters are called from worker threads and must be thread-safe. They receive
+a plain ``PublicationMessage`` snapshot, never ORM objects.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass(frozen=True)
+class PublicationMessage:
+    """Everything an adapter needs to publish one job"""
+
+    job_id: int
+    publication_id: int
+    offer_id: int
+    network: str
+    caption: str
+    attempt: int = 1
+    offer_url: str | None = None
+    image_url: str | None = None
+
+
+class PublicationError(Exception):
+    """Delivery failed; ``retryable`` tells the worker whether to try again"""
+
+    def __init__(self, message: str, retryable: bool = True) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class PublicationAdapter(ABC):
+    """Base class for network adapters"""
+
+    def __init__(self, config: dict) -> None:
+        self.config = config
+
+    @abstractmethod
+    def publish(self, message: PublicationMessage) -> str | None:
+        """Deliver the message and return the external post id, if any"""
+
+    def close(self) -> None:
+        """Release connections/files when the worker stops"""
+
+
+class FileAdapter(PublicationAdapter):
+    """Append messages to one JSON Lines file per network"""
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        self.outbox_dir = Path(config["PUBLICATION_OUTBOX_DIR"])
+        self.outbox_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def publish(self, message: PublicationMessage) -> str | None:
+        line = json.dumps(asdict(message), ensure_ascii=False)
+        try:
+            with self._lock, open(self.outbox_dir / f"{message.network}.jsonl", "a", encoding="utf-8") as outbox:
+                outbox.write(line + "\n")
+        except OSError as exc:
+            raise PublicationError(f"Falha ao gravar na caixa de saída: {exc}") from exc
+        return f"{message.network}-{message.job_id}"
+
+
+class WebhookAdapter(PublicationAdapter):
+    """POST messages to an HTTP endpoint (bridge/bot service)"""
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        self.url = config.get("PUBLICATION_WEBHOOK_URL")
+        if not self.url:
+            raise ValueError("PUBLICATION_WEBHOOK_URL não configurada.")
+        self.timeout = config.get("PUBLICATION_WEBHOOK_TIMEOUT", 10)
+        self.session = requests.Session()
+        # One pooled connection per concurrent delivery
+        pool_size = max(config.get("PUBLICATION_WORKER_THREADS", 16), 1)
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+
+    def publish(self, message: PublicationMessage) -> str | None:
+        url = self.url.replace("{network}", message.network)
+        try:
+            response = self.session.post(url, json=asdict(message), timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise PublicationError(f"Erro de conexão: {exc}") from exc
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise PublicationError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise PublicationError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
+
+        try:
+            external_id = response.json().get("id")
+        except (ValueError, AttributeError):
+            external_id = None
+        return str(external_id) if external_id is not None else None
+
+    def close(self) -> None:
+        self.session.close()
+
+
+ADAPTERS: dict[str, Callable[[dict], PublicationAdapter]] = {
+    "file": FileAdapter,
+    "webhook": WebhookAdapter,
+}
+
+
+def register_adapter(name: str, factory: Callable[[dict], PublicationAdapter]) -> None:
+    """Make an adapter available to ``PUBLICATION_ADAPTERS`` under ``name``"""
+    ADAPTERS[name] = factory
+
+
+def parse_mapping(value: str | None) -> dict[str, str]:
+    """Parse ``key=value,key=value`` settings (keys lowercased)"""
+    mapping = {}
+    for item in (value or "").split(","):
+        key, sep, setting = item.partition("=")
+        if sep and key.strip():
+            mapping[key.strip().lower()] = setting.strip()
+    return mapping
+
+
+def adapter_name_for(network: str, config: dict) -> str:
+    """Name of the adapter configured for a network"""
+    overrides = parse_mapping(config.get("PUBLICATION_ADAPTERS"))
+    return overrides.get(network.lower(), config.get("PUBLICATION_DEFAULT_ADAPTER", "file"))
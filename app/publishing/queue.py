@@ -0,0 +1,311 @@
+"""
+Publication job queue
+
+Jobs live in the ``publication_jobs`` table, one per (publication, network),
+so the queue survives restarts and is shared by every worker process. A job
+goes (``scheduled`` ->) ``pending`` -> ``running`` (claimed by a worker) ->
+``done`` or back to ``pending`` with a backoff delay, until
+``PUBLICATION_MAX_ATTEMPTS`` is reached and it is marked ``failed``.
+
+Claims select the oldest available jobs of a network (``SKIP LOCKED`` where
+the database supports it) and flip them to ``running`` with a conditional
+UPDATE, so two workers never deliver the same job. Jobs left ``running`` by a
+crashed worker are put back in the queue after ``PUBLICATION_JOB_TIMEOUT``
+seconds.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from ..captions import render_offer_captions
+from ..extensions import db
+from ..models import (
+    Offer,
+    Product,
+    Publication,
+    PublicationJob,
+    PublicationJobStatus,
+    User,
+)
+from .adapters import PublicationMessage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JobResult:
+    """Outcome of one delivery attempt"""
+
+    job_id: int
+    publication_id: int
+    attempt: int
+    external_id: str | None = None
+    error: str | None = None
+    retryable: bool = True
+    released: bool = False  # Not attempted (worker stopping); back to the queue as is
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.released
+
+
+def default_worker_id() -> str:
+    """Identify the worker process in ``locked_by``"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ============================================================================
+# ENQUEUE
+# ============================================================================
+
+def enqueue_publication(
+    publication: Publication,
+    networks: Iterable[str],
+    caption: Optional[str] = None,
+    user: Optional[User] = None,
+    scheduled_for: Optional[datetime] = None,
+) -> list[PublicationJob]:
+    """
+    Add one job per network to a (not yet committed) publication
+
+    Args:
+        publication: Publication with offer and template set
+        networks: Networks to publish to
+        caption: Text used for every network; when empty the template is
+            rendered for each network (custom template, formatting, prefix
+            and suffix)
+        user: User publishing, for the global contact placeholders
+        scheduled_for: UTC time to publish at; jobs stay ``scheduled`` until
+            then (None or a past time = publish now)
+
+    Returns:
+        The created jobs
+    """
+    networks = list(dict.fromkeys(network.strip().lower() for network in networks if network.strip()))
+    if caption:
+        captions = {network: caption for network in networks}
+    else:
+        rendered, _ = render_offer_captions(publication.template, [publication.offer.id], networks, user)
+        captions = {item["network"]: item["text"] for item in rendered}
+
+    now = datetime.utcnow()
+    scheduled = scheduled_for is not None and scheduled_for > now
+    publication.scheduled_for = scheduled_for
+    jobs = [
+        PublicationJob(
+            network=network,
+            caption=captions.get(network, publication.caption),
+            status=PublicationJobStatus.SCHEDULED if scheduled else PublicationJobStatus.PENDING,
+            available_at=scheduled_for if scheduled else now,
+        )
+        for network in networks
+    ]
+    publication.jobs.extend(jobs)
+    return jobs
+
+
+# ============================================================================
+# CLAIMING
+# ============================================================================
+
+def pending_networks(now: Optional[datetime] = None) -> list[str]:
+    """Networks with at least one job available now"""
+    now = now or datetime.utcnow()
+    return db.session.scalars(
+        select(PublicationJob.network).where(
+            PublicationJob.status == PublicationJobStatus.PENDING,
+            PublicationJob.available_at <= now,
+        ).distinct()
+    ).all()
+
+
+def claim_jobs(worker_id: str, network: str, limit: int) -> list[PublicationMessage]:
+    """
+    Claim up to ``limit`` available jobs of a network for a worker
+
+    Returns:
+        Messages for the claimed jobs, oldest first
+    """
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    job_ids = db.session.scalars(
+        select(PublicationJob.id)
+        .where(
+            PublicationJob.status == PublicationJobStatus.PENDING,
+            PublicationJob.network == network,
+            PublicationJob.available_at <= now,
+        )
+        .order_by(PublicationJob.available_at, PublicationJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not job_ids:
+        db.session.commit()
+        return []
+
+    # Only jobs still pending are taken: a concurrent worker may have won some
+    db.session.execute(
+        update(PublicationJob)
+        .where(PublicationJob.id.in_(job_ids), PublicationJob.status == PublicationJobStatus.PENDING)
+        .values(
+            status=PublicationJobStatus.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=PublicationJob.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.session.execute(
+        select(
+            PublicationJob.id,
+            PublicationJob.publication_id,
+            PublicationJob.network,
+            PublicationJob.caption,
+            PublicationJob.attempts,
+            Publication.offer_id,
+            Offer.offer_url,
+            Product.image_url,
+        )
+        .join(Publication, Publication.id == PublicationJob.publication_id)
+        .join(Offer, Offer.id == Publication.offer_id)
+        .join(Product, Product.id == Offer.product_id)
+        .where(
+            PublicationJob.id.in_(job_ids),
+            PublicationJob.status == PublicationJobStatus.RUNNING,
+            PublicationJob.locked_by == worker_id,
+        )
+        .order_by(PublicationJob.available_at, PublicationJob.id)
+    ).all()
+    db.session.commit()
+
+    return [
+        PublicationMessage(
+            job_id=row.id,
+            publication_id=row.publication_id,
+            offer_id=row.offer_id,
+            network=row.network,
+            caption=row.caption,
+            attempt=row.attempts,
+            offer_url=row.offer_url,
+            image_url=row.image_url,
+        )
+        for row in rows
+    ]
+
+
+def requeue_stale_jobs(timeout: Optional[int] = None) -> int:
+    """
+    Put back jobs left running longer than ``timeout`` seconds (crashed worker)
+
+    Returns:
+        Number of jobs requeued
+    """
+    timeout = timeout if timeout is not None else current_app.config.get("PUBLICATION_JOB_TIMEOUT", 300)
+    result = db.session.execute(
+        update(PublicationJob)
+        .where(
+            PublicationJob.status == PublicationJobStatus.RUNNING,
+            PublicationJob.locked_at < datetime.utcnow() - timedelta(seconds=timeout),
+        )
+        .values(status=PublicationJobStatus.PENDING, locked_by=None, locked_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+def record_results(worker_id: str, results: Iterable[JobResult]) -> int:
+    """
+    Store a batch of delivery outcomes in one transaction
+
+    Only the jobs still ``running`` under ``worker_id`` are updated. A job
+    requeued by ``requeue_stale_jobs`` while it was being delivered may have
+    been claimed again by another worker, whose outcome must not be
+    overwritten.
+
+    Returns:
+        Number of outcomes dropped because the job was no longer ours
+    """
+    results = list(results)
+    if not results:
+        return 0
+
+    owned = set(db.session.scalars(
+        select(PublicationJob.id)
+        .where(
+            PublicationJob.id.in_([result.job_id for result in results]),
+            PublicationJob.status == PublicationJobStatus.RUNNING,
+            PublicationJob.locked_by == worker_id,
+        )
+        .with_for_update()
+    ))
+    lost = len(results) - sum(1 for result in results if result.job_id in owned)
+    if lost:
+        logger.warning("%s resultado(s) descartado(s): job(s) devolvido(s) à fila ou com outro worker", lost)
+    results = [result for result in results if result.job_id in owned]
+    if not results:
+        db.session.commit()
+        return lost
+
+    now = datetime.utcnow()
+    max_attempts = current_app.config.get("PUBLICATION_MAX_ATTEMPTS", 5)
+    retry_delay = current_app.config.get("PUBLICATION_RETRY_DELAY", 30)
+
+    rows = []
+    for result in results:
+        row = {"id": result.job_id, "locked_by": None, "locked_at": None}
+        if result.released:
+            row.update(status=PublicationJobStatus.PENDING, attempts=result.attempt - 1)
+        elif result.ok:
+            row.update(
+                status=PublicationJobStatus.DONE,
+                finished_at=now,
+                external_id=result.external_id,
+                last_error=None,
+            )
+        elif result.retryable and result.attempt < max_attempts:
+            row.update(
+                status=PublicationJobStatus.PENDING,
+                available_at=now + timedelta(seconds=retry_delay * 2 ** (result.attempt - 1)),
+                last_error=result.error,
+            )
+        else:
+            row.update(status=PublicationJobStatus.FAILED, finished_at=now, last_error=result.error)
+        rows.append(row)
+
+    # Bulk UPDATE by primary key (one executemany per set of columns), still
+    # guarded in case the lock above is a no-op (SQLite)
+    db.session.execute(
+        update(PublicationJob)
+        .where(
+            PublicationJob.status == PublicationJobStatus.RUNNING,
+            PublicationJob.locked_by == worker_id,
+        )
+        .execution_options(synchronize_session=None),
+        rows,
+    )
+
+    published_ids = {result.publication_id for result in results if result.ok}
+    if published_ids:
+        db.session.execute(
+            update(Publication)
+            .where(Publication.id.in_(published_ids), Publication.published_at.is_(None))
+            .values(published_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return lost
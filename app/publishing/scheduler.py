@@ -0,0 +1,98 @@
+"""
+Scheduled publications
+
+Jobs of a publication with ``scheduled_for`` in the future are created with
+status ``scheduled`` and ``available_at = scheduled_for``; workers never see
+them, so tens of thousands of future posts don't slow down claiming.
+
+The scheduler moves due jobs to ``pending`` in batches of
+``PUBLICATION_SCHEDULER_BATCH`` (one batch per tick, so the first batch is
+delivered while the rest of a backlog waits) and reports when the next job is
+due, using only the ``(status, available_at)`` index: one "oldest scheduled
+job" lookup instead of a scan of the schedule. Workers run it in their dispatcher loop and
+sleep exactly until the next due job (or the poll interval, to notice new
+schedules added by other processes). Several workers can run it at once: the
+promotion UPDATE only touches jobs still ``scheduled``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from ..extensions import db
+from ..models import PublicationJob, PublicationJobStatus
+
+
+def next_due_at() -> Optional[datetime]:
+    """When the earliest scheduled job is due (None if nothing is scheduled)"""
+    return db.session.scalar(
+        select(PublicationJob.available_at)
+        .where(PublicationJob.status == PublicationJobStatus.SCHEDULED)
+        .order_by(PublicationJob.available_at)
+        .limit(1)
+    )
+
+
+def promote_due_jobs(now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+    """
+    Hand one batch of due scheduled jobs over to the workers
+
+    Returns:
+        Number of jobs moved to ``pending``
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or current_app.config.get("PUBLICATION_SCHEDULER_BATCH", 500)
+
+    due_ids = db.session.scalars(
+        select(PublicationJob.id)
+        .where(
+            PublicationJob.status == PublicationJobStatus.SCHEDULED,
+            PublicationJob.available_at <= now,
+        )
+        .order_by(PublicationJob.available_at)
+        .limit(batch_size)
+    ).all()
+    if not due_ids:
+        db.session.commit()
+        return 0
+
+    result = db.session.execute(
+        update(PublicationJob)
+        .where(PublicationJob.id.in_(due_ids), PublicationJob.status == PublicationJobStatus.SCHEDULED)
+        .values(status=PublicationJobStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+class PublicationScheduler:
+    """Promote scheduled jobs when they are due and tell how long to sleep"""
+
+    def __init__(self, batch_size: Optional[int] = None) -> None:
+        self.batch_size = batch_size
+        self.promoted = 0
+
+    def tick(self) -> Optional[float]:
+        """
+        Promote one batch of due jobs
+
+        Returns:
+            Seconds until the next scheduled job: 0 when more jobs are already
+            due, None if nothing is scheduled
+        """
+        batch_size = self.batch_size or current_app.config.get("PUBLICATION_SCHEDULER_BATCH", 500)
+        promoted = promote_due_jobs(batch_size=batch_size)
+        self.promoted += promoted
+        if promoted >= batch_size:
+            return 0.0
+
+        due_at = next_due_at()
+        if due_at is None:
+            return None
+        return max((due_at - datetime.utcnow()).total_seconds(), 0.0)
+
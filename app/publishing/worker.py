@@ -0,0 +1,249 @@
+"""
+Publication worker
+
+One worker process runs a dispatcher loop (the only code touching the
+database) and a thread pool that calls the network adapters:
+
+1. move scheduled jobs that are due to the queue (see ``scheduler``)
+2. claim available jobs of each network, up to the free slots of that network
+   (``PUBLICATION_NETWORK_CONCURRENCY``) and of the pool
+3. deliver them in parallel; each network has a token bucket so it is never
+   called faster than ``PUBLICATION_NETWORK_RATE`` messages per second
+4. write the finished deliveries back in one transaction per batch
+
+``PUBLICATION_NETWORK_LIMITS`` overrides the limits per network with
+``network=concurrency:rate`` pairs (e.g. ``whatsapp=2:0.5,telegram=8:20``).
+When several processes are started, each one gets its share of the limits so
+that the totals still hold.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import Flask
+from rate_limit import RateLimiter
+
+from .adapters import (
+    ADAPTERS,
+    PublicationAdapter,
+    PublicationError,
+    PublicationMessage,
+    adapter_name_for,
+    parse_mapping,
+)
+from .queue import (
+    JobResult,
+    claim_jobs,
+    default_worker_id,
+    pending_networks,
+    record_results,
+    requeue_stale_jobs,
+)
+from .scheduler import PublicationScheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class NetworkLimit:
+    concurrency: int
+    rate: float
+
+
+def parse_network_limits(config: dict, share: float = 1.0) -> tuple[NetworkLimit, dict[str, NetworkLimit]]:
+    """
+    Read the default and per-network limits from the configuration
+
+    Args:
+        config: Flask configuration
+        share: Fraction of the limits given to this process
+
+    Returns:
+        Tuple of (default limit, {network: limit})
+    """
+    def scaled(concurrency: int, rate: float) -> NetworkLimit:
+        return NetworkLimit(max(math.ceil(concurrency * share), 1), rate * share)
+
+    default = scaled(
+        config.get("PUBLICATION_NETWORK_CONCURRENCY", 4),
+        config.get("PUBLICATION_NETWORK_RATE", 5.0),
+    )
+    limits = {}
+    for network, value in parse_mapping(config.get("PUBLICATION_NETWORK_LIMITS")).items():
+        concurrency, _, rate = value.partition(":")
+        try:
+            limits[network] = scaled(
+                int(concurrency) if concurrency else default.concurrency,
+                float(rate) if rate else default.rate / share,
+            )
+        except ValueError:
+            logger.warning("Limite inválido para %s: %s", network, value)
+    return default, limits
+
+
+class PublicationWorker:
+    """Deliver queued publication jobs with a pool of threads"""
+
+    def __init__(
+        self,
+        app: Flask,
+        threads: Optional[int] = None,
+        worker_id: Optional[str] = None,
+        share: float = 1.0,
+    ) -> None:
+        self.app = app
+        self.threads = threads or app.config.get("PUBLICATION_WORKER_THREADS", 16)
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = app.config.get("PUBLICATION_POLL_INTERVAL", 2.0)
+        self.default_limit, self.limits = parse_network_limits(app.config, share)
+        self.scheduler = PublicationScheduler()
+        self.stop_event = threading.Event()
+        self._limiters: dict[str, RateLimiter] = {}
+        self._adapters: dict[str, PublicationAdapter] = {}
+        self._in_flight: dict[Future, PublicationMessage] = {}
+        self._running: Counter = Counter()
+        self.processed = 0
+
+    def limit_for(self, network: str) -> NetworkLimit:
+        return self.limits.get(network, self.default_limit)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    # ------------------------------------------------------------------
+    # Dispatcher loop
+    # ------------------------------------------------------------------
+
+    def run(self, drain: bool = False) -> int:
+        """
+        Process jobs until ``stop()`` is called
+
+        Args:
+            drain: Return as soon as no job is available or in progress
+
+        Returns:
+            Number of deliveries attempted
+        """
+        with self.app.app_context(), ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="publication"
+        ) as executor:
+            requeue_every = max(self.app.config.get("PUBLICATION_JOB_TIMEOUT", 300) / 2, self.poll_interval)
+            next_requeue = 0.0
+            next_tick = 0.0
+            try:
+                while not self.stop_event.is_set():
+                    now = time.monotonic()
+                    if now >= next_requeue:
+                        requeued = requeue_stale_jobs()
+                        if requeued:
+                            logger.warning("%s job(s) abandonado(s) devolvido(s) à fila", requeued)
+                        next_requeue = now + requeue_every
+
+                    if now >= next_tick:
+                        # Wake up exactly when the next scheduled job is due
+                        until_due = self.scheduler.tick()
+                        wait_for = self.poll_interval if until_due is None else min(until_due, self.poll_interval)
+                        next_tick = time.monotonic() + wait_for
+
+                    claimed = self._claim(executor)
+                    timeout = max(next_tick - time.monotonic(), 0.0)
+                    if not self._in_flight:
+                        if drain and not claimed:
+                            break
+                        self.stop_event.wait(timeout)
+                        continue
+                    self._collect(timeout=timeout)
+            finally:
+                # Finish and record what was already claimed
+                self.stop_event.set()
+                while self._in_flight:
+                    self._collect(timeout=None)
+                for adapter in self._adapters.values():
+                    adapter.close()
+        return self.processed
+
+    def _claim(self, executor: ThreadPoolExecutor) -> int:
+        free = self.threads - len(self._in_flight)
+        if free <= 0:
+            return 0
+
+        claimed = 0
+        for network in pending_networks():
+            slots = min(self.limit_for(network).concurrency - self._running[network], free)
+            if slots <= 0:
+                continue
+            messages = claim_jobs(self.worker_id, network, slots)
+            if not messages:
+                continue
+
+            try:
+                adapter = self._adapter_for(network)
+            except (KeyError, ValueError) as exc:
+                record_results(
+                    self.worker_id,
+                    (JobResult(m.job_id, m.publication_id, m.attempt, error=str(exc), retryable=False)
+                     for m in messages),
+                )
+                continue
+
+            limiter = self._limiter_for(network)
+            for message in messages:
+                future = executor.submit(self._deliver, adapter, limiter, message)
+                self._in_flight[future] = message
+                self._running[network] += 1
+            claimed += len(messages)
+            free -= len(messages)
+            if free <= 0:
+                break
+        return claimed
+
+    def _collect(self, timeout: Optional[float]) -> None:
+        done, _ = wait(list(self._in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            return
+        results = []
+        for future in done:
+            message = self._in_flight.pop(future)
+            self._running[message.network] -= 1
+            results.append(future.result())
+        record_results(self.worker_id, results)
+        self.processed += len(results)
+
+    # ------------------------------------------------------------------
+    # Delivery (worker threads)
+    # ------------------------------------------------------------------
+
+    def _deliver(self, adapter: PublicationAdapter, limiter: RateLimiter, message: PublicationMessage) -> JobResult:
+        if not limiter.acquire(self.stop_event):
+            # Stopped while waiting for the rate limit: not an attempt
+            return JobResult(message.job_id, message.publication_id, message.attempt, released=True)
+        try:
+            external_id = adapter.publish(message)
+        except PublicationError as exc:
+            return JobResult(message.job_id, message.publication_id, message.attempt,
+                             error=str(exc), retryable=exc.retryable)
+        except Exception as exc:  # noqa: BLE001 - adapter bugs must not kill the worker
+            logger.exception("Erro inesperado publicando job %s", message.job_id)
+            return JobResult(message.job_id, message.publication_id, message.attempt, error=repr(exc))
+        return JobResult(message.job_id, message.publication_id, message.attempt, external_id=external_id)
+
+    def _adapter_for(self, network: str) -> PublicationAdapter:
+        name = adapter_name_for(network, self.app.config)
+        if name not in self._adapters:
+            if name not in ADAPTERS:
+                raise KeyError(f"Adaptador de publicação desconhecido: {name}")
+            self._adapters[name] = ADAPTERS[name](self.app.config)
+        return self._adapters[name]
+
+    def _limiter_for(self, network: str) -> RateLimiter:
+        if network not in self._limiters:
+            self._limiters[network] = RateLimiter(self.limit_for(network).rate)
+        return self._limiters[network]
@@ -0,0 +1,146 @@
+"""
+Process-wide cache of reference data
+
+Sellers, categories, manufacturers, templates, namespaces and social network
+configurations fill dropdowns and share dialogs on most pages but change a few
+times a week. They are loaded once per process and reused across requests.
+
+Each model has a version number, bumped after a commit that inserted, updated
+or deleted one of its rows (SQLAlchemy mapper events). An entry is reloaded
+when the version of any model it depends on changes, or after
+``REFERENCE_CACHE_TTL`` seconds so that writes made by other worker processes
+or raw SQL scripts are eventually picked up.
+
+Cached objects are detached from any session; ``get_reference_data()`` merges
+them into the request session without querying the database.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from .extensions import db
+from .models import (
+    Category,
+    Manufacturer,
+    Namespace,
+    NamespaceScope,
+    Seller,
+    SocialNetworkConfig,
+    Template,
+)
+
+
+# name -> (models it depends on, statement factory)
+REFERENCE_QUERIES = {
+    "sellers": (
+        (Seller,),
+        lambda: select(Seller).where(Seller.active.is_(True)).order_by(Seller.name),
+    ),
+    "categories": (
+        (Category,),
+        lambda: select(Category).where(Category.active.is_(True)).order_by(Category.name),
+    ),
+    "manufacturers": (
+        (Manufacturer,),
+        lambda: select(Manufacturer).where(Manufacturer.active.is_(True)).order_by(Manufacturer.name),
+    ),
+    "templates": (
+        (Template, SocialNetworkConfig),
+        lambda: select(Template).options(*Template.eager_options()).order_by(Template.name),
+    ),
+    # Namespaces available in share templates
+    "namespaces": (
+        (Namespace,),
+        lambda: select(Namespace).where(
+            Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
+        ).order_by(Namespace.scope, Namespace.name),
+    ),
+    "social_networks": (
+        (SocialNetworkConfig,),
+        lambda: select(SocialNetworkConfig).where(
+            SocialNetworkConfig.active.is_(True)
+        ).order_by(SocialNetworkConfig.network),
+    ),
+    "all_social_networks": (
+        (SocialNetworkConfig,),
+        lambda: select(SocialNetworkConfig).order_by(SocialNetworkConfig.network),
+    ),
+}
+
+CACHED_MODELS = (Seller, Category, Manufacturer, Template, Namespace, SocialNetworkConfig)
+
+_versions: dict[type, int] = defaultdict(int)
+_entries: dict[str, tuple] = {}  # name -> (versions, loaded_at, objects)
+_lock = threading.Lock()
+
+_CHANGED_KEY = "reference_data_changed"
+
+
+def get_reference_data(name: str) -> list:
+    """
+    Get cached reference rows, attached to the current session
+
+    Args:
+        name: One of REFERENCE_QUERIES
+
+    Returns:
+        List of model instances
+    """
+    models, statement = REFERENCE_QUERIES[name]
+    ttl = current_app.config.get("REFERENCE_CACHE_TTL", 300)
+
+    with _lock:
+        versions = tuple(_versions[model] for model in models)
+        entry = _entries.get(name)
+
+    if entry is not None and entry[0] == versions and time.monotonic() - entry[1] < ttl:
+        objects = entry[2]
+    else:
+        # Private session: its objects are never expired by a request commit
+        with Session(db.engine, expire_on_commit=False) as session:
+            objects = session.scalars(statement()).all()
+        with _lock:
+            if tuple(_versions[model] for model in models) == versions:
+                _entries[name] = (versions, time.monotonic(), objects)
+
+    return [db.session.merge(obj, load=False) for obj in objects]
+
+
+def invalidate_reference_data(*models: type) -> None:
+    """Force a reload of entries depending on the given models (all if none)"""
+    with _lock:
+        for model in models or CACHED_MODELS:
+            _versions[model] += 1
+
+
+def _on_write(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).add(mapper.class_)
+
+
+def _after_commit(session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed:
+        invalidate_reference_data(*changed)
+
+
+def _after_rollback(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+for _model in CACHED_MODELS:
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _on_write)
+
+# Versions are bumped only once the change is committed, so a concurrent
+# reload can't cache rows from before the commit under the new version
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from sqlalchemy import or_
 
+from ..captions import MAX_BATCH_CAPTIONS, render_offer_captions
 from ..extensions import db
 from ..models import (
     Category,
@@ -17,19 +18,37 @@ from ..models import (
     OfferNamespaceValue,
     Product,
     Publication,
+    PublicationJob,
     RoleEnum,
     Seller,
     Template,
     User,
+    UserToken,
     Wishlist,
     WishlistItem,
     WishlistVisibility,
 )
-from ..security import basic_auth, role_required, token_auth
+from ..price_history import RESOLUTIONS, pick_resolution, price_series
+from ..publishing import ADAPTERS, adapter_name_for, enqueue_publication
+from ..search import apply_search, search_terms
+from ..security import basic_auth, role_required, token_auth, token_cache
+from ..utils.pagination import keyset_paginate, parse_limit
+from ..utils.streaming import parse_stream_format, stream_query
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
 
+def _parse_datetime(value: str) -> datetime:
+    """ISO 8601 date/datetime as naive UTC (no offset = UTC); ValueError if invalid"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise ValueError("Formato de data inválido.") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
 @api_bp.route("/health")
 def health() -> tuple[dict, int]:
     return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}, 200
@@ -67,6 +86,22 @@ def issue_token():
     }, 201
 
 
+@api_bp.route("/auth/revoke", methods=["POST"])
+@token_auth.login_required
+def revoke_token():
+    user_token = UserToken.query.filter_by(token=token_auth.get_auth().token).first_or_404()
+    user_token.revoked = True
+    db.session.commit()
+    return {"message": "Token revogado."}, 200
+
+
+@api_bp.route("/auth/token-cache", methods=["GET"])
+@token_auth.login_required
+@role_required(RoleEnum.ADMIN)
+def token_cache_stats():
+    return token_cache.stats(), 200
+
+
 @api_bp.route("/users", methods=["POST"])
 def register_user():
     data = request.get_json() or {}
@@ -108,7 +143,14 @@ def list_users():
     role = request.args.get("role")
     if role:
         query = query.filter_by(role=RoleEnum(role))
-    users = [user.to_dict() for user in query.order_by(User.created_at.desc()).all()]
+    try:
+        stream_format = parse_stream_format(request.args.get("stream"))
+    except ValueError as exc:
+        return {"message": str(exc)}, 400
+    query = query.options(*User.eager_options()).order_by(User.created_at.desc())
+    if stream_format:
+        return stream_query(query, stream_format)
+    users = [user.to_dict() for user in query.all()]
     return jsonify(users)
 
 
@@ -237,6 +279,13 @@ def list_wishlists():
             query = query.filter_by(visibility=WishlistVisibility(visibility))
         except ValueError:
             return {"message": "Visibilidade inválida."}, 400
+    try:
+        stream_format = parse_stream_format(request.args.get("stream"))
+    except ValueError as exc:
+        return {"message": str(exc)}, 400
+    query = query.options(*Wishlist.eager_options())
+    if stream_format:
+        return stream_query(query.order_by(Wishlist.id), stream_format)
     wishlists = [wishlist.to_dict() for wishlist in query.all()]
     return jsonify(wishlists)
 
@@ -291,13 +340,16 @@ def create_offer():
             expires_at = datetime.fromisoformat(data["expires_at"])
         except ValueError:
             return {"message": "Formato de data inválido."}, 400
+    offer_url = (data.get("offer_url") or "").strip() or None
+    if offer_url and Offer.query.filter_by(offer_url=offer_url).first():
+        return {"message": "Já existe uma oferta com esta URL."}, 409
 
     offer = Offer(
         product=product,
         vendor_name=data["vendor_name"],
         price=price_value,
         currency=data.get("currency", "BRL"),
-        offer_url=data.get("offer_url"),
+        offer_url=offer_url,
         expires_at=expires_at,
         created_by=token_auth.current_user(),
     )
@@ -359,8 +411,75 @@ def list_offers():
             )
         )
 
-    offers = [offer.to_dict() for offer in query.order_by(Offer.created_at.desc()).all()]
-    return jsonify(offers)
+    query = query.options(*Offer.eager_options())
+
+    try:
+        stream_format = parse_stream_format(request.args.get("stream"))
+        if stream_format:
+            return stream_query(query.order_by(Offer.created_at.desc(), Offer.id.desc()), stream_format)
+        limit = parse_limit(request.args.get("limit"))
+        page, next_cursor = keyset_paginate(query, Offer, limit, request.args.get("cursor"))
+    except ValueError as exc:
+        return {"message": str(exc)}, 400
+
+    return jsonify({
+        "items": [offer.to_dict() for offer in page],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    })
+
+
+@api_bp.route("/offers/<int:offer_id>/history", methods=["GET"])
+def offer_price_history(offer_id: int):
+    offer = Offer.query.get_or_404(offer_id)
+    try:
+        end = _parse_datetime(request.args["to"]) if request.args.get("to") else datetime.utcnow()
+        start = _parse_datetime(request.args["from"]) if request.args.get("from") else end - timedelta(days=30)
+    except ValueError as exc:
+        return {"message": str(exc)}, 400
+    if start >= end:
+        return {"message": "O início do período deve ser anterior ao fim."}, 400
+
+    resolution = request.args.get("resolution", "auto").lower()
+    if resolution == "auto":
+        resolution = pick_resolution(start, end)
+    elif resolution not in RESOLUTIONS:
+        return {"message": f"Resolução inválida: use auto, {', '.join(RESOLUTIONS)}."}, 400
+
+    return jsonify({
+        "offer_id": offer.id,
+        "currency": offer.currency,
+        "resolution": resolution,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": price_series(offer.id, start, end, resolution),
+    })
+
+
+@api_bp.route("/search", methods=["GET"])
+def search_offers():
+    search = request.args.get("q", "").strip()
+    if not search_terms(search):
+        return {"message": "Informe o termo de busca (q)."}, 400
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as exc:
+        return {"message": str(exc)}, 400
+
+    query = apply_search(Offer.query.join(Product), search)
+    query = query.outerjoin(Seller, Offer.seller_id == Seller.id)\
+        .filter(
+            or_(
+                Seller.active == True,
+                Offer.seller_id.is_(None)
+            )
+        )
+    offers = query.options(*Offer.eager_options()).order_by(Offer.created_at.desc()).limit(limit).all()
+    return jsonify({
+        "query": search,
+        "items": [offer.to_dict() for offer in offers],
+        "limit": limit,
+    })
 
 
 @api_bp.route("/templates", methods=["POST"])
@@ -384,7 +503,7 @@ def create_template():
 
 @api_bp.route("/templates", methods=["GET"])
 def list_templates():
-    templates = [template.to_dict() for template in Template.query.all()]
+    templates = [template.to_dict() for template in Template.query.options(*Template.eager_options()).all()]
     return jsonify(templates)
 
 
@@ -457,6 +576,43 @@ def get_all_custom_templates_for_template(template_id: int):
     return jsonify([c.to_dict() for c in customs])
 
 
+@api_bp.route("/captions/render", methods=["POST"])
+@token_auth.login_required
+def render_captions():
+    data = request.get_json() or {}
+    offer_ids = data.get("offer_ids")
+    networks = data.get("networks")
+    coupon_ids = data.get("coupon_ids")
+    if not data.get("template_id") or not offer_ids or not networks:
+        return {"message": "Informe template_id, offer_ids e networks."}, 400
+    if (
+        not isinstance(offer_ids, list)
+        or not all(isinstance(value, int) for value in offer_ids)
+        or not isinstance(networks, list)
+        or not all(isinstance(value, str) and value for value in networks)
+        or (coupon_ids is not None and not (
+            isinstance(coupon_ids, list) and all(isinstance(value, int) for value in coupon_ids)
+        ))
+    ):
+        return {"message": "offer_ids e coupon_ids devem ser listas de IDs e networks uma lista de nomes."}, 400
+    if len(offer_ids) * len(networks) > MAX_BATCH_CAPTIONS:
+        return {"message": f"Limite de {MAX_BATCH_CAPTIONS} legendas por requisição."}, 400
+
+    template = Template.query.get_or_404(data["template_id"])
+    captions, missing = render_offer_captions(
+        template,
+        offer_ids,
+        networks,
+        user=token_auth.current_user(),
+        coupon_ids=coupon_ids,
+    )
+    return jsonify({
+        "template_id": template.id,
+        "captions": captions,
+        "missing_offer_ids": missing,
+    })
+
+
 @api_bp.route("/namespaces", methods=["POST"])
 @token_auth.login_required
 @role_required(RoleEnum.ADMIN, RoleEnum.EDITOR)
@@ -489,7 +645,7 @@ def list_namespaces():
             query = query.filter_by(scope=NamespaceScope(scope))
         except ValueError:
             return {"message": "Escopo inválido."}, 400
-    return jsonify([namespace.to_dict() for namespace in query.all()])
+    return jsonify([namespace.to_dict() for namespace in query.options(*Namespace.eager_options()).all()])
 
 
 @api_bp.route("/publications", methods=["POST"])
@@ -497,25 +653,77 @@ def list_namespaces():
 @role_required(RoleEnum.ADMIN, RoleEnum.EDITOR)
 def publish_offer():
     data = request.get_json() or {}
+    if not isinstance(data.get("offer_id"), int) or not isinstance(data.get("template_id"), int):
+        return {"message": "Informe offer_id e template_id (IDs numéricos)."}, 400
+    channels = data.get("channels")
+    if channels is not None and (
+        not isinstance(channels, list)
+        or not all(isinstance(value, str) and value.strip() for value in channels)
+    ):
+        return {"message": "channels deve ser uma lista de nomes de redes."}, 400
+
     offer = Offer.query.get_or_404(data["offer_id"])
     template = Template.query.get_or_404(data["template_id"])
-    caption = data.get("caption") or template.body
+    if channels is None:
+        channels = template.channel_list
+    # One job per network, in the order given
+    channels = list(dict.fromkeys(channel.strip().lower() for channel in channels if channel.strip()))
+    if not channels:
+        return {"message": "Informe ao menos um canal."}, 400
+    unknown = [
+        channel for channel in channels
+        if adapter_name_for(channel, current_app.config) not in ADAPTERS
+    ]
+    if unknown:
+        return {"message": f"Nenhum adaptador de publicação configurado para: {', '.join(unknown)}."}, 400
+
+    scheduled_for = None
+    if data.get("scheduled_for"):
+        try:
+            scheduled_for = _parse_datetime(data["scheduled_for"])
+        except ValueError as exc:
+            return {"message": str(exc)}, 400
+
+    user = token_auth.current_user()
     publication = Publication(
         offer=offer,
         template=template,
-        caption=caption,
-        channels=",".join(data.get("channels", template.channels.split(","))),
-        published_by=token_auth.current_user(),
-        published_at=datetime.utcnow(),
+        caption=data.get("caption") or template.body,
+        channels=",".join(channels),
+        published_by=user,
     )
+    # Delivered by the publication workers; published_at is set on the first success
+    jobs = enqueue_publication(publication, channels, data.get("caption"), user, scheduled_for)
     db.session.add(publication)
     db.session.commit()
-    return publication.to_dict(), 201
+    return {**publication.to_dict(), "job_ids": [job.id for job in jobs]}, 202
+
+
+@api_bp.route("/publications/<int:publication_id>", methods=["GET"])
+@token_auth.login_required
+def get_publication(publication_id: int):
+    publication = Publication.query.options(*Publication.eager_options()).get_or_404(publication_id)
+    return publication.to_dict(), 200
+
+
+@api_bp.route("/publications/jobs/<int:job_id>", methods=["GET"])
+@token_auth.login_required
+def get_publication_job(job_id: int):
+    job = PublicationJob.query.get_or_404(job_id)
+    return job.to_dict(), 200
 
 
 @api_bp.route("/publications", methods=["GET"])
+@token_auth.login_required
 def list_publications():
-    publications = [publication.to_dict() for publication in Publication.query.all()]
+    try:
+        stream_format = parse_stream_format(request.args.get("stream"))
+    except ValueError as exc:
+        return {"message": str(exc)}, 400
+    query = Publication.query.options(*Publication.eager_options())
+    if stream_format:
+        return stream_query(query.order_by(Publication.id), stream_format)
+    publications = [publication.to_dict() for publication in query.all()]
     return jsonify(publications)
 
 
@@ -7,8 +7,13 @@ from secrets import token_urlsafe
 from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 
+from ..captions import render_offer_caption
 from ..extensions import csrf, db
-from ..utils.upload import save_image, delete_image
+from ..reference_data import get_reference_data
+from ..search import apply_search
+from ..stats import get_dashboard_stats
+from ..utils.pagination import keyset_paginate
+from ..utils.upload import delete_image, save_product_image
 from ..forms import (
     GroupCreateForm,
     GroupMemberForm,
@@ -29,8 +34,6 @@ from ..models import (
     Coupon,
     Group,
     Manufacturer,
-    Namespace,
-    NamespaceScope,
     Offer,
     Product,
     RoleEnum,
@@ -64,8 +67,6 @@ def api_documentation():
 
 @web_bp.route("/")
 def index():
-    from datetime import datetime
-    
     # Get recent offers (only from active sellers)
     offers = Offer.query.outerjoin(Seller, Offer.seller_id == Seller.id)\
         .filter(
@@ -73,40 +74,17 @@ def index():
                 Seller.active == True,
                 Offer.seller_id.is_(None)
             )
-        ).order_by(Offer.created_at.desc()).limit(6).all()
+        ).options(*Offer.eager_options("seller")).order_by(Offer.created_at.desc()).limit(6).all()
     templates = Template.query.limit(4).all()
     
-    # Calculate statistics
-    total_offers = Offer.query.count()
-    total_coupons = Coupon.query.filter_by(active=True).count()
-    total_templates = Template.query.count()
-    
-    # Active offers (not expired)
-    active_offers = Offer.query.filter(
-        db.or_(
-            Offer.expires_at.is_(None),
-            Offer.expires_at > datetime.now()
-        )
-    ).count()
-    
-    # Calculate total savings (sum of discounts)
-    total_savings = 0
-    offers_with_discount = Offer.query.filter(Offer.old_price.isnot(None)).all()
-    for offer in offers_with_discount:
-        if offer.old_price and offer.price:
-            savings = float(offer.old_price) - float(offer.price)
-            if savings > 0:
-                total_savings += savings
+    # Cached SQL aggregates (see app/stats.py)
+    stats = get_dashboard_stats()
     
     return render_template(
         "index.html",
         offers=offers,
         templates=templates,
-        total_offers=total_offers,
-        total_coupons=total_coupons,
-        total_templates=total_templates,
-        active_offers=active_offers,
-        total_savings=total_savings,
+        **stats,
     )
 
 
@@ -143,7 +121,7 @@ def dashboard():
                 Seller.active == True,
                 Offer.seller_id.is_(None)
             )
-        ).order_by(Offer.created_at.desc()).limit(5).all()
+        ).options(*Offer.eager_options("seller")).order_by(Offer.created_at.desc()).limit(5).all()
     wishlists = Wishlist.query.filter_by(owner_id=current_user.id).all()
     return render_template(
         "dashboard.html",
@@ -449,52 +427,52 @@ def groups():
     )
 
 
-@web_bp.route("/ofertas", methods=["GET"])
-def offers():
-    """List offers with dynamic filters"""
-    from datetime import datetime
-    
-    # Get filter parameters
-    search = request.args.get("search", "").strip()
-    manufacturer_id = request.args.get("manufacturer", type=int)
-    category_id = request.args.get("category", type=int)
-    seller_id = request.args.get("seller", type=int)
-    min_price = request.args.get("min_price", type=float)
-    max_price = request.args.get("max_price", type=float)
-    active_only = request.args.get("active_only", "true").lower() == "true"
-    
+# Offer cards rendered per page on /ofertas (more are loaded on scroll)
+OFFERS_PAGE_SIZE = 24
+
+
+def _offer_filters() -> dict:
+    """Read the /ofertas filter parameters from the query string"""
+    return {
+        'search': request.args.get("search", "").strip(),
+        'manufacturer': request.args.get("manufacturer", type=int),
+        'category': request.args.get("category", type=int),
+        'seller': request.args.get("seller", type=int),
+        'min_price': request.args.get("min_price", type=float),
+        'max_price': request.args.get("max_price", type=float),
+        'active_only': request.args.get("active_only", "true").lower() == "true",
+    }
+
+
+def _filtered_offers_query(filters: dict):
+    """Offer query with the /ofertas filters applied"""
     # Build query
     query = Offer.query.join(Product)
     
-    # Filter by search term (product name, slug, vendor name)
-    if search:
-        search_filter = db.or_(
-            Product.name.ilike(f"%{search}%"),
-            Product.slug.ilike(f"%{search}%"),
-            Offer.vendor_name.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
+    # Filter by search term (product name, slug, vendor name), best matches first
+    if filters['search']:
+        query = apply_search(query, filters['search'])
     
     # Filter by manufacturer
-    if manufacturer_id:
-        query = query.filter(Offer.manufacturer_id == manufacturer_id)
+    if filters['manufacturer']:
+        query = query.filter(Offer.manufacturer_id == filters['manufacturer'])
     
     # Filter by category
-    if category_id:
-        query = query.filter(Offer.category_id == category_id)
+    if filters['category']:
+        query = query.filter(Offer.category_id == filters['category'])
     
     # Filter by seller
-    if seller_id:
-        query = query.filter(Offer.seller_id == seller_id)
+    if filters['seller']:
+        query = query.filter(Offer.seller_id == filters['seller'])
     
     # Filter by price range
-    if min_price is not None:
-        query = query.filter(Offer.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Offer.price <= max_price)
+    if filters['min_price'] is not None:
+        query = query.filter(Offer.price >= filters['min_price'])
+    if filters['max_price'] is not None:
+        query = query.filter(Offer.price <= filters['max_price'])
     
     # Filter by active offers (not expired)
-    if active_only:
+    if filters['active_only']:
         query = query.filter(
             db.or_(
                 Offer.expires_at.is_(None),
@@ -511,20 +489,85 @@ def offers():
             )
         )
     
-    offers = query.order_by(Offer.created_at.desc()).all()
+    return query.options(*Offer.eager_options("seller"))
+
+
+def _offers_page(filters: dict) -> tuple[list, str | None]:
+    """
+    Load one page of filtered offers
+
+    Browsing uses the keyset cursor (``cursor``), so every page costs the same;
+    search results are ranked by relevance and paged by ``offset`` instead.
+
+    Returns:
+        Tuple of (offers, URL of the next page fragment or None)
+
+    Raises:
+        ValueError: If the cursor or offset is invalid
+    """
+    query = _filtered_offers_query(filters)
+    next_args = {
+        key: value for key, value in request.args.items() if key not in ("cursor", "offset")
+    }
+    
+    if filters['search']:
+        offset = request.args.get("offset", 0, type=int)
+        if offset < 0:
+            raise ValueError("Offset inválido.")
+        offers = query.order_by(Offer.created_at.desc(), Offer.id.desc())\
+            .offset(offset).limit(OFFERS_PAGE_SIZE + 1).all()
+        has_more = len(offers) > OFFERS_PAGE_SIZE
+        offers = offers[:OFFERS_PAGE_SIZE]
+        if has_more:
+            next_args["offset"] = offset + OFFERS_PAGE_SIZE
+    else:
+        offers, next_cursor = keyset_paginate(query, Offer, OFFERS_PAGE_SIZE, request.args.get("cursor"))
+        if next_cursor:
+            next_args["cursor"] = next_cursor
+        has_more = next_cursor is not None
+    
+    next_url = url_for("web.offers_page", **next_args) if has_more else None
+    return offers, next_url
+
+
+def _offer_url_available(form, offer_id: int | None = None) -> bool:
+    """
+    Check that no other offer uses the submitted URL (it identifies offers in
+    bulk imports); empty URLs are normalized to None
+    """
+    form.offer_url.data = (form.offer_url.data or "").strip() or None
+    if form.offer_url.data is None:
+        return True
+    query = Offer.query.filter(Offer.offer_url == form.offer_url.data)
+    if offer_id is not None:
+        query = query.filter(Offer.id != offer_id)
+    if query.first() is None:
+        return True
+    flash("Já existe uma oferta com esta URL.", "warning")
+    return False
+
+
+@web_bp.route("/ofertas", methods=["GET"])
+def offers():
+    """List offers with dynamic filters (first page; the rest loads on scroll)"""
+    filters = _offer_filters()
+    try:
+        offers, next_url = _offers_page(filters)
+    except ValueError:
+        return redirect(url_for("web.offers", **{
+            key: value for key, value in request.args.items() if key not in ("cursor", "offset")
+        }))
     
     can_manage = current_user.is_authenticated and current_user.role in (RoleEnum.ADMIN, RoleEnum.EDITOR)
     
     # For share functionality
-    templates = Template.query.all()
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    templates = get_reference_data("templates")
+    namespaces = get_reference_data("namespaces")
     
     # Get all manufacturers, categories, and sellers for filter dropdowns
-    manufacturers = Manufacturer.query.filter_by(active=True).order_by(Manufacturer.name).all()
-    categories = Category.query.filter_by(active=True).order_by(Category.name).all()
-    sellers = Seller.query.filter_by(active=True).order_by(Seller.name).all()
+    manufacturers = get_reference_data("manufacturers")
+    categories = get_reference_data("categories")
+    sellers = get_reference_data("sellers")
     
     # Get active coupons for sharing
     active_coupons = Coupon.query.filter_by(active=True).filter(
@@ -535,10 +578,11 @@ def offers():
     ).order_by(Coupon.code).all()
     
     # Get social network configurations
-    social_configs = SocialNetworkConfig.query.filter_by(active=True).all()
+    social_configs = get_reference_data("social_networks")
     
     return render_template("offers_list.html", 
                          offers=offers, 
+                         next_url=next_url,
                          can_manage=can_manage,
                          templates=templates,
                          namespaces=namespaces,
@@ -547,15 +591,20 @@ def offers():
                          sellers=sellers,
                          active_coupons=active_coupons,
                          social_configs=social_configs,
-                         filters={
-                             'search': search,
-                             'manufacturer': manufacturer_id,
-                             'category': category_id,
-                             'seller': seller_id,
-                             'min_price': min_price,
-                             'max_price': max_price,
-                             'active_only': active_only
-                         })
+                         filters=filters)
+
+
+@web_bp.route("/ofertas/pagina", methods=["GET"])
+def offers_page():
+    """Next page of offer cards for infinite scroll (HTML fragment in JSON)"""
+    try:
+        offers, next_url = _offers_page(_offer_filters())
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    
+    can_manage = current_user.is_authenticated and current_user.role in (RoleEnum.ADMIN, RoleEnum.EDITOR)
+    html = render_template("components/offer_cards.html", offers=offers, can_manage=can_manage)
+    return jsonify({"html": html, "count": len(offers), "next_url": next_url})
 
 
 @web_bp.route("/ofertas/nova", methods=["GET", "POST"])
@@ -569,13 +618,11 @@ def create_offer():
     form = OfferCreateForm(prefix="offer")
     
     # Populate select fields with existing data
-    sellers = Seller.query.filter_by(active=True).order_by(Seller.name).all()
-    categories = Category.query.filter_by(active=True).order_by(Category.name).all()
-    manufacturers = Manufacturer.query.filter_by(active=True).order_by(Manufacturer.name).all()
-    templates = Template.query.all()
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    sellers = get_reference_data("sellers")
+    categories = get_reference_data("categories")
+    manufacturers = get_reference_data("manufacturers")
+    templates = get_reference_data("templates")
+    namespaces = get_reference_data("namespaces")
     
     # Get default currency
     default_currency = AppSettings.get_default_currency()
@@ -584,7 +631,7 @@ def create_offer():
     form.category_id.choices = [(0, '-- Selecione --')] + [(c.id, c.name) for c in categories]
     form.manufacturer_id.choices = [(0, '-- Selecione --')] + [(m.id, m.name) for m in manufacturers]
 
-    if request.method == "POST" and form.validate_on_submit():
+    if request.method == "POST" and form.validate_on_submit() and _offer_url_available(form):
         slug_value = slugify(form.product_slug.data)
         product_obj = Product.query.filter_by(slug=slug_value).first()
         
@@ -602,10 +649,13 @@ def create_offer():
         
         # Handle image upload
         image_url = None
+        image_variants = None
+        replaced_image_url = None
         if form.product_image.data:
-            success, filepath, error_msg = save_image(form.product_image.data, 'products')
+            success, filepath, variants, error_msg = save_product_image(form.product_image.data, 'products')
             if success:
                 image_url = filepath
+                image_variants = variants
             else:
                 flash(f"Erro ao fazer upload da imagem: {error_msg}", "warning")
         
@@ -617,16 +667,18 @@ def create_offer():
                 category=category_name,
                 manufacturer=manufacturer_name,
                 image_url=image_url,
+                image_variants=image_variants,
             )
             db.session.add(product_obj)
             db.session.flush()
         else:
             # Update existing product image if new one uploaded
             if image_url:
-                # Delete old image if exists
-                if product_obj.image_url:
-                    delete_image(product_obj.image_url)
+                old_image_url = product_obj.image_url
                 product_obj.image_url = image_url
+                product_obj.image_variants = image_variants
+                if old_image_url and old_image_url != image_url:
+                    replaced_image_url = old_image_url
 
         # Combine date and time fields into datetime
         expires_at = None
@@ -663,6 +715,9 @@ def create_offer():
         )
         db.session.add(new_offer)
         db.session.commit()
+        # Delete the old image once committed, unless another product shares it
+        if replaced_image_url:
+            delete_image(replaced_image_url)
         flash("Oferta criada com sucesso!", "success")
         return redirect(url_for("web.offers"))
 
@@ -686,9 +741,9 @@ def edit_offer(offer_id):
     form = OfferCreateForm(prefix="offer", obj=offer)
     
     # Populate select fields
-    sellers = Seller.query.filter_by(active=True).order_by(Seller.name).all()
-    categories = Category.query.filter_by(active=True).order_by(Category.name).all()
-    manufacturers = Manufacturer.query.filter_by(active=True).order_by(Manufacturer.name).all()
+    sellers = get_reference_data("sellers")
+    categories = get_reference_data("categories")
+    manufacturers = get_reference_data("manufacturers")
     
     form.seller_id.choices = [(0, '-- Selecione --')] + [(s.id, s.name) for s in sellers]
     form.category_id.choices = [(0, '-- Selecione --')] + [(c.id, c.name) for c in categories]
@@ -720,17 +775,19 @@ def edit_offer(offer_id):
             form.expires_date.data = offer.expires_at.date()
             form.expires_time.data = offer.expires_at.time()
 
-    if request.method == "POST" and form.validate_on_submit():
+    if request.method == "POST" and form.validate_on_submit() and _offer_url_available(form, offer.id):
         # Handle image upload
+        replaced_image_url = None
         if form.product_image.data:
-            success, filepath, error_msg = save_image(form.product_image.data, 'products')
+            success, filepath, variants, error_msg = save_product_image(form.product_image.data, 'products')
             if success:
-                # Delete old image if exists
-                if offer.product and offer.product.image_url:
-                    delete_image(offer.product.image_url)
                 # Update image URL
                 if offer.product:
+                    old_image_url = offer.product.image_url
                     offer.product.image_url = filepath
+                    offer.product.image_variants = variants
+                    if old_image_url and old_image_url != filepath:
+                        replaced_image_url = old_image_url
             else:
                 flash(f"Erro ao fazer upload da imagem: {error_msg}", "warning")
         
@@ -782,6 +839,9 @@ def edit_offer(offer_id):
             offer.expires_at = None
         
         db.session.commit()
+        # Delete the old image once committed, unless another product shares it
+        if replaced_image_url:
+            delete_image(replaced_image_url)
         flash("Oferta atualizada com sucesso!", "success")
         return redirect(url_for("web.offers"))
     
@@ -806,7 +866,7 @@ def share_offer(offer_id):
     selected_channel = request.args.get('channel', '').lower()
     
     # Get all active templates
-    templates = Template.query.order_by(Template.name).all()
+    templates = get_reference_data("templates")
     
     # Get active coupons from the same seller as the offer
     active_coupons = Coupon.query.filter_by(
@@ -815,30 +875,45 @@ def share_offer(offer_id):
     ).order_by(Coupon.code).all()
     
     # Get active social network configurations
-    social_networks = SocialNetworkConfig.query.filter_by(active=True).order_by(SocialNetworkConfig.network).all()
-    
-    # Create dict for JS (prefix/suffix)
-    social_configs = {
-        config.network.lower(): {
-            'prefix_text': config.prefix_text or '',
-            'suffix_text': config.suffix_text or ''
-        } for config in social_networks
-    }
+    social_networks = get_reference_data("social_networks")
     
     # Get all namespaces for display
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    namespaces = get_reference_data("namespaces")
     
     return render_template("offer_share.html",
                          offer=offer,
                          templates=templates,
                          active_coupons=active_coupons,
                          social_networks=social_networks,
-                         social_configs=social_configs,
                          namespaces=namespaces,
-                         selected_channel=selected_channel,
-                         user=current_user)
+                         selected_channel=selected_channel)
+
+
+@web_bp.route("/ofertas/<int:offer_id>/compartilhar/texto", methods=["GET"])
+@json_login_required
+def share_offer_caption(offer_id):
+    """Render the share text of an offer for a template and social network"""
+    offer = Offer.query.options(*Offer.eager_options("seller", "category", "manufacturer")).get_or_404(offer_id)
+    
+    template = Template.query.get(request.args.get("template_id", type=int) or 0)
+    network = request.args.get("network", "").strip().lower()
+    if not template or not network:
+        return jsonify({"error": "Template e rede social são obrigatórios."}), 400
+    
+    try:
+        coupon_ids = [int(value) for value in request.args.get("coupons", "").split(",") if value]
+    except ValueError:
+        return jsonify({"error": "Lista de cupons inválida."}), 400
+    
+    # Keep the order in which the coupons were selected
+    coupons_by_id = {
+        coupon.id: coupon
+        for coupon in Coupon.query.options(*Coupon.eager_options()).filter(Coupon.id.in_(coupon_ids))
+    } if coupon_ids else {}
+    coupons = [coupons_by_id[coupon_id] for coupon_id in coupon_ids if coupon_id in coupons_by_id]
+    
+    text, custom = render_offer_caption(template, offer, network, coupons, current_user._get_current_object())
+    return jsonify({"text": text, "custom": custom})
 
 
 @web_bp.route("/template-social-network/save", methods=["POST"])
@@ -994,20 +1069,18 @@ def coupons():
             )
         )
     
-    coupons = query.order_by(Coupon.created_at.desc()).all()
+    coupons = query.options(*Coupon.eager_options()).order_by(Coupon.created_at.desc()).all()
     can_manage = current_user.role in (RoleEnum.ADMIN, RoleEnum.EDITOR)
     
     # For share functionality
-    templates = Template.query.all()
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    templates = get_reference_data("templates")
+    namespaces = get_reference_data("namespaces")
     
     # Get social network configurations
-    social_configs = SocialNetworkConfig.query.filter_by(active=True).all()
+    social_configs = get_reference_data("social_networks")
     
     # Get all sellers for filter dropdown
-    sellers = Seller.query.filter_by(active=True).order_by(Seller.name).all()
+    sellers = get_reference_data("sellers")
     
     return render_template("coupons_list.html", 
                          coupons=coupons, 
@@ -1029,7 +1102,7 @@ def create_coupon():
     form = CouponForm()
     
     # Populate seller dropdown
-    sellers = Seller.query.filter_by(active=True).order_by(Seller.name).all()
+    sellers = get_reference_data("sellers")
     form.seller_id.choices = [(0, "Selecione um vendedor...")] + [(s.id, s.name) for s in sellers]
     
     if request.method == "POST" and form.validate_on_submit():
@@ -1081,7 +1154,7 @@ def edit_coupon(coupon_id):
     form = CouponForm(obj=coupon)
     
     # Populate seller dropdown
-    sellers = Seller.query.filter_by(active=True).order_by(Seller.name).all()
+    sellers = get_reference_data("sellers")
     form.seller_id.choices = [(0, "Selecione um vendedor...")] + [(s.id, s.name) for s in sellers]
     
     if request.method == "GET":
@@ -1201,12 +1274,10 @@ def share_templates():
     can_manage = current_user.role in (RoleEnum.ADMIN, RoleEnum.EDITOR)
     
     # Get available namespaces for template variables
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    namespaces = get_reference_data("namespaces")
     
     # Get all social networks for filter dropdown
-    social_networks = SocialNetworkConfig.query.filter_by(active=True).order_by(SocialNetworkConfig.network).all()
+    social_networks = get_reference_data("social_networks")
 
     return render_template(
         "templates_list.html", 
@@ -1228,12 +1299,10 @@ def create_template():
     form = TemplateCreateForm(prefix="template")
     
     # Get available namespaces for template variables
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    namespaces = get_reference_data("namespaces")
     
     # Get all social networks
-    social_configs = SocialNetworkConfig.query.order_by(SocialNetworkConfig.network).all()
+    social_configs = get_reference_data("all_social_networks")
 
     if request.method == "POST" and form.validate_on_submit():
         slug_value = slugify(form.slug.data)
@@ -1278,12 +1347,10 @@ def edit_template(template_id):
     form = TemplateCreateForm(prefix="template", obj=template)
     
     # Get available namespaces
-    namespaces = Namespace.query.filter(
-        Namespace.scope.in_([NamespaceScope.OFFER, NamespaceScope.COUPON, NamespaceScope.GLOBAL])
-    ).order_by(Namespace.scope, Namespace.name).all()
+    namespaces = get_reference_data("namespaces")
     
     # Get all social networks
-    social_configs = SocialNetworkConfig.query.order_by(SocialNetworkConfig.network).all()
+    social_configs = get_reference_data("all_social_networks")
     
     if request.method == "GET":
         # Pre-fill form
@@ -0,0 +1,327 @@
+"""
+Full-text search for offers
+
+Each offer has one search document (product name, vendor, product slug and
+description) stored in the ``offer_search`` table:
+
+- SQLite: FTS5 virtual table (``unicode61`` tokenizer, diacritics removed),
+  ranked with ``bm25``
+- PostgreSQL: ``tsvector`` column with a GIN index (``portuguese``
+  configuration), ranked with ``ts_rank``
+- Other databases: falls back to ``ILIKE`` filters, without ranking
+
+Text is lowercased and stripped of accents before indexing and searching, so
+"cafe" matches "Café". Documents are kept in sync by mapper events on
+``Offer`` and ``Product`` writes, and the table is created alongside
+``db.create_all()`` (and by its Alembic migration).
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable
+
+from sqlalchemy import Float, Integer, bindparam, event, inspect, or_, select, text
+from sqlalchemy.engine import Engine
+
+from .extensions import db
+from .models import Offer, Product
+
+
+SEARCH_TABLE = "offer_search"
+
+# Relative weight of each indexed field (name, vendor, slug, description)
+SEARCH_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# Offers re-indexed per statement when rebuilding the whole index
+REBUILD_BATCH_SIZE = 500
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_CREATE_DDL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "product_name, vendor_name, slug, description, "
+        "tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "offer_id INTEGER PRIMARY KEY REFERENCES offers(id) ON DELETE CASCADE, "
+        "document TSVECTOR NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+        f"ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+}
+
+# SQLite builds the documents in the database, calling normalize_text() as an
+# SQL function; other databases get rows normalized in Python
+_INSERT_SELECT_SQL = {
+    "sqlite": (
+        f"INSERT INTO {SEARCH_TABLE} (rowid, product_name, vendor_name, slug, description) "
+        "SELECT offers.id, normalize_text(products.name), normalize_text(offers.vendor_name), "
+        "replace(normalize_text(products.slug), '-', ' '), normalize_text(products.description) "
+        "FROM offers JOIN products ON products.id = offers.product_id WHERE offers.id IN :offer_ids"
+    ),
+}
+
+_INSERT_SQL = {
+    "postgresql": (
+        f"INSERT INTO {SEARCH_TABLE} (offer_id, document) VALUES (:offer_id, "
+        "setweight(to_tsvector('portuguese', :product_name), 'A') || "
+        "setweight(to_tsvector('portuguese', :vendor_name), 'B') || "
+        "setweight(to_tsvector('portuguese', :slug), 'C') || "
+        "setweight(to_tsvector('portuguese', :description), 'D'))"
+    ),
+}
+
+_DELETE_SQL = {
+    "sqlite": f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :offer_ids",
+    "postgresql": f"DELETE FROM {SEARCH_TABLE} WHERE offer_id IN :offer_ids",
+}
+
+# ts_rank takes weights in {D, C, B, A} order, each between 0 and 1
+_TS_RANK_WEIGHTS = ", ".join(str(weight / max(SEARCH_WEIGHTS)) for weight in reversed(SEARCH_WEIGHTS))
+
+# Matching offers with a rank where lower is better
+_MATCH_SQL = {
+    "sqlite": (
+        f"SELECT rowid AS offer_id, bm25({SEARCH_TABLE}, {', '.join(map(str, SEARCH_WEIGHTS))}) AS rank "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query"
+    ),
+    "postgresql": (
+        f"SELECT offer_id, -ts_rank('{{{_TS_RANK_WEIGHTS}}}', document, to_tsquery('portuguese', :query)) AS rank "
+        f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('portuguese', :query)"
+    ),
+}
+
+
+class _AccentTable(dict):
+    """``str.translate`` table removing the accents of each character, filled on first use"""
+
+    def __missing__(self, codepoint: int) -> str:
+        decomposed = unicodedata.normalize("NFKD", chr(codepoint))
+        stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+        self[codepoint] = stripped
+        return stripped
+
+
+_ACCENTS = _AccentTable()
+
+
+def normalize_text(value: str | None) -> str:
+    """Lowercase text and remove accents and HTML tags"""
+    if not value:
+        return ""
+    if "<" in value:
+        value = _TAG_RE.sub(" ", value)
+    if not value.isascii():
+        value = value.translate(_ACCENTS)
+    return value.lower()
+
+
+def search_terms(value: str | None) -> list[str]:
+    """Split a user search into normalized words"""
+    return _WORD_RE.findall(normalize_text(value))
+
+
+def is_supported(bind) -> bool:
+    """Whether the database has a native full-text index"""
+    return bind.dialect.name in _CREATE_DDL
+
+
+def _build_query(dialect: str, terms: list[str]) -> str:
+    # Every word must match, as a prefix so partial words also find results
+    if dialect == "sqlite":
+        return " ".join(f'"{term}"*' for term in terms)
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+# ============================================================================
+# SEARCHING
+# ============================================================================
+
+def apply_search(query, search: str):
+    """
+    Filter an Offer query by a search term, best matches first
+
+    Args:
+        query: Query selecting Offer (already joined with Product)
+        search: User search text
+
+    Returns:
+        The filtered query; with a native index it is also ordered by relevance
+    """
+    terms = search_terms(search)
+    if not terms:
+        return query
+    if not is_supported(db.engine):
+        pattern = f"%{search}%"
+        return query.filter(or_(
+            Product.name.ilike(pattern),
+            Product.slug.ilike(pattern),
+            Offer.vendor_name.ilike(pattern),
+        ))
+
+    dialect = db.engine.dialect.name
+    matches = (
+        text(_MATCH_SQL[dialect])
+        .bindparams(query=_build_query(dialect, terms))
+        .columns(offer_id=Integer, rank=Float)
+        .subquery("search_matches")
+    )
+    return query.join(matches, matches.c.offer_id == Offer.id).order_by(matches.c.rank)
+
+
+# ============================================================================
+# INDEXING
+# ============================================================================
+
+def create_search_index(connection) -> None:
+    """Create the search table for the connection's database, if supported"""
+    for statement in _CREATE_DDL.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection) -> None:
+    """Drop the search table, if supported"""
+    if is_supported(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+def _document_rows(connection, offer_ids: Iterable[int] | None = None) -> list[dict]:
+    offers = Offer.__table__
+    products = Product.__table__
+    statement = select(
+        offers.c.id,
+        offers.c.vendor_name,
+        products.c.name,
+        products.c.slug,
+        products.c.description,
+    ).join(products, products.c.id == offers.c.product_id)
+    if offer_ids is not None:
+        statement = statement.where(offers.c.id.in_(offer_ids))
+
+    return [
+        {
+            "offer_id": row.id,
+            "product_name": normalize_text(row.name),
+            "vendor_name": normalize_text(row.vendor_name),
+            "slug": normalize_text(row.slug).replace("-", " "),
+            "description": normalize_text(row.description),
+        }
+        for row in connection.execute(statement)
+    ]
+
+
+def _insert_documents(connection, offer_ids: list[int]) -> None:
+    """Insert the search documents of offers that have none (one statement on SQLite)"""
+    dialect = connection.dialect.name
+    if dialect in _INSERT_SELECT_SQL:
+        connection.execute(
+            text(_INSERT_SELECT_SQL[dialect]).bindparams(bindparam("offer_ids", expanding=True)),
+            {"offer_ids": offer_ids},
+        )
+        return
+    rows = _document_rows(connection, offer_ids)
+    if rows:
+        connection.execute(text(_INSERT_SQL[dialect]), rows)
+
+
+def index_offers(connection, offer_ids: Iterable[int]) -> None:
+    """(Re)build the search documents of the given offers"""
+    offer_ids = list(offer_ids)
+    if not offer_ids or not is_supported(connection):
+        return
+
+    connection.execute(
+        text(_DELETE_SQL[connection.dialect.name]).bindparams(bindparam("offer_ids", expanding=True)),
+        {"offer_ids": offer_ids},
+    )
+    _insert_documents(connection, offer_ids)
+
+
+def unindex_offers(connection, offer_ids: Iterable[int]) -> None:
+    """Remove the search documents of the given offers"""
+    offer_ids = list(offer_ids)
+    if not offer_ids or not is_supported(connection):
+        return
+    connection.execute(
+        text(_DELETE_SQL[connection.dialect.name]).bindparams(bindparam("offer_ids", expanding=True)),
+        {"offer_ids": offer_ids},
+    )
+
+
+def rebuild_search_index(connection) -> int:
+    """
+    Rebuild every search document
+
+    Returns:
+        Number of offers indexed
+    """
+    if not is_supported(connection):
+        return 0
+
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    offer_ids = [row.id for row in connection.execute(select(Offer.__table__.c.id))]
+    for start in range(0, len(offer_ids), REBUILD_BATCH_SIZE):
+        _insert_documents(connection, offer_ids[start:start + REBUILD_BATCH_SIZE])
+    return len(offer_ids)
+
+
+# ============================================================================
+# SYNC EVENTS
+# ============================================================================
+
+@event.listens_for(Engine, "connect")
+def _register_sql_functions(dbapi_connection, connection_record):
+    # Used by _INSERT_SELECT_SQL; SQLite only accepts new functions while no
+    # statement is running, so they are added when the connection opens
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("normalize_text", 1, normalize_text, deterministic=True)
+
+
+OFFER_INDEXED_FIELDS = ("vendor_name", "product_id")
+PRODUCT_INDEXED_FIELDS = ("name", "slug", "description")
+
+
+def _changed(target, fields: tuple[str, ...]) -> bool:
+    attrs = inspect(target).attrs
+    return any(attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Offer, "after_insert")
+def _offer_inserted(mapper, connection, target):
+    index_offers(connection, [target.id])
+
+
+@event.listens_for(Offer, "after_update")
+def _offer_updated(mapper, connection, target):
+    if _changed(target, OFFER_INDEXED_FIELDS):
+        index_offers(connection, [target.id])
+
+
+@event.listens_for(Offer, "after_delete")
+def _offer_deleted(mapper, connection, target):
+    unindex_offers(connection, [target.id])
+
+
+@event.listens_for(Product, "after_update")
+def _product_updated(mapper, connection, target):
+    if _changed(target, PRODUCT_INDEXED_FIELDS):
+        offer_ids = connection.execute(
+            select(Offer.__table__.c.id).where(Offer.__table__.c.product_id == target.id)
+        ).scalars().all()
+        index_offers(connection, offer_ids)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _metadata_created(target, connection, **kwargs):
+    create_search_index(connection)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _metadata_dropped(target, connection, **kwargs):
+    drop_search_index(connection)
@@ -1,17 +1,94 @@
 from __future__ import annotations
 
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from functools import wraps
 from typing import Callable
 
-from flask import abort
+from flask import abort, current_app
 from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached, object_session
 
+from .extensions import db
 from .models import RoleEnum, User, UserToken
 
 basic_auth = HTTPBasicAuth()
 token_auth = HTTPTokenAuth(scheme="Bearer")
 
 
+class TokenCache:
+    """Bounded LRU cache of validated bearer tokens.
+
+    Stores only the user id, role and token expiry. Entries live at most
+    ``TOKEN_CACHE_TTL`` seconds and are dropped when the token is revoked or
+    the user is updated or deleted.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[int, RoleEnum, datetime, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> tuple[int, RoleEnum] | None:
+        ttl = current_app.config.get("TOKEN_CACHE_TTL", 60)
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                user_id, role, expires_at, cached_at = entry
+                if datetime.utcnow() < expires_at and time.monotonic() - cached_at < ttl:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return user_id, role
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, user_id: int, role: RoleEnum, expires_at: datetime) -> None:
+        max_size = current_app.config.get("TOKEN_CACHE_SIZE", 1024)
+        with self._lock:
+            self._entries[token] = (user_id, role, expires_at, time.monotonic())
+            self._entries.move_to_end(token)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_tokens(self, tokens) -> None:
+        with self._lock:
+            for token in tokens:
+                self._entries.pop(token, None)
+
+    def invalidate_users(self, user_ids) -> None:
+        user_ids = set(user_ids)
+        with self._lock:
+            for token in [token for token, entry in self._entries.items() if entry[0] in user_ids]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": current_app.config.get("TOKEN_CACHE_SIZE", 1024),
+                "ttl": current_app.config.get("TOKEN_CACHE_TTL", 60),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache()
+
+
 @basic_auth.verify_password
 def verify_password(email: str, password: str) -> User | None:
     user = User.query.filter_by(email=email).first()
@@ -22,8 +99,18 @@ def verify_password(email: str, password: str) -> User | None:
 
 @token_auth.verify_token
 def verify_token(token: str) -> User | None:
-    user_token = UserToken.query.filter_by(token=token, revoked=False).first()
+    cached = token_cache.get(token)
+    if cached is not None:
+        # Identity-only User: id and role are set, other columns load on access
+        user_id, role = cached
+        user = User(id=user_id, role=role)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user_token = UserToken.query.options(joinedload(UserToken.user))\
+        .filter_by(token=token, revoked=False).first()
     if user_token and user_token.is_valid():
+        token_cache.set(token, user_token.user_id, user_token.user.role, user_token.expires_at)
         return user_token.user
     return None
 
@@ -41,3 +128,41 @@ def role_required(*roles: RoleEnum) -> Callable:
 
     return decorator
 
+
+# Cache invalidation: collect changed tokens/users during the flush and drop
+# them from the cache once the transaction is committed
+
+def _pending(target) -> dict | None:
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault("token_cache_invalidations", {"tokens": set(), "users": set()})
+
+
+@event.listens_for(UserToken, "after_update")
+@event.listens_for(UserToken, "after_delete")
+def _token_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending["tokens"].add(target.token)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending["users"].add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_token_cache(session):
+    pending = session.info.pop("token_cache_invalidations", None)
+    if pending:
+        token_cache.invalidate_tokens(pending["tokens"])
+        token_cache.invalidate_users(pending["users"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_token_cache_invalidations(session):
+    session.info.pop("token_cache_invalidations", None)
@@ -0,0 +1,121 @@
+"""
+Dashboard statistics
+
+Home page figures (offer, coupon and template counts and total savings) are
+computed with one aggregate SQL statement and kept in an in-process cache.
+
+The cache is dropped once a transaction that wrote an offer, coupon or
+template commits (mapper events record the write, the session's commit
+applies it) and otherwise expires after ``DASHBOARD_STATS_TTL`` seconds or when
+the next offer expires, whichever comes first. Each worker process keeps its
+own copy, so writes made by another process show up within the TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, event, func, or_, select
+from sqlalchemy.orm import Session, object_session
+
+from .extensions import db
+from .models import Coupon, Offer, Template
+
+
+_cache: dict = {"stats": None, "expires": 0.0, "version": 0}
+_cache_lock = threading.Lock()
+_CHANGED_KEY = "dashboard_stats_changed"
+
+
+def _compute_stats(now: datetime) -> tuple[dict, datetime | None]:
+    coupon_count = select(func.count(Coupon.id)).where(Coupon.active == True).scalar_subquery()
+    template_count = select(func.count(Template.id)).scalar_subquery()
+    is_active = or_(Offer.expires_at.is_(None), Offer.expires_at > now)
+
+    row = db.session.execute(
+        select(
+            func.count(Offer.id),
+            func.count(case((is_active, Offer.id))),
+            func.coalesce(
+                func.sum(case((Offer.old_price > Offer.price, Offer.old_price - Offer.price), else_=0)),
+                0,
+            ),
+            func.min(case((Offer.expires_at > now, Offer.expires_at))),
+            coupon_count,
+            template_count,
+        ).select_from(Offer)
+    ).one()
+
+    total_offers, active_offers, total_savings, next_expiry, total_coupons, total_templates = row
+    stats = {
+        "total_offers": total_offers,
+        "active_offers": active_offers,
+        "total_savings": float(total_savings or 0),
+        "total_coupons": total_coupons,
+        "total_templates": total_templates,
+    }
+    return stats, next_expiry
+
+
+def get_dashboard_stats() -> dict:
+    """
+    Get the home page statistics, from the cache when it is still valid
+
+    Returns:
+        Dict with total_offers, active_offers, total_savings, total_coupons
+        and total_templates
+    """
+    with _cache_lock:
+        if _cache["stats"] is not None and time.monotonic() < _cache["expires"]:
+            return dict(_cache["stats"])
+        version = _cache["version"]
+
+    now = datetime.now()
+    stats, next_expiry = _compute_stats(now)
+
+    ttl = current_app.config.get("DASHBOARD_STATS_TTL", 60)
+    if next_expiry is not None:
+        # "active_offers" changes as soon as the next offer expires
+        ttl = min(ttl, max((next_expiry - now).total_seconds(), 0))
+
+    with _cache_lock:
+        # Don't store figures computed while a write invalidated the cache
+        if _cache["version"] == version:
+            _cache["stats"] = stats
+            _cache["expires"] = time.monotonic() + ttl
+    return dict(stats)
+
+
+def invalidate_dashboard_stats() -> None:
+    """Drop the cached statistics so the next request recomputes them"""
+    with _cache_lock:
+        _cache["stats"] = None
+        _cache["version"] += 1
+
+
+def _on_write(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).add(mapper.class_)
+
+
+def _after_commit(session):
+    if session.info.pop(_CHANGED_KEY, None):
+        invalidate_dashboard_stats()
+
+
+def _after_rollback(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+for _model in (Offer, Coupon, Template):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _on_write)
+
+# Invalidating at flush time would let a request recompute the figures
+# before the commit and cache them as fresh until the TTL
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
@@ -6,17 +6,29 @@ Contains helper functions and utilities used throughout the application.
 
 from slugify import slugify
 
-from .upload import save_image, delete_image, allowed_file
+from .upload import save_image, save_product_image, delete_image, allowed_file, create_image_variants, build_srcset
 from .currency import get_currency_symbol, get_currency_name, format_price, CURRENCY_SYMBOLS
+from .pagination import encode_cursor, decode_cursor, keyset_paginate
+from .streaming import stream_query, STREAM_FORMATS
+from rate_limit import RateLimiter
 
 __all__ = [
     'slugify',
     'save_image',
+    'save_product_image',
     'delete_image',
     'allowed_file',
+    'create_image_variants',
+    'build_srcset',
     'get_currency_symbol',
     'get_currency_name',
     'format_price',
     'CURRENCY_SYMBOLS',
+    'encode_cursor',
+    'decode_cursor',
+    'keyset_paginate',
+    'stream_query',
+    'STREAM_FORMATS',
+    'RateLimiter',
 ]
 
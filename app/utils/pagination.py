@@ -0,0 +1,117 @@
+"""
+Keyset (cursor) pagination utilities
+
+Provides opaque cursors and query helpers to paginate collections ordered by
+``(created_at, id)`` without OFFSET, so the cost of a page does not depend on
+how deep the client has scrolled. ``created_at`` must be NOT NULL on the
+paginated table: a NULL timestamp never matches the keyset comparisons.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+# Default and maximum page sizes
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """
+    Encode a keyset position into an opaque URL-safe cursor
+
+    Args:
+        created_at: Creation timestamp of the last item of the page
+        item_id: Primary key of the last item of the page
+
+    Returns:
+        URL-safe base64 cursor string
+
+    Raises:
+        ValueError: If created_at is missing
+    """
+    if created_at is None:
+        raise ValueError(f"Item {item_id} sem created_at: não é possível paginar por cursor.")
+    payload = json.dumps([created_at.isoformat(), item_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor created by encode_cursor
+
+    Args:
+        cursor: Opaque cursor string received from the client
+
+    Returns:
+        Tuple of (created_at, item_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception as exc:
+        raise ValueError("Cursor inválido.") from exc
+
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """
+    Parse the ``limit`` query parameter, clamped to MAX_PAGE_SIZE
+
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value in (None, ''):
+        return default
+    message = f"Limite inválido: use um número inteiro entre 1 e {MAX_PAGE_SIZE}."
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(message) from None
+    if limit < 1:
+        raise ValueError(message)
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_paginate(query, model, limit: int, cursor: Optional[str] = None):
+    """
+    Fetch one page of ``query`` ordered by ``(created_at, id)`` descending
+
+    Args:
+        query: SQLAlchemy query over ``model`` (filters already applied)
+        model: Mapped class exposing ``created_at`` (NOT NULL) and ``id`` columns
+        limit: Page size
+        cursor: Cursor returned by the previous page, if any
+
+    Returns:
+        Tuple of (items, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < item_id),
+            )
+        )
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return items, next_cursor
@@ -0,0 +1,72 @@
+"""
+Streaming response utilities
+
+Serializes large query results row by row so that neither the server nor the
+client has to hold the whole collection in memory.
+
+Supported formats (``?stream=`` query parameter):
+- ``ndjson``: one JSON document per line
+- ``json``: a regular JSON array, written in chunks
+"""
+
+from typing import Callable, Iterator, Optional
+
+from flask import Response, current_app, stream_with_context
+
+
+# Response mimetype per stream format
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+# Rows fetched from the database per round-trip
+STREAM_BATCH_SIZE = 500
+
+
+def parse_stream_format(value: Optional[str]) -> Optional[str]:
+    """
+    Parse the ``stream`` query parameter
+
+    Returns:
+        The stream format, or None when streaming was not requested
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if not value:
+        return None
+    if value not in STREAM_FORMATS:
+        raise ValueError(f"Formato de streaming inválido. Use: {', '.join(STREAM_FORMATS)}")
+    return value
+
+
+def stream_query(query, stream_format: str, serialize: Optional[Callable] = None) -> Response:
+    """
+    Build a streaming response for a SQLAlchemy query
+
+    Args:
+        query: Ordered query whose rows will be streamed
+        stream_format: One of STREAM_FORMATS
+        serialize: Function turning a row into a dict (defaults to row.to_dict())
+
+    Returns:
+        Flask streaming Response
+    """
+    serialize = serialize or (lambda row: row.to_dict())
+    dumps = current_app.json.dumps
+
+    def generate_ndjson() -> Iterator[str]:
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield dumps(serialize(row)) + '\n'
+
+    def generate_json() -> Iterator[str]:
+        yield '['
+        separator = ''
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield separator + dumps(serialize(row))
+            separator = ','
+        yield ']'
+
+    generator = generate_ndjson() if stream_format == 'ndjson' else generate_json()
+    return Response(stream_with_context(generator), mimetype=STREAM_FORMATS[stream_format])
@@ -3,19 +3,25 @@ Secure image upload utilities
 
 This module provides secure image upload functionality with:
 - File type validation (only images allowed)
-- File size limits
-- Secure filename generation
+- File size limits, enforced while the upload is streamed to disk
+- Single-decode content validation with decompression bomb limits
+- Content-addressed storage: identical uploads share one file (and its
+  variants), deleted only when no product references it anymore
 - Path traversal protection
 - Content type verification
+- Resized WebP/JPEG variants (thumb, card, full) for responsive images
 """
 
+import hashlib
 import os
 import secrets
+import time
+import warnings
 from pathlib import Path
-from typing import Optional, Tuple
-from werkzeug.utils import secure_filename
+from typing import Iterator, Optional, Tuple
 from werkzeug.datastructures import FileStorage
-from PIL import Image
+from flask import has_app_context
+from PIL import Image, ImageOps
 
 
 # Allowed image extensions
@@ -24,9 +30,42 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 # Maximum file size: 5MB
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB in bytes
 
-# Image upload folder
+# Maximum decoded size (decompression bomb protection): a small PNG/GIF can
+# expand to gigabytes in memory. Checked from the header, before decoding.
+MAX_IMAGE_PIXELS = 40_000_000  # e.g. 8000 x 5000
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Bytes read per chunk when streaming an upload to disk
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Formats detected by Pillow that are accepted, and the extension they get
+PIL_FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+# Image upload folders (web path: /static/uploads/<subfolder>/)
+# Uploads are stored by content as <subfolder>/ab/cd/<sha256>.<ext>
+UPLOAD_ROOT = 'app/static/uploads'
 UPLOAD_FOLDER = 'app/static/uploads/products'
 
+# Unreferenced uploads are only deleted once untouched for this long (seconds):
+# an upload that reuses a stored file refreshes its mtime, and the product
+# using it may not be committed yet
+ORPHAN_GRACE_PERIOD = 24 * 3600
+
+# Derivatives generated for every upload: name -> bounding box (px).
+# Listed from largest to smallest; each one is resized from the previous.
+IMAGE_VARIANTS = {
+    'full': (1200, 1200),
+    'card': (480, 480),
+    'thumb': (160, 160),
+}
+
+# Encoder settings per derivative format
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANT_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
 
 def allowed_file(filename: str) -> bool:
     """
@@ -117,6 +156,173 @@ def generate_secure_filename(original_filename: str) -> str:
     return f"{random_token}.{ext}"
 
 
+class ImageValidationError(ValueError):
+    """Upload rejected; the message is shown to the user"""
+
+
+def _copy_limited(stream, target: Path, limit: int) -> str:
+    """
+    Copy an upload stream to disk in chunks, stopping as soon as it exceeds limit
+    
+    The SHA-256 of the content is computed while copying.
+    
+    Args:
+        stream: Readable binary stream
+        target: Destination file
+        limit: Maximum number of bytes
+        
+    Returns:
+        Hex SHA-256 digest of the content
+    """
+    size = 0
+    digest = hashlib.sha256()
+    with open(target, 'wb') as output:
+        while True:
+            chunk = stream.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                max_mb = limit / (1024 * 1024)
+                raise ImageValidationError(f"Arquivo muito grande. Tamanho máximo: {max_mb:.1f}MB")
+            digest.update(chunk)
+            output.write(chunk)
+    if size == 0:
+        raise ImageValidationError("Nenhum arquivo selecionado")
+    return digest.hexdigest()
+
+
+def content_path(subfolder: str, digest: str) -> Path:
+    """
+    Directory of a content-addressed upload
+    
+    Two levels of fan-out (uploads/<subfolder>/ab/cd/) keep directories small
+    even with hundreds of thousands of images.
+    """
+    return Path(UPLOAD_ROOT) / subfolder / digest[:2] / digest[2:4]
+
+
+def _find_stored(folder: Path, digest: str) -> Optional[Path]:
+    """Already stored upload with this content, if any (variants excluded)"""
+    if not folder.is_dir():
+        return None
+    for ext in PIL_FORMAT_EXTENSIONS.values():
+        candidate = folder / f"{digest}.{ext}"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def load_image(path: Path) -> Image.Image:
+    """
+    Open and decode an image once, with every content check
+    
+    The header is read first: the format must be an allowed image type and
+    the dimensions within MAX_IMAGE_PIXELS (decompression bomb protection),
+    so oversized images are rejected before any pixel is decoded. The image
+    is then decoded once, which also detects truncated or corrupt files.
+    
+    Args:
+        path: Image file on disk
+        
+    Returns:
+        The decoded PIL image (caller closes it)
+    """
+    with warnings.catch_warnings():
+        # Pillow only warns between MAX_IMAGE_PIXELS and twice that
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            image = Image.open(path)
+        except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+            raise ImageValidationError(
+                f"Imagem muito grande. Máximo: {MAX_IMAGE_PIXELS // 1_000_000} megapixels"
+            )
+        except Exception:
+            raise ImageValidationError("O arquivo não é uma imagem válida")
+
+    if image.format not in PIL_FORMAT_EXTENSIONS:
+        image.close()
+        raise ImageValidationError("O arquivo não é uma imagem válida")
+
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        image.close()
+        raise ImageValidationError(
+            f"Imagem muito grande. Máximo: {MAX_IMAGE_PIXELS // 1_000_000} megapixels"
+        )
+
+    try:
+        image.load()
+    except Exception:
+        image.close()
+        raise ImageValidationError("O arquivo está corrompido ou não é uma imagem válida")
+    return image
+
+
+def _store_image(file: FileStorage, subfolder: str) -> Tuple[str, Optional[Image.Image]]:
+    """
+    Validate an upload and move it to the uploads folder
+    
+    The body is streamed to a temporary file (size enforced and SHA-256
+    computed while copying). If an upload with the same content is already
+    stored, the copy is dropped and the existing file is reused without being
+    decoded again. Otherwise the image is validated with a single decode and
+    renamed to <sha256>.<ext>, the extension matching the detected format.
+    
+    Returns:
+        Tuple of (web path, decoded image or None for a duplicate)
+    """
+    if not file or file.filename == '':
+        raise ImageValidationError("Nenhum arquivo selecionado")
+    
+    if not allowed_file(file.filename):
+        raise ImageValidationError(f"Tipo de arquivo não permitido. Use: {', '.join(ALLOWED_EXTENSIONS)}")
+    
+    # Create upload directory if it doesn't exist
+    upload_path = Path(UPLOAD_ROOT) / subfolder
+    upload_path.mkdir(parents=True, exist_ok=True)
+    
+    temp_path = upload_path / f".upload-{secrets.token_hex(8)}.tmp"
+    try:
+        if file.stream.seekable():
+            file.stream.seek(0)
+        digest = _copy_limited(file.stream, temp_path, MAX_FILE_SIZE)
+        
+        folder = content_path(subfolder, digest)
+        existing = _find_stored(folder, digest)
+        if existing is not None:
+            # Same bytes as an image we already have (and validated)
+            web_path = _fs_to_web_path(existing)
+            # Fresh mtime: the grace period of delete_image and of the orphan
+            # collector protects the file until the product using it is committed
+            try:
+                for path in [existing, *variant_paths(web_path)]:
+                    if path.is_file():
+                        os.utime(path)
+                reused = existing.is_file()
+            except FileNotFoundError:
+                reused = False  # Deleted meanwhile: store this copy instead
+            if reused:
+                temp_path.unlink(missing_ok=True)
+                return web_path, None
+        
+        image = load_image(temp_path)
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+        target = folder / f"{digest}.{PIL_FORMAT_EXTENSIONS[image.format]}"
+        os.replace(temp_path, target)
+    except OSError:
+        image.close()
+        temp_path.unlink(missing_ok=True)
+        raise
+    
+    # Return relative path for database (web-accessible)
+    return _fs_to_web_path(target), image
+
+
 def save_image(file: FileStorage, subfolder: str = 'products') -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Save uploaded image securely
@@ -128,75 +334,231 @@ def save_image(file: FileStorage, subfolder: str = 'products') -> Tuple[bool, Op
     Returns:
         Tuple of (success: bool, filepath: str or None, error_message: str or None)
     """
-    # Check if file exists
-    if not file or file.filename == '':
-        return False, None, "Nenhum arquivo selecionado"
+    try:
+        relative_path, image = _store_image(file, subfolder)
+    except ImageValidationError as e:
+        return False, None, str(e)
+    except Exception as e:
+        return False, None, f"Erro ao salvar arquivo: {str(e)}"
     
-    # Check file extension
-    if not allowed_file(file.filename):
-        return False, None, f"Tipo de arquivo não permitido. Use: {', '.join(ALLOWED_EXTENSIONS)}"
+    if image is not None:
+        image.close()
+    return True, relative_path, None
+
+
+def save_product_image(
+    file: FileStorage,
+    subfolder: str = 'products',
+) -> Tuple[bool, Optional[str], Optional[dict], Optional[str]]:
+    """
+    Save an uploaded product image and generate its resized variants
     
-    # Check file size
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)  # Reset to beginning
+    Same as save_image, but the image decoded during validation is reused for
+    the variants instead of being decoded again. Duplicates of an image that
+    a product already uses get that product's variants: nothing is resized or
+    written.
     
-    if file_size > MAX_FILE_SIZE:
-        max_mb = MAX_FILE_SIZE / (1024 * 1024)
-        return False, None, f"Arquivo muito grande. Tamanho máximo: {max_mb:.1f}MB"
+    Returns:
+        Tuple of (success, filepath, image_variants, error_message)
+    """
+    try:
+        relative_path, image = _store_image(file, subfolder)
+    except ImageValidationError as e:
+        return False, None, None, str(e)
+    except Exception as e:
+        return False, None, None, f"Erro ao salvar arquivo: {str(e)}"
+    
+    if image is None:
+        variants = _stored_variants(relative_path)
+        if variants is None:
+            variants = create_image_variants(relative_path)
+        return True, relative_path, variants, None
+    
+    try:
+        variants = create_image_variants(relative_path, image)
+    finally:
+        image.close()
+    return True, relative_path, variants, None
+
+
+def _web_to_fs_path(image_path: str) -> Path:
+    """Convert a web path (/static/...) to a filesystem path"""
+    if image_path.startswith('/static/'):
+        return Path('app/static/' + image_path[8:])
+    return Path(image_path)
+
+
+def _fs_to_web_path(file_path: Path) -> str:
+    """Convert a filesystem path under app/static to a web path"""
+    return '/static/' + file_path.as_posix().split('app/static/', 1)[1]
+
+
+def _stored_variants(image_path: str) -> Optional[dict]:
+    """Variants already recorded for this image by a product, if their files still exist"""
+    if not has_app_context():
+        return None
+    from ..models import Product
     
-    # Validate image content (first check with imghdr)
-    if not validate_image_content(file.stream):
-        return False, None, "O arquivo não é uma imagem válida"
+    variants = (
+        Product.query.with_entities(Product.image_variants)
+        .filter(Product.image_url == image_path, Product.image_variants.isnot(None))
+        .limit(1)
+        .scalar()
+    )
+    if not variants:
+        return None
+    files = [_web_to_fs_path(entry[key]) for entry in variants.values() for key in VARIANT_FORMATS if entry.get(key)]
+    return variants if all(path.is_file() for path in files) else None
+
+
+def image_reference_count(image_path: str) -> int:
+    """
+    Number of products using an image
     
-    # Validate with PIL (more thorough)
-    if not validate_image_with_pil(file.stream):
-        return False, None, "O arquivo está corrompido ou não é uma imagem válida"
+    Content-addressed uploads are shared by every product with the same
+    picture. Outside an application context (loose files in maintenance
+    scripts) there is nothing to count and 0 is returned.
+    """
+    if not image_path or not has_app_context():
+        return 0
+    from ..models import Product
     
-    # Generate secure filename
-    filename = generate_secure_filename(file.filename)
+    return Product.query.filter(Product.image_url == image_path).count()
+
+
+def variant_paths(image_path: str) -> list:
+    """
+    Filesystem paths of every derivative of an image
     
-    # Create upload directory if it doesn't exist
-    upload_path = Path(UPLOAD_FOLDER) / subfolder
-    upload_path.mkdir(parents=True, exist_ok=True)
+    Args:
+        image_path: Web path of the original image
+        
+    Returns:
+        List of Path objects (they may not exist)
+    """
+    original = _web_to_fs_path(image_path)
+    return [
+        original.with_name(f"{original.stem}_{name}.{ext}")
+        for name in IMAGE_VARIANTS
+        for ext in VARIANT_EXTENSIONS.values()
+    ]
+
+
+def create_image_variants(image_path: str, image: Optional[Image.Image] = None) -> Optional[dict]:
+    """
+    Generate the resized WebP and JPEG derivatives of an uploaded image
     
-    # Full file path
-    filepath = upload_path / filename
+    The image is decoded once; each size is resized from the previous (larger)
+    one. Images are never upscaled, and transparency is flattened on white for
+    the JPEG fallback.
     
-    try:
-        # Save file
-        file.save(str(filepath))
+    Args:
+        image_path: Web path of the original image (as returned by save_image)
+        image: The already decoded original, if the caller has it
         
-        # Return relative path for database (web-accessible)
-        relative_path = f"/static/uploads/{subfolder}/{filename}"
-        return True, relative_path, None
+    Returns:
+        Dict like {"card": {"width": 480, "height": 360, "webp": "/static/...",
+        "jpeg": "/static/..."}, ...}, or None if the image can't be processed
+    """
+    original = _web_to_fs_path(image_path)
+    try:
+        if image is not None:
+            image = ImageOps.exif_transpose(image)
+        else:
+            with Image.open(original) as source:
+                # JPEG: let the decoder downscale while decoding
+                source.draft('RGB', IMAGE_VARIANTS['full'])
+                image = ImageOps.exif_transpose(source)
+                image.load()
+    except Exception:
+        return None
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        rgba = image.convert('RGBA')
+        flattened = Image.new('RGB', rgba.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel('A'))
+        image = flattened
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    variants = {}
+    try:
+        for name, box in IMAGE_VARIANTS.items():
+            if image.width > box[0] or image.height > box[1]:
+                image = ImageOps.contain(image, box, Image.Resampling.LANCZOS)
+            entry = {'width': image.width, 'height': image.height}
+            for key, (pil_format, options) in VARIANT_FORMATS.items():
+                target = original.with_name(f"{original.stem}_{name}.{VARIANT_EXTENSIONS[key]}")
+                image.save(target, pil_format, **options)
+                entry[key] = _fs_to_web_path(target)
+            variants[name] = entry
+    except Exception:
+        for path in variant_paths(image_path):
+            path.unlink(missing_ok=True)
+        return None
+
+    return variants
+
+
+def build_srcset(variants: Optional[dict], image_format: str = 'webp') -> str:
+    """
+    Build an HTML ``srcset`` attribute from image variants
+    
+    Args:
+        variants: Product.image_variants
+        image_format: 'webp' or 'jpeg'
         
-    except Exception as e:
-        return False, None, f"Erro ao salvar arquivo: {str(e)}"
+    Returns:
+        String like "/static/..._thumb.webp 160w, /static/..._card.webp 480w"
+    """
+    if not variants:
+        return ''
+    candidates = {}
+    for entry in variants.values():
+        if entry.get(image_format):
+            # Small originals give variants of equal width; keep one of each
+            candidates.setdefault(entry['width'], entry[image_format])
+    return ', '.join(f"{url} {width}w" for width, url in sorted(candidates.items()))
 
 
-def delete_image(image_path: str) -> bool:
+def delete_image(image_path: str, grace_period: float = ORPHAN_GRACE_PERIOD) -> bool:
     """
-    Delete an uploaded image file
+    Delete an uploaded image file and its resized variants
+    
+    The files are only removed when no product references the image anymore
+    and none of them was touched during the grace period, the same rule as
+    collect_orphan_images. A concurrent upload of the same picture reuses the
+    stored file and refreshes its mtime before its product is committed, so
+    the reference count alone can't tell the file is about to be used again.
+    Recent orphans are left to the collector. Call it after the product's
+    change was committed.
     
     Args:
         image_path: Path to image (relative web path like /static/uploads/products/xxx.jpg)
+        grace_period: Minimum age in seconds of the files to be deleted
         
     Returns:
-        True if deleted successfully, False otherwise
+        True if deleted successfully, False otherwise (still referenced, recent or missing)
     """
     if not image_path:
         return False
     
     try:
+        if image_reference_count(image_path) > 0:
+            return False
+        
         # Convert web path to filesystem path
-        # Remove leading /static/ and convert to app/static/
-        if image_path.startswith('/static/'):
-            fs_path = 'app/static/' + image_path[8:]
-        else:
-            fs_path = image_path
+        file_path = _web_to_fs_path(image_path)
+        
+        cutoff = time.time() - grace_period
+        for path in [file_path, *variant_paths(image_path)]:
+            if path.is_file() and path.stat().st_mtime > cutoff:
+                return False
         
-        file_path = Path(fs_path)
+        # Resized variants go with the original
+        for variant_path in variant_paths(image_path):
+            if variant_path.is_file():
+                variant_path.unlink()
         
         # Check if file exists and delete
         if file_path.exists() and file_path.is_file():
@@ -232,3 +594,114 @@ def get_image_info(file: FileStorage) -> Optional[dict]:
     except Exception:
         return None
 
+
+def _walk_files(folder: Path) -> Iterator[os.DirEntry]:
+    """Yield every file below folder, one directory listing at a time"""
+    pending = [folder]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def _image_key(file_path: Path) -> str:
+    """
+    Directory and stem of the original an upload file belongs to
+    
+    Variants (<stem>_<variant>.<ext>) map to their original, so one key per
+    image covers all of its files.
+    """
+    stem = file_path.stem
+    base, sep, variant = stem.rpartition('_')
+    if sep and variant in IMAGE_VARIANTS and file_path.suffix[1:] in VARIANT_EXTENSIONS.values():
+        stem = base
+    return (file_path.parent / stem).as_posix()
+
+
+def referenced_image_keys(subfolder: str = 'products', batch_size: int = 10_000) -> set:
+    """
+    Keys (see _image_key) of every upload used by a product
+    
+    Product.image_url is streamed in batches; only the keys are kept.
+    """
+    from sqlalchemy import select
+    
+    from ..extensions import db
+    from ..models import Product
+    
+    prefix = f"/static/uploads/{subfolder}/"
+    rows = db.session.execute(
+        select(Product.image_url)
+        .where(Product.image_url.like(f"{prefix}%"))
+        .execution_options(yield_per=batch_size)
+    ).scalars()
+    return {_image_key(_web_to_fs_path(image_url)) for image_url in rows}
+
+
+def collect_orphan_images(
+    subfolder: str = 'products',
+    grace_period: float = ORPHAN_GRACE_PERIOD,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Delete uploaded files that no product references
+    
+    The upload folder is walked lazily with os.scandir and each file is
+    checked against the set of referenced images, so memory grows with the
+    number of products, not with the number of files. Files modified less
+    than grace_period seconds ago are kept: they may belong to an upload
+    whose product has not been committed yet. Abandoned temporary uploads
+    (.upload-*.tmp) are removed after the same grace period.
+    
+    Args:
+        subfolder: Subfolder within uploads directory
+        grace_period: Minimum age in seconds of a file to be deleted
+        dry_run: Only count what would be deleted
+        
+    Returns:
+        Dict with scanned, deleted, recent (orphans within the grace period),
+        failed and reclaimed_bytes
+    """
+    folder = Path(UPLOAD_ROOT) / subfolder
+    stats = {'scanned': 0, 'deleted': 0, 'recent': 0, 'failed': 0, 'reclaimed_bytes': 0}
+    if not folder.is_dir():
+        return stats
+    
+    referenced = referenced_image_keys(subfolder)
+    cutoff = time.time() - grace_period
+    
+    for entry in _walk_files(folder):
+        stats['scanned'] += 1
+        file_path = Path(entry.path)
+        is_temp = entry.name.startswith('.upload-')
+        if entry.name.startswith('.') and not is_temp:
+            continue  # .gitignore, .gitkeep...
+        if not is_temp and _image_key(file_path) in referenced:
+            continue
+        
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime > cutoff:
+            stats['recent'] += 1
+            continue
+        
+        if not dry_run:
+            try:
+                file_path.unlink()
+            except FileNotFoundError:
+                continue
+            except OSError:
+                stats['failed'] += 1
+                continue
+        stats['deleted'] += 1
+        stats['reclaimed_bytes'] += stat.st_size
+    
+    return stats
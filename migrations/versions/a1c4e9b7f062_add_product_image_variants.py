@@ -0,0 +1,26 @@
+"""add_product_image_variants
+
+Revision ID: a1c4e9b7f062
+Revises: f3a9c6e17d28
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e9b7f062'
+down_revision = 'f3a9c6e17d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('image_variants')
@@ -0,0 +1,54 @@
+"""add_offer_url_unique_index
+
+Revision ID: b5e2c8d04f17
+Revises: a1c4e9b7f062
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e2c8d04f17'
+down_revision = 'a1c4e9b7f062'
+branch_labels = None
+depends_on = None
+
+
+# Suffix given to the links of repeated offers, e.g. "https://loja/p#oferta-42"
+DUPLICATE_SUFFIX = "#oferta-{id}"
+URL_MAX_LENGTH = 255
+
+
+def upgrade():
+    # Offers without a link were saved with an empty string; NULLs don't collide
+    op.execute("UPDATE offers SET offer_url = NULL WHERE offer_url = ''")
+
+    # Offers sharing a link: the oldest keeps it, the others get it with a
+    # "#oferta-<id>" fragment (same page, unique) or NULL if it would not fit
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        "SELECT id, offer_url FROM offers WHERE offer_url IN ("
+        "SELECT offer_url FROM offers WHERE offer_url IS NOT NULL "
+        "GROUP BY offer_url HAVING COUNT(*) > 1) "
+        "ORDER BY offer_url, id"
+    )).fetchall()
+    seen = set()
+    for offer_id, url in duplicates:
+        if url not in seen:
+            seen.add(url)
+            continue
+        unique_url = url + DUPLICATE_SUFFIX.format(id=offer_id)
+        bind.execute(
+            sa.text("UPDATE offers SET offer_url = :url WHERE id = :id"),
+            {"url": unique_url if len(unique_url) <= URL_MAX_LENGTH else None, "id": offer_id},
+        )
+
+    with op.batch_alter_table('offers', schema=None) as batch_op:
+        batch_op.create_index('uq_offers_offer_url', ['offer_url'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('offers', schema=None) as batch_op:
+        batch_op.drop_index('uq_offers_offer_url')
@@ -0,0 +1,29 @@
+"""add_offer_search_index
+
+Revision ID: c4e8f1a27b90
+Revises: 3746ae2ab69a
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_index, drop_search_index, rebuild_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8f1a27b90'
+down_revision = '3746ae2ab69a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 table on SQLite, tsvector + GIN on PostgreSQL (no-op elsewhere)
+    bind = op.get_bind()
+    create_search_index(bind)
+    rebuild_search_index(bind)
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
@@ -0,0 +1,63 @@
+"""add_price_history
+
+Revision ID: c7d3f5a9e214
+Revises: b5e2c8d04f17
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d3f5a9e214'
+down_revision = 'b5e2c8d04f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('price_history',
+    sa.Column('offer_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['offer_id'], ['offers.id'], ),
+    )
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.create_index('ix_price_history_offer_id_ts', ['offer_id', 'ts'], unique=False)
+        batch_op.create_index('ix_price_history_ts', ['ts'], unique=False)
+
+    op.create_table('price_rollups',
+    sa.Column('offer_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=4), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('min_price', sa.Integer(), nullable=False),
+    sa.Column('max_price', sa.Integer(), nullable=False),
+    sa.Column('last_price', sa.Integer(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['offer_id'], ['offers.id'], ),
+    sa.PrimaryKeyConstraint('offer_id', 'period', 'bucket')
+    )
+    with op.batch_alter_table('price_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_price_rollups_period_bucket', ['period', 'bucket'], unique=False)
+
+    # Current prices are the first point of every existing offer
+    op.execute(sa.text(
+        "INSERT INTO price_history (offer_id, ts, price) "
+        "SELECT id, COALESCE(updated_at, created_at, :now), ROUND(price * 100) FROM offers "
+        "WHERE price IS NOT NULL"
+    ).bindparams(now=datetime.utcnow()))
+
+
+def downgrade():
+    with op.batch_alter_table('price_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_price_rollups_period_bucket')
+
+    op.drop_table('price_rollups')
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_price_history_ts')
+        batch_op.drop_index('ix_price_history_offer_id_ts')
+
+    op.drop_table('price_history')
@@ -0,0 +1,55 @@
+"""add_offer_and_coupon_filter_indexes
+
+Revision ID: d91b5e3f7a26
+Revises: c4e8f1a27b90
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b5e3f7a26'
+down_revision = 'c4e8f1a27b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('offers', schema=None) as batch_op:
+        batch_op.create_index('ix_offers_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_offers_seller_id_created_at', ['seller_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_offers_category_id_created_at', ['category_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_offers_manufacturer_id_created_at', ['manufacturer_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_offers_product_id', ['product_id'], unique=False)
+        batch_op.create_index('ix_offers_price', ['price'], unique=False)
+        batch_op.create_index('ix_offers_expires_at', ['expires_at'], unique=False)
+
+    # Partial on SQLite/PostgreSQL; plain indexes on MariaDB/MySQL
+    with op.batch_alter_table('coupons', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_coupons_active_seller_id_code', ['seller_id', 'code'], unique=False,
+            sqlite_where=sa.text('active = 1'), postgresql_where=sa.text('active'),
+        )
+        batch_op.create_index(
+            'ix_coupons_active_expires_at', ['expires_at'], unique=False,
+            sqlite_where=sa.text('active = 1'), postgresql_where=sa.text('active'),
+        )
+        batch_op.create_index('ix_coupons_active_created_at', ['active', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('coupons', schema=None) as batch_op:
+        batch_op.drop_index('ix_coupons_active_created_at')
+        batch_op.drop_index('ix_coupons_active_expires_at')
+        batch_op.drop_index('ix_coupons_active_seller_id_code')
+
+    with op.batch_alter_table('offers', schema=None) as batch_op:
+        batch_op.drop_index('ix_offers_expires_at')
+        batch_op.drop_index('ix_offers_price')
+        batch_op.drop_index('ix_offers_product_id')
+        batch_op.drop_index('ix_offers_manufacturer_id_created_at')
+        batch_op.drop_index('ix_offers_category_id_created_at')
+        batch_op.drop_index('ix_offers_seller_id_created_at')
+        batch_op.drop_index('ix_offers_created_at_id')
@@ -0,0 +1,37 @@
+"""make_offer_created_at_not_null
+
+Revision ID: e2f4a6c8b013
+Revises: c7d3f5a9e214
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f4a6c8b013'
+down_revision = 'c7d3f5a9e214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The offer lists page by (created_at, id): rows without created_at would
+    # never be reached. Old rows get their last update time (or now).
+    offers = sa.table('offers', sa.column('created_at', sa.DateTime()), sa.column('updated_at', sa.DateTime()))
+    op.execute(
+        offers.update()
+        .where(offers.c.created_at.is_(None))
+        .values(created_at=sa.func.coalesce(offers.c.updated_at, datetime.utcnow()))
+    )
+
+    with op.batch_alter_table('offers', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('offers', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
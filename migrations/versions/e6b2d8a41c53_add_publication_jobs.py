@@ -0,0 +1,49 @@
+"""add_publication_jobs
+
+Revision ID: e6b2d8a41c53
+Revises: d91b5e3f7a26
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b2d8a41c53'
+down_revision = 'd91b5e3f7a26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('publication_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.Column('network', sa.String(length=50), nullable=False),
+    sa.Column('caption', sa.Text(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'DONE', 'FAILED', name='publicationjobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=120), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('external_id', sa.String(length=255), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['publication_id'], ['publications.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('publication_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_publication_jobs_status_network_available_at', ['status', 'network', 'available_at'], unique=False)
+        batch_op.create_index('ix_publication_jobs_publication_id', ['publication_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('publication_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_publication_jobs_publication_id')
+        batch_op.drop_index('ix_publication_jobs_status_network_available_at')
+
+    op.drop_table('publication_jobs')
+    sa.Enum(name='publicationjobstatus').drop(op.get_bind(), checkfirst=True)
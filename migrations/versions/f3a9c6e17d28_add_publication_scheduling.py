@@ -0,0 +1,62 @@
+"""add_publication_scheduling
+
+Revision ID: f3a9c6e17d28
+Revises: e6b2d8a41c53
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c6e17d28'
+down_revision = 'e6b2d8a41c53'
+branch_labels = None
+depends_on = None
+
+OLD_STATUSES = ('PENDING', 'RUNNING', 'DONE', 'FAILED')
+NEW_STATUSES = ('SCHEDULED',) + OLD_STATUSES
+
+
+def upgrade():
+    with op.batch_alter_table('publications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('scheduled_for', sa.DateTime(), nullable=True))
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE publicationjobstatus ADD VALUE IF NOT EXISTS 'SCHEDULED'")
+    elif dialect in ('mysql', 'mariadb'):
+        with op.batch_alter_table('publication_jobs', schema=None) as batch_op:
+            batch_op.alter_column(
+                'status',
+                existing_type=sa.Enum(*OLD_STATUSES, name='publicationjobstatus'),
+                type_=sa.Enum(*NEW_STATUSES, name='publicationjobstatus'),
+                existing_nullable=False,
+            )
+
+    with op.batch_alter_table('publication_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_publication_jobs_status_available_at', ['status', 'available_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('publication_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_publication_jobs_status_available_at')
+
+    # Scheduled jobs are released to be sent right away
+    op.execute("UPDATE publication_jobs SET status = 'PENDING' WHERE status = 'SCHEDULED'")
+
+    dialect = op.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        with op.batch_alter_table('publication_jobs', schema=None) as batch_op:
+            batch_op.alter_column(
+                'status',
+                existing_type=sa.Enum(*NEW_STATUSES, name='publicationjobstatus'),
+                type_=sa.Enum(*OLD_STATUSES, name='publicationjobstatus'),
+                existing_nullable=False,
+            )
+    # PostgreSQL can't drop an enum value; the unused 'SCHEDULED' label stays
+
+    with op.batch_alter_table('publications', schema=None) as batch_op:
+        batch_op.drop_column('scheduled_for')
@@ -0,0 +1,44 @@
+"""
+Token bucket rate limiter
+
+Shared by the publication worker (one bucket per network) and the
+MercadoLivre scrapers (one bucket per API host). Standard library only and
+outside the ``app`` package, so the standalone scrapers can use it without
+loading the Flask application.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Thread-safe token bucket (``rate`` tokens per second, 0 = unlimited)"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """Wait for a token; returns False if ``stop_event`` was set meanwhile"""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Delete uploaded images that no product uses anymore
+
+Files are left behind by deleted offers, failed transactions and abandoned
+uploads. This walks the upload folder and removes every image (with its
+variants) that no Product.image_url references, as long as it is older than
+the grace period. Safe to run from cron while the site is up.
+
+Usage:
+    python scripts/cleanup_orphan_images.py --dry-run     # only report
+    python scripts/cleanup_orphan_images.py --grace-hours 48
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils.upload import collect_orphan_images
+
+
+def format_bytes(size):
+    """Human readable size"""
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+
+def cleanup(subfolder='products', grace_hours=24.0, dry_run=False):
+    """Remove orphaned uploads and print what was reclaimed"""
+
+    app = create_app()
+
+    with app.app_context():
+        action = "Simulando limpeza" if dry_run else "Limpando"
+        print(f"🧹 {action} de imagens órfãs em uploads/{subfolder} (mais antigas que {grace_hours:g}h)...")
+
+        stats = collect_orphan_images(subfolder, grace_period=grace_hours * 3600, dry_run=dry_run)
+
+        verb = "seriam removido(s)" if dry_run else "removido(s)"
+        print(f"📂 {stats['scanned']} arquivo(s) verificado(s)")
+        print(f"🗑️  {stats['deleted']} arquivo(s) {verb}: {format_bytes(stats['reclaimed_bytes'])}")
+        if stats['recent']:
+            print(f"⏳ {stats['recent']} arquivo(s) órfão(s) dentro do período de carência")
+        if stats['failed']:
+            print(f"⚠️  {stats['failed']} arquivo(s) não puderam ser removidos")
+        print("✅ Concluído.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Remove imagens enviadas que nenhum produto usa mais")
+    parser.add_argument("--subfolder", default="products", help="Pasta dentro de uploads (padrão: products)")
+    parser.add_argument("--grace-hours", type=float, default=24.0,
+                        help="Idade mínima, em horas, de um arquivo para ser removido (padrão: 24)")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas mostra o que seria removido")
+    args = parser.parse_args()
+    cleanup(args.subfolder, args.grace_hours, args.dry_run)
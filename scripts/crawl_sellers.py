@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Crawl many MercadoLivre sellers concurrently
+
+Sellers come from the command line, a file (one nickname/ID per line, ``#``
+comments) or the active sellers of the ``sellers`` table. Several sellers are
+crawled at the same time, all through one keep-alive session and one rate
+limit for the API host. Request slots are handed out round-robin across the
+sellers being crawled, so a seller with thousands of items doesn't starve the
+others. 403/429 responses are retried with jittered exponential backoff (a
+429 also pauses the whole host for the backoff time).
+
+Each seller is streamed to ``result_data/mercadolivre_<seller>_<date>.jsonl``
+with checkpoints. With ``--time-limit`` the crawl stops when the window ends;
+unfinished sellers keep their checkpoint and ``--resume`` continues them on
+the next run. The sellers finished by the crawl are recorded in a manifest
+(``result_data/crawl_sellers.manifest.json``), which ``--resume`` uses to skip
+them; a run without ``--resume`` starts a new manifest. ``--import`` loads
+every finished seller into the catalog.
+
+Usage:
+    python scripts/crawl_sellers.py VENDEDOR1 VENDEDOR2
+    python scripts/crawl_sellers.py --file vendedores.txt --concurrency 8 --rate 10
+    python scripts/crawl_sellers.py --from-db --time-limit 240 --import
+    python scripts/crawl_sellers.py --from-db --resume
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mercadolivre_scraper import RESULT_DIR, MercadoLivreScraper
+from scraper_output import JsonlSink, find_interrupted
+
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 10
+
+# Sellers finished by the current crawl, in the result folder
+MANIFEST_NAME = 'crawl_sellers.manifest.json'
+
+# Nickname in a MercadoLivre store/profile URL
+STORE_URL_PATTERN = re.compile(r'mercadoli[bv]re\.com[^/]*/(?:pagina|perfil|loja)/([^/?#]+)|_Tienda_([^_/?#]+)')
+
+
+class FairRateLimiter:
+    """
+    Token bucket shared by every seller of the crawl
+
+    Waiting requests are served round-robin by seller: after a seller gets a
+    token it goes to the back of the line, whatever the number of threads it
+    has waiting.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queues = OrderedDict()  # seller -> waiting tickets, in serving order
+        self._cond = threading.Condition()
+
+    def acquire(self, seller: str):
+        """Block until the seller may send a request"""
+        ticket = object()
+        with self._cond:
+            self._queues.setdefault(seller, deque()).append(ticket)
+            while True:
+                now = time.monotonic()
+                if self.rate > 0:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if next(iter(self._queues)) != seller or self._queues[seller][0] is not ticket:
+                    self._cond.wait()
+                    continue
+
+                delay = self._paused_until - now
+                if delay <= 0 and self.rate > 0 and self._tokens < 1:
+                    delay = (1 - self._tokens) / self.rate
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                if self.rate > 0:
+                    self._tokens -= 1
+                queue = self._queues.pop(seller)
+                queue.popleft()
+                if queue:
+                    self._queues[seller] = queue  # Back of the line
+                self._cond.notify_all()
+                return
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (the host is throttling us)"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def for_seller(self, seller: str, progress: 'SellerProgress' = None) -> '_SellerLimiter':
+        """Limiter handle with the RateLimiter interface, for one seller's scraper"""
+        return _SellerLimiter(self, seller, progress)
+
+
+class _SellerLimiter:
+    """acquire() of a FairRateLimiter bound to one seller (counts the requests)"""
+
+    def __init__(self, limiter: FairRateLimiter, seller: str, progress: 'SellerProgress' = None):
+        self.limiter = limiter
+        self.seller = seller
+        self.progress = progress
+
+    def acquire(self):
+        self.limiter.acquire(self.seller)
+        if self.progress is not None:
+            self.progress.add(requests=1)
+
+
+class SellerProgress:
+    """Counters of one seller, updated by its threads and read by the reporter"""
+
+    def __init__(self, seller: str):
+        self.seller = seller
+        self.status = 'pendente'
+        self.products = 0
+        self.total = 0
+        self.requests = 0
+        self.retries = 0
+        self.started = None
+        self.finished = None
+        self.output = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def line(self) -> str:
+        """One-line progress report"""
+        done = f"{self.products}/{self.total}" if self.total else str(self.products)
+        percent = f" ({min(self.products / self.total, 1):.0%})" if self.total else ""
+        text = (f"{self.seller}: {self.status} - {done} produtos{percent}, "
+                f"{self.requests} requisições, {self.retries} novas tentativas, {self.elapsed:.0f}s")
+        if self.error:
+            text += f" - {self.error}"
+        return text
+
+
+class SellerScraper(MercadoLivreScraper):
+    """Scraper of one seller, sharing the session and the rate limit of the crawl"""
+
+    # 403 from the API is usually throttling as well
+    RETRY_STATUSES = (403, 429)
+    MAX_RETRIES = 4
+
+    def __init__(self, seller: str, session, limiter: FairRateLimiter, progress: SellerProgress,
+                 max_workers: int = 4, country_code: str = "MLB"):
+        super().__init__(country_code=country_code, max_workers=max_workers, rate=0)
+        self.session.close()
+        self.session = session
+        self.limiter = limiter
+        self.rate_limiter = limiter.for_seller(seller, progress)
+        self.progress = progress
+
+    def _backoff_delay(self, attempt, response) -> float:
+        delay = super()._backoff_delay(attempt, response)
+        self.progress.add(retries=1)
+        if response.status_code == 429:
+            # Too many requests for the host: everybody waits
+            self.limiter.pause(delay)
+        return delay
+
+
+class _MainThreadOutput:
+    """stdout that drops what other threads print (the scrapers are verbose)"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        if threading.current_thread() is threading.main_thread():
+            return self.stream.write(text)
+        return len(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def read_sellers_file(path):
+    """Sellers of a text file: one per line, blank lines and # comments ignored"""
+    sellers = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            seller = line.split('#', 1)[0].strip()
+            if seller:
+                sellers.append(seller)
+    return sellers
+
+
+def sellers_from_db(app):
+    """Nicknames of the active sellers (from the MercadoLivre store URL, or the name)"""
+    from app.models import Seller
+
+    with app.app_context():
+        sellers = []
+        for seller in Seller.query.filter_by(active=True).order_by(Seller.name):
+            match = STORE_URL_PATTERN.search(seller.website or '')
+            sellers.append(next(filter(None, match.groups())) if match else seller.name)
+        return sellers
+
+
+class CrawlOrchestrator:
+    """Crawl a list of sellers concurrently with a shared, fair rate limit"""
+
+    def __init__(self, sellers, concurrency=8, rate=10.0, workers=4, result_dir=RESULT_DIR,
+                 resume=False, time_limit=None, on_finished=None):
+        """
+        Args:
+            sellers: Seller nicknames or IDs
+            concurrency: Sellers crawled at the same time
+            rate: Requests per second to the API host, for the whole crawl
+            workers: Concurrent requests of each seller
+            result_dir: Folder of the JSONL files
+            resume: Skip the sellers the manifest records as finished and
+                continue the interrupted files of the others
+            time_limit: Seconds after which no new seller starts and running
+                ones stop at their next checkpoint
+            on_finished: Called in the main thread with each finished SellerProgress
+        """
+        self.sellers = list(dict.fromkeys(sellers))
+        self.concurrency = max(concurrency, 1)
+        self.workers = max(workers, 1)
+        self.result_dir = result_dir
+        self.resume = resume
+        self.time_limit = time_limit
+        self.on_finished = on_finished
+        self.limiter = FairRateLimiter(rate)
+        self.progress = {seller: SellerProgress(seller) for seller in self.sellers}
+        self._stop = threading.Event()
+        self._manifest_lock = threading.Lock()
+        self.manifest_path = os.path.join(result_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest() if resume else {}
+        if not resume:
+            self._save_manifest()
+
+        # One keep-alive connection pool for every thread of the crawl
+        self.session = MercadoLivreScraper(max_workers=self.concurrency * self.workers, rate=0).session
+
+    def _load_manifest(self) -> dict:
+        """Sellers finished by the crawl being resumed: seller -> {output, finished_at}"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f).get('sellers', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self):
+        """Write the manifest atomically (caller holds the lock or runs alone)"""
+        os.makedirs(self.result_dir, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'sellers': self.manifest}, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.manifest_path)
+
+    def _mark_finished(self, seller: str, output: str):
+        """Record a finished seller, so --resume doesn't crawl it again"""
+        with self._manifest_lock:
+            self.manifest[seller] = {
+                'output': output,
+                'finished_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._save_manifest()
+
+    def crawl_seller(self, seller: str) -> SellerProgress:
+        """Stream one seller to its JSONL file"""
+        progress = self.progress[seller]
+        if self._stop.is_set():
+            progress.status = 'não iniciado'
+            return progress
+        if seller in self.manifest:
+            # Finished by the run being resumed
+            progress.status = 'já concluído'
+            progress.output = self.manifest[seller].get('output')
+            return progress
+        progress.status = 'coletando'
+        progress.started = time.monotonic()
+
+        safe_name = re.sub(r'[^\w.-]+', '-', seller)
+        output = None
+        if self.resume:
+            output = find_interrupted(self.result_dir, f"mercadolivre_{safe_name}_")
+        if not output:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output = os.path.join(self.result_dir, f"mercadolivre_{safe_name}_{timestamp}.jsonl")
+        progress.output = output
+
+        scraper = SellerScraper(seller, self.session, self.limiter, progress, max_workers=self.workers)
+        sink = JsonlSink(output, resume=self.resume)
+        progress.products = sink.written
+        completed = False
+        try:
+            start = sink.state.get('position', 0) if sink.resumed else 0
+            for products, position in scraper.iter_seller_items(seller, start=start):
+                sink.write_batch(products, seller_id=seller, position=position)
+                progress.products = sink.written
+                progress.total = scraper.expected_total
+                if self._stop.is_set():
+                    break
+            else:
+                completed = True
+        finally:
+            sink.close(completed=completed)
+            progress.finished = time.monotonic()
+        if completed:
+            self._mark_finished(seller, output)
+        progress.status = 'concluído' if completed else 'interrompido'
+        return progress
+
+    def run(self, report=print):
+        """
+        Crawl every seller
+
+        Returns:
+            The SellerProgress of every seller, in input order
+        """
+        started = time.monotonic()
+        deadline = started + self.time_limit if self.time_limit else None
+        last_report = {}
+        finished = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        futures = {executor.submit(self.crawl_seller, seller): seller for seller in self.sellers}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    progress = self.progress[futures[future]]
+                    if future.cancelled():
+                        progress.status = 'não iniciado'
+                        continue
+                    error = future.exception()
+                    if error is not None:
+                        progress.status = 'falhou'
+                        progress.error = str(error)
+                        progress.finished = progress.finished or time.monotonic()
+                    finished += 1
+                    report(f"🏁 [{finished}/{len(self.sellers)}] {progress.line()}")
+                    last_report[progress.seller] = progress.line()
+                    if progress.status == 'concluído' and self.on_finished:
+                        self.on_finished(progress)
+
+                # Sellers whose progress changed since the last report
+                for progress in self.progress.values():
+                    if progress.status == 'coletando' and last_report.get(progress.seller) != progress.line():
+                        report(f"⏳ {progress.line()}")
+                        last_report[progress.seller] = progress.line()
+
+                if deadline and time.monotonic() >= deadline and not self._stop.is_set():
+                    report("⏰ Fim da janela de tempo: interrompendo as coletas no próximo checkpoint")
+                    self.stop()
+                    for future in pending:
+                        future.cancel()
+        except KeyboardInterrupt:
+            report("\n⏸️  Interrompendo as coletas no próximo checkpoint...")
+            self.stop()
+            for future in pending:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        return [self.progress[seller] for seller in self.sellers]
+
+    def stop(self):
+        """Start no new seller and stop the running ones at their next batch"""
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta vários vendedores do Mercado Livre em paralelo")
+    parser.add_argument("sellers", nargs="*", help="Nicknames ou IDs dos vendedores")
+    parser.add_argument("--file", help="Arquivo com um vendedor por linha")
+    parser.add_argument("--from-db", action="store_true", help="Usa os vendedores ativos do banco de dados")
+    parser.add_argument("--concurrency", type=int, default=8, help="Vendedores coletados ao mesmo tempo (padrão: 8)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="Requisições por segundo à API, somando todos os vendedores (padrão: 10)")
+    parser.add_argument("--workers", type=int, default=4, help="Requisições simultâneas por vendedor (padrão: 4)")
+    parser.add_argument("--time-limit", type=float,
+                        help="Duração máxima da coleta, em minutos (o que faltar fica para --resume)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Pula os vendedores já concluídos e continua as coletas interrompidas dos demais")
+    parser.add_argument("--import", dest="import_results", action="store_true",
+                        help="Importa para o catálogo cada vendedor concluído")
+    parser.add_argument("--output-dir", default=RESULT_DIR, help="Pasta dos arquivos JSONL (padrão: result_data)")
+    parser.add_argument("--verbose", action="store_true", help="Mostra as mensagens de cada requisição")
+    args = parser.parse_args()
+
+    app = None
+    if args.from_db or args.import_results:
+        from app import create_app
+        app = create_app()
+
+    sellers = list(args.sellers)
+    if args.file:
+        sellers += read_sellers_file(args.file)
+    if args.from_db:
+        sellers += sellers_from_db(app)
+    if not sellers:
+        parser.error("informe os vendedores, --file ou --from-db")
+
+    on_finished = None
+    if args.import_results:
+        from app.catalog_import import CatalogImporter
+
+        def on_finished(progress):
+            with app.app_context():
+                stats = CatalogImporter(default_seller=progress.seller).import_file(progress.output)
+            print(f"📥 {progress.seller}: {stats.offers} ofertas importadas")
+
+    orchestrator = CrawlOrchestrator(
+        sellers,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        workers=args.workers,
+        result_dir=args.output_dir,
+        resume=args.resume,
+        time_limit=args.time_limit * 60 if args.time_limit else None,
+        on_finished=on_finished,
+    )
+
+    print(f"🕷️  Coletando {len(orchestrator.sellers)} vendedor(es): {orchestrator.concurrency} ao mesmo tempo, "
+          f"{args.rate:g} req/s no total")
+    started = time.monotonic()
+    if not args.verbose:
+        sys.stdout = _MainThreadOutput(sys.stdout)
+    try:
+        results = orchestrator.run()
+    except KeyboardInterrupt:
+        print("⏸️  Coleta interrompida. Para continuar: use --resume")
+        return 1
+    finally:
+        if isinstance(sys.stdout, _MainThreadOutput):
+            sys.stdout = sys.stdout.stream
+
+    elapsed = time.monotonic() - started
+    by_status = {}
+    for progress in results:
+        by_status.setdefault(progress.status, []).append(progress)
+    print("\n" + "=" * 60)
+    if by_status.get('já concluído'):
+        print(f"⏭️  {len(by_status['já concluído'])} já concluído(s) na execução anterior")
+    print(f"✅ {len(by_status.get('concluído', []))} concluído(s), "
+          f"{sum(p.products for p in results)} produtos, "
+          f"{sum(p.requests for p in results)} requisições em {elapsed / 60:.1f} min")
+    for status in ('interrompido', 'não iniciado', 'falhou'):
+        if by_status.get(status):
+            print(f"⚠️  {len(by_status[status])} {status}: {', '.join(p.seller for p in by_status[status])}")
+    if by_status.get('interrompido') or by_status.get('não iniciado'):
+        print("💡 Rode de novo com --resume para continuar de onde parou")
+    return 1 if by_status.get('falhou') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
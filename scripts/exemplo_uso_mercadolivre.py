@@ -157,6 +157,7 @@ def example_multi_seller_comparison():
     scraper = MercadoLivreScraper(country_code="MLB")
     
     # Replace with actual seller IDs
+    # (for many sellers use crawl_sellers.py: concurrent, rate limited and resumable)
     sellers = ["VENDEDOR1", "VENDEDOR2", "VENDEDOR3"]
     
     comparison_data = []
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Generate resized WebP/JPEG variants for existing product images
+
+New uploads get their variants automatically; run this once for images
+uploaded before, or with --force after changing IMAGE_VARIANTS.
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product
+from app.utils.upload import create_image_variants
+
+BATCH_SIZE = 100
+
+
+def generate(force=False):
+    """Create the variants of every product image that has none"""
+
+    app = create_app()
+
+    with app.app_context():
+        query = Product.query.filter(Product.image_url.isnot(None))
+        if not force:
+            query = query.filter(Product.image_variants.is_(None))
+        products = query.order_by(Product.id).all()
+
+        if not products:
+            print("✅ Todas as imagens já possuem variantes.")
+            return
+
+        print(f"🖼️  Gerando variantes para {len(products)} imagem(ns)...")
+        created = failed = 0
+        # Products sharing the same (content-addressed) image are processed once
+        processed = {}
+        for index, product in enumerate(products, start=1):
+            if product.image_url not in processed:
+                processed[product.image_url] = create_image_variants(product.image_url)
+            variants = processed[product.image_url]
+            if variants:
+                product.image_variants = variants
+                created += 1
+            else:
+                failed += 1
+                print(f"⚠️  Não foi possível processar: {product.image_url}")
+            if index % BATCH_SIZE == 0:
+                db.session.commit()
+        db.session.commit()
+
+        print(f"✅ {created} imagem(ns) processada(s), {failed} com erro.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera variantes redimensionadas das imagens de produtos")
+    parser.add_argument("--force", action="store_true", help="Regera também imagens que já têm variantes")
+    generate(parser.parse_args().force)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Import scraper results into the catalog
+
+Reads the JSON/JSONL/CSV files written by the MercadoLivre scrapers
+(result_data/) and creates or updates the products, offers and sellers.
+Offers are matched by URL and products by slug, so the same file can be
+imported again to refresh prices.
+
+Usage:
+    python scripts/import_scraper_results.py result_data/ml_loja_20251119_203045.json
+    python scripts/import_scraper_results.py result_data/*.jsonl --seller "Loja Oficial"
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.catalog_import import DEFAULT_CHUNK_SIZE, CatalogImporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa os arquivos gerados pelos scrapers para produtos e ofertas")
+    parser.add_argument("files", nargs="+", help="Arquivos .json, .jsonl ou .csv")
+    parser.add_argument("--seller", default=None,
+                        help="Vendedor das ofertas (padrão: o nome do arquivo, ml_<vendedor>_<data>)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Registros gravados por transação (padrão: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--config", default=None, help="Configuração do app (development, production...)")
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+
+    with app.app_context():
+        importer = CatalogImporter(default_seller=args.seller, chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        for path in args.files:
+            before = importer.stats.read
+            print(f"📥 Importando {path}...")
+            try:
+                importer.import_file(path)
+            except (OSError, ValueError) as e:
+                print(f"❌ Erro ao importar {path}: {e}")
+                continue
+            print(f"   {importer.stats.read - before} registro(s) lido(s)")
+        elapsed = time.perf_counter() - started
+
+        stats = importer.stats
+        rate = stats.read / elapsed if elapsed else 0
+        print(f"✅ {stats.products} produto(s) e {stats.offers} oferta(s) gravados, "
+              f"{stats.sellers} vendedor(es) criado(s), {stats.skipped} registro(s) ignorado(s)")
+        print(f"📈 {stats.price_changes} preço(s) novo(s) ou alterado(s) no histórico")
+        print(f"⏱️  {elapsed:.1f}s ({rate:,.0f} registros/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,246 @@
 """
 MercadoLivre Product Scraper
 Script to collect products from a MercadoLivre seller including price, description and title.
+
+Requests go through a shared keep-alive connection pool and a token-bucket
+rate limiter; item details use the multiget API (20 items per call) and
+pages, items and descriptions are fetched by a bounded pool of threads.
+
+Incremental sync (sync_seller_items / --incremental) keeps a local SQLite
+cache with the ETag/Last-Modified of each response and a snapshot of each
+item: listings and descriptions are requested conditionally, and only items
+whose last_updated changed are downloaded again.
+
+The command line streams the products to a JSON Lines file while they are
+collected (scraper_output.JsonlSink): memory stays flat for any seller, and
+--resume continues an interrupted run from its last checkpoint.
 """
 
 import requests
+import argparse
+import hashlib
 import json
 import csv
-from typing import List, Dict, Optional
+import os
+import random
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
 import time
 
+# Add parent directory to path (rate_limit.py lives in the project root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rate_limit import RateLimiter
+from scraper_output import JsonlSink, PageFetchError, export_csv, export_json, find_interrupted, load_checkpoint
+
+
+def chunked(values: List, size: int) -> Iterable[List]:
+    """Split a list in consecutive chunks of at most ``size`` elements"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+RESULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'result_data')
+
+# Default location of the incremental sync cache
+DEFAULT_CACHE_PATH = os.path.join(RESULT_DIR, '.mercadolivre_cache.sqlite3')
+
+
+def content_hash(data) -> str:
+    """Stable SHA-256 of a JSON document"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+# Item fields that change without the description changing (price, stock,
+# sales, timestamps): left out of the description hash
+VOLATILE_ITEM_FIELDS = frozenset({
+    'last_updated', 'price', 'base_price', 'original_price', 'sale_price',
+    'available_quantity', 'sold_quantity', 'initial_quantity',
+    'status', 'sub_status', 'health', 'stop_time',
+})
+
+
+def description_hash(item: Dict) -> str:
+    """Hash of the item fields that go with its description (the description is re-fetched when it changes)"""
+    return content_hash({key: value for key, value in item.items() if key not in VOLATILE_ITEM_FIELDS})
+
+
+class HttpCache:
+    """
+    On-disk cache for incremental syncs (SQLite, thread-safe)
+    
+    - responses: validators (ETag/Last-Modified) and body of each URL, used
+      to send conditional requests
+    - items: last_updated, description hash (see description_hash), extracted
+      product and description of each item already synced
+    """
+    
+    # Max. host parameters per SQLite statement
+    BATCH_SIZE = 500
+    
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    body TEXT,
+                    fetched_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS items (
+                    item_id TEXT PRIMARY KEY,
+                    seller_id TEXT,
+                    last_updated TEXT,
+                    content_hash TEXT,
+                    product TEXT,
+                    description TEXT,
+                    synced_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS ix_items_seller_id ON items (seller_id);
+            """)
+    
+    def get_response(self, url: str) -> Optional[Dict]:
+        """Cached validators and body of a URL"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'body': row[2]}
+    
+    def store_response(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str):
+        """Remember the validators and body of a 200 response"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, content_hash, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, hashlib.sha256(body.encode('utf-8')).hexdigest(), body,
+                 datetime.now().isoformat(timespec='seconds')),
+            )
+    
+    def record_hit(self):
+        """Count a 304 Not Modified answered from the cache"""
+        with self._lock:
+            self.hits += 1
+    
+    def get_items(self, item_ids: List[str]) -> Dict[str, Dict]:
+        """Cached state of the given items, by item id"""
+        items = {}
+        with self._lock:
+            for ids in chunked(list(item_ids), self.BATCH_SIZE):
+                rows = self._conn.execute(
+                    "SELECT item_id, last_updated, content_hash, product, description FROM items "
+                    f"WHERE item_id IN ({', '.join('?' * len(ids))})",
+                    ids,
+                )
+                for item_id, last_updated, digest, product, description in rows:
+                    items[item_id] = {
+                        'last_updated': last_updated,
+                        'content_hash': digest,
+                        'product': json.loads(product),
+                        'description': description,
+                    }
+        return items
+    
+    def store_items(self, seller_id: str, rows: List[tuple]):
+        """Save (item_id, last_updated, content_hash, product, description) rows"""
+        synced_at = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO items "
+                "(item_id, seller_id, last_updated, content_hash, product, description, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (item_id, seller_id, last_updated, digest, json.dumps(product, ensure_ascii=False),
+                     description, synced_at)
+                    for item_id, last_updated, digest, product, description in rows
+                ],
+            )
+    
+    def seller_item_ids(self, seller_id: str) -> List[str]:
+        """Ids of the cached items of a seller"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT item_id FROM items WHERE seller_id = ?", (seller_id,)
+            )]
+    
+    def remove_missing(self, seller_id: str, item_ids: List[str]) -> int:
+        """Forget the items of a seller that are no longer listed (item_ids must be the complete listing)"""
+        listed = set(item_ids)
+        with self._lock:
+            cached = [row[0] for row in self._conn.execute(
+                "SELECT item_id FROM items WHERE seller_id = ?", (seller_id,)
+            )]
+            removed = [(item_id,) for item_id in cached if item_id not in listed]
+            self._conn.executemany("DELETE FROM items WHERE item_id = ?", removed)
+        return len(removed)
+    
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
 
 class MercadoLivreScraper:
     """Scraper for MercadoLivre products by seller"""
     
     BASE_URL = "https://api.mercadolibre.com"
     
-    def __init__(self, country_code: str = "MLB"):
+    # Items per /items?ids= call (API limit)
+    MULTIGET_SIZE = 20
+    
+    # Results per search page, and deepest offset the public search returns (API limits)
+    PAGE_SIZE = 50
+    SEARCH_MAX_OFFSET = 1000
+    
+    # Retries for these statuses and 5xx responses
+    RETRY_STATUSES = (429,)
+    MAX_RETRIES = 3
+    
+    def __init__(
+        self,
+        country_code: str = "MLB",
+        max_workers: int = 8,
+        rate: float = 10.0,
+        cache: Optional[HttpCache] = None,
+    ):
         """
         Initialize the scraper
         
         Args:
             country_code: Country code (MLB for Brazil, MLA for Argentina, etc.)
+            max_workers: Concurrent requests
+            rate: Maximum requests per second, shared by all workers (0 = unlimited)
+            cache: HTTP/item cache used for conditional requests and incremental syncs
         """
         self.country_code = country_code
+        self.cache = cache
+        self.expected_total = 0  # Items of the seller being collected (set by iter_seller_items)
+        self.max_workers = max(max_workers, 1)
+        self.rate_limiter = RateLimiter(rate)
         self.session = requests.Session()
+        # One keep-alive connection per worker, reused across requests
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
@@ -39,6 +255,89 @@ class MercadoLivreScraper:
             'Sec-Fetch-Site': 'same-site',
         })
     
+    def _get(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: int = 10,
+        headers: Optional[Dict] = None,
+    ) -> requests.Response:
+        """
+        GET through the rate limiter, retrying RETRY_STATUSES and 5xx responses
+        
+        Args:
+            url: Request URL
+            params: Query string parameters
+            timeout: Timeout in seconds
+            headers: Extra request headers
+            
+        Returns:
+            The last response received
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, params=params, timeout=timeout, headers=headers)
+            if response.status_code not in self.RETRY_STATUSES and response.status_code < 500:
+                return response
+            if attempt < self.MAX_RETRIES:
+                time.sleep(self._backoff_delay(attempt, response))
+        return response
+    
+    def _backoff_delay(self, attempt: int, response: requests.Response) -> float:
+        """Seconds to wait before a retry: Retry-After, or exponential with jitter"""
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return float(retry_after)
+        # Jitter keeps concurrent workers from retrying in lockstep
+        return 2 ** attempt * random.uniform(0.5, 1.5)
+    
+    def _get_json(self, url: str, params: Optional[Dict] = None, timeout: int = 10,
+                  raise_errors: bool = False):
+        """
+        GET a JSON document, conditionally when a cache is configured
+        
+        The ETag/Last-Modified of the previous response are sent back; a 304
+        answer is served from the cache without downloading the body again.
+        
+        Args:
+            raise_errors: Raise HTTPError for an error status instead of returning None
+        
+        Returns:
+            Parsed JSON, or None if the request failed
+        """
+        cached = None
+        headers = {}
+        if self.cache is not None:
+            cache_key = requests.Request('GET', url, params=params).prepare().url
+            cached = self.cache.get_response(cache_key)
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+        
+        response = self._get(url, params=params, timeout=timeout, headers=headers)
+        if response.status_code == 304 and cached:
+            self.cache.record_hit()
+            return json.loads(cached['body'])
+        if response.status_code != 200:
+            if raise_errors:
+                response.raise_for_status()
+            return None
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if self.cache is not None and (etag or last_modified):
+            self.cache.store_response(cache_key, etag, last_modified, response.text)
+        return response.json()
+    
+    def _map(self, func, values: List) -> List:
+        """Run ``func`` over ``values`` with the worker pool, keeping the order"""
+        if len(values) <= 1:
+            return [func(value) for value in values]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mercadolivre") as executor:
+            return list(executor.map(func, values))
+    
     def get_seller_info(self, seller_nickname: str) -> Optional[Dict]:
         """
         Get seller information to obtain the numeric seller ID
@@ -56,7 +355,7 @@ class MercadoLivreScraper:
                 'limit': 1
             }
             
-            response = self.session.get(url, params=params, timeout=10)
+            response = self._get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -75,6 +374,9 @@ class MercadoLivreScraper:
         """
         Get all items from a seller
         
+        The first search page gives the total; the remaining pages and the
+        descriptions are then fetched concurrently.
+        
         Args:
             seller_id: The seller ID or nickname
             limit: Number of items per page (max 50)
@@ -83,7 +385,37 @@ class MercadoLivreScraper:
             List of product dictionaries
         """
         all_products = []
-        offset = 0
+        try:
+            for products, _ in self.iter_seller_items(seller_id, limit=limit):
+                all_products.extend(products)
+        except PageFetchError as e:
+            print(f"⚠️ {e}")
+            print("Continuando com os produtos já coletados...")
+        
+        print(f"✅ Total de produtos coletados: {len(all_products)}")
+        return all_products
+    
+    def iter_seller_items(self, seller_id: str, limit: int = 50, start: int = 0) -> Iterator[Tuple[List[Dict], int]]:
+        """
+        Stream the items of a seller, one batch at a time
+        
+        A batch is max_workers search pages (or max_workers multiget calls for
+        sellers past the search limit) fetched concurrently with their
+        descriptions; only the current batch is kept in memory.
+        
+        Args:
+            seller_id: The seller ID or nickname
+            limit: Number of items per page (max 50)
+            start: Position to start from (returned with a previous batch)
+            
+        Yields:
+            (products of the batch, position after the batch)
+            
+        Raises:
+            PageFetchError: A page failed after the retries; the batches
+                before it were all yielded, so the run can resume from it
+        """
+        limit = min(limit, self.PAGE_SIZE)
         
         print(f"🔍 Buscando produtos do vendedor: {seller_id}")
         
@@ -95,94 +427,316 @@ class MercadoLivreScraper:
                 print(f"✓ ID numérico do vendedor: {numeric_id}")
                 seller_id = str(numeric_id)
         
-        while True:
-            url = f"{self.BASE_URL}/sites/{self.country_code}/search"
+        url = f"{self.BASE_URL}/sites/{self.country_code}/search"
+        
+        def fetch_page(offset: int) -> Optional[Dict]:
             params = {
                 'seller_id': seller_id,
-                'limit': min(limit, 50),
+                'limit': limit,
                 'offset': offset
             }
-            
             try:
-                response = self.session.get(url, params=params, timeout=15)
-                
-                # Handle 403 errors with more informative message
-                if response.status_code == 403:
-                    print(f"❌ Acesso negado (403). Tentando método alternativo...")
-                    return self._get_items_alternative_method(seller_id)
-                
+                response = self._get(url, params=params, timeout=15)
+                if response.status_code == 403 and offset == 0:
+                    return None
                 response.raise_for_status()
-                data = response.json()
-                
-                results = data.get('results', [])
-                if not results:
-                    break
-                
-                print(f"📦 Coletados {len(results)} produtos (offset: {offset})")
-                
-                for item in results:
-                    product_info = self._extract_product_info(item)
-                    if product_info:
-                        all_products.append(product_info)
-                
-                # Check if there are more pages
-                paging = data.get('paging', {})
-                total = paging.get('total', 0)
-                
-                if offset + limit >= total:
-                    break
-                
-                offset += limit
-                time.sleep(1)  # Increased delay to avoid rate limiting
-                
+                return response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # Skipping the page would lose its items: stop where --resume can retry it
+                print(f"❌ Erro ao buscar produtos (offset: {offset}): {e}")
+                raise PageFetchError(f"Falha ao buscar os produtos do offset {offset}: {e}") from e
+        
+        first_page = fetch_page(0)
+        if first_page is None:
+            # Handle 403 errors with more informative message
+            print(f"❌ Acesso negado (403). Tentando método alternativo...")
+            yield from self._iter_items_alternative_method(seller_id, start)
+            return
+        
+        total = first_page.get('paging', {}).get('total', 0)
+        self.expected_total = total
+        if total > self.SEARCH_MAX_OFFSET:
+            # The search stops at offset 1000: list the ids and use the multiget
+            item_ids = self.get_seller_item_ids(seller_id)
+            if item_ids:
+                yield from self._iter_items_by_id(item_ids, start)
+                return
+            print(f"⚠️ Vendedor com {total} produtos: a busca só retorna os primeiros {self.SEARCH_MAX_OFFSET}")
+        
+        last_offset = min(total, self.SEARCH_MAX_OFFSET)
+        step = limit * self.max_workers
+        for batch_start in range(start, last_offset, step):
+            offsets = list(range(batch_start, min(batch_start + step, last_offset), limit))
+            pages = self._map(lambda offset: first_page if offset == 0 else fetch_page(offset), offsets)
+            
+            items = []
+            for page in pages:
+                results = (page or {}).get('results', [])
+                items.extend(results)
+            position = min(batch_start + step, last_offset)
+            print(f"📦 Coletados {position} de {total} produtos")
+            
+            yield self._build_products(items), position
+    
+    def _iter_items_by_id(self, item_ids: List[str], start: int = 0) -> Iterator[Tuple[List[Dict], int]]:
+        """Multiget the given items in batches of max_workers calls; position = index in item_ids"""
+        batch = self.MULTIGET_SIZE * self.max_workers
+        self.expected_total = len(item_ids)
+        for position in range(start, len(item_ids), batch):
+            chunk = item_ids[position:position + batch]
+            items = self.get_items(chunk, strict=True)
+            print(f"📦 Coletados {position + len(chunk)} de {len(item_ids)} produtos")
+            yield self._build_products(items), position + len(chunk)
+    
+    def get_seller_item_ids(self, seller_id: str) -> List[str]:
+        """
+        Get the ids of every item of a seller (users endpoint)
+        
+        Args:
+            seller_id: The numeric seller ID
+            
+        Returns:
+            List of item ids (empty if the endpoint is not available)
+        """
+        return self._list_seller_item_ids(seller_id)[0]
+    
+    def _list_seller_item_ids(self, seller_id: str) -> Tuple[List[str], bool]:
+        """Item ids from the users endpoint and whether the listing is complete"""
+        url = f"{self.BASE_URL}/users/{seller_id}/items/search"
+        return self._collect_item_ids(url, {}, lambda result: result)
+    
+    def _search_item_ids(self, seller_id: str) -> Tuple[List[str], bool]:
+        """Item ids from the public search (up to SEARCH_MAX_OFFSET) and whether the listing is complete"""
+        url = f"{self.BASE_URL}/sites/{self.country_code}/search"
+        return self._collect_item_ids(url, {'seller_id': seller_id}, lambda result: result.get('id'),
+                                      max_offset=self.SEARCH_MAX_OFFSET)
+    
+    def _collect_item_ids(self, url: str, params: Dict, extract: Callable[[Dict], str],
+                          max_offset: Optional[int] = None) -> Tuple[List[str], bool]:
+        """
+        Read every page of an item listing
+        
+        Args:
+            url: Listing endpoint
+            params: Query parameters besides limit and offset
+            extract: Returns the item id of one entry of ``results``
+            max_offset: Stop at this offset (the search stops at 1000)
+            
+        Returns:
+            (item ids, complete): complete is False when a page failed, the
+            listing stopped at max_offset or changed while it was read, so
+            some listed items may be missing from the ids
+        """
+        def fetch_page(offset: int) -> Optional[Dict]:
+            try:
+                data = self._get_json(url, params={**params, 'limit': self.PAGE_SIZE, 'offset': offset},
+                                      timeout=15)
             except requests.exceptions.RequestException as e:
-                print(f"❌ Erro ao buscar produtos: {e}")
-                break
+                print(f"⚠️ Erro ao listar produtos (offset: {offset}): {e}")
+                return None
+            if data is None:
+                print(f"❌ Listagem de produtos do vendedor falhou (offset: {offset})")
+            return data
         
-        print(f"✅ Total de produtos coletados: {len(all_products)}")
-        return all_products
+        first_page = fetch_page(0)
+        if first_page is None:
+            return [], False
+        total = first_page.get('paging', {}).get('total', len(first_page.get('results', [])))
+        last_offset = total if max_offset is None else min(total, max_offset)
+        pages = [first_page] + self._map(fetch_page, list(range(self.PAGE_SIZE, last_offset, self.PAGE_SIZE)))
+        
+        item_ids = [extract(result) for page in pages if page for result in page.get('results', [])]
+        # Pages may overlap if the listing changes while it is read
+        item_ids = list(dict.fromkeys(item_ids))
+        complete = all(page is not None for page in pages) and len(item_ids) >= total
+        return item_ids, complete
     
-    def _get_items_alternative_method(self, seller_id: str) -> List[Dict]:
+    def _iter_items_alternative_method(self, seller_id: str, start: int = 0) -> Iterator[Tuple[List[Dict], int]]:
         """
         Alternative method to get items using different API endpoint
         
         Args:
             seller_id: The seller ID
+            start: Index in the item id listing to start from
             
-        Returns:
-            List of product dictionaries
+        Yields:
+            (products of the batch, position after the batch)
         """
-        all_products = []
-        
         try:
-            # Try using the users endpoint
-            url = f"{self.BASE_URL}/users/{seller_id}/items/search"
-            params = {'limit': 50, 'offset': 0}
+            item_ids = self.get_seller_item_ids(seller_id)
+            if not item_ids:
+                print(f"❌ Método alternativo também falhou")
+                return
             
-            response = self.session.get(url, params=params, timeout=15)
+            print(f"✓ Encontrados {len(item_ids)} IDs de produtos")
+            print(f"⏳ Buscando detalhes dos produtos...")
             
-            if response.status_code == 200:
-                data = response.json()
-                item_ids = data.get('results', [])
-                
-                print(f"✓ Encontrados {len(item_ids)} IDs de produtos")
-                print(f"⏳ Buscando detalhes dos produtos...")
-                
-                for item_id in item_ids[:50]:  # Limit to first 50 for testing
-                    item_detail = self._get_item_detail(item_id)
-                    if item_detail:
-                        product_info = self._extract_product_info(item_detail)
-                        if product_info:
-                            all_products.append(product_info)
-                    time.sleep(0.5)
-                
-                print(f"✅ Coletados {len(all_products)} produtos via método alternativo")
-            else:
-                print(f"❌ Método alternativo também falhou: {response.status_code}")
-                
-        except Exception as e:
+            yield from self._iter_items_by_id(item_ids, start)
+            
+        except requests.exceptions.RequestException as e:
             print(f"❌ Erro no método alternativo: {e}")
+    
+    def get_items(self, item_ids: List[str], attributes: Optional[str] = None,
+                  strict: bool = False) -> List[Dict]:
+        """
+        Get the details of many items with the multiget API
+        
+        Items are requested 20 at a time (/items?ids=...), in parallel.
         
+        Args:
+            item_ids: Item ids
+            attributes: Only return these fields (e.g. "id,last_updated")
+            strict: Raise PageFetchError when a request fails instead of
+                skipping its items
+            
+        Returns:
+            Item detail dictionaries, in the order of item_ids (missing items skipped)
+        """
+        url = f"{self.BASE_URL}/items"
+        
+        def fetch_chunk(ids: List[str]) -> List[Dict]:
+            params = {'ids': ','.join(ids)}
+            if attributes:
+                params['attributes'] = attributes
+            try:
+                response = self._get(url, params=params, timeout=15)
+                response.raise_for_status()
+                return [
+                    entry.get('body') for entry in response.json()
+                    if entry.get('code') == 200 and entry.get('body')
+                ]
+            except Exception as e:
+                print(f"⚠️ Erro ao buscar detalhes de {len(ids)} itens: {e}")
+                if strict:
+                    raise PageFetchError(f"Falha ao buscar os detalhes de {len(ids)} itens: {e}") from e
+                return []
+        
+        items = []
+        for chunk in self._map(fetch_chunk, list(chunked(list(item_ids), self.MULTIGET_SIZE))):
+            items.extend(chunk)
+        return items
+    
+    def _build_products(self, items: List[Dict]) -> List[Dict]:
+        """Fetch the descriptions concurrently and extract the product information"""
+        descriptions = self._map(self._get_product_description, [item.get('id') for item in items])
+        products = []
+        for item, description in zip(items, descriptions):
+            product_info = self._extract_product_info(item, description)
+            if product_info:
+                products.append(product_info)
+        return products
+    
+    def sync_seller_items(self, seller_id: str) -> List[Dict]:
+        """
+        Incremental version of get_seller_items (requires a cache)
+        
+        1. list the item ids (conditional requests: unchanged pages cost a 304)
+        2. read only id and last_updated of every item (multiget)
+        3. download items whose last_updated differs from the cache
+        4. fetch descriptions only for items whose description hash changed
+           (price, stock and sales changes keep the cached description)
+        
+        Unchanged items come from the cache, so a daily re-sync only moves the
+        changed fraction of the catalog. Items no longer listed are dropped
+        from the cache only when the whole listing was read; after a failed
+        page, or for a seller past the search limit, they are kept.
+        
+        Args:
+            seller_id: The seller ID or nickname
+            
+        Returns:
+            List of product dictionaries (same format as get_seller_items)
+        """
+        if self.cache is None:
+            raise ValueError("sync_seller_items requer um HttpCache")
+        
+        print(f"🔄 Sincronizando produtos do vendedor: {seller_id}")
+        hits_before = self.cache.hits
+        seller_info = self.get_seller_info(seller_id)
+        if seller_info and seller_info.get('id'):
+            seller_id = str(seller_info['id'])
+        
+        item_ids, complete = self._list_seller_item_ids(seller_id)
+        if not item_ids:
+            item_ids, complete = self._search_item_ids(seller_id)
+        if not item_ids:
+            print("⚠️ Nenhum produto encontrado para este vendedor")
+            return []
+        
+        stamps = {
+            item.get('id'): item.get('last_updated')
+            for item in self.get_items(item_ids, attributes='id,last_updated')
+        }
+        cached = self.cache.get_items(item_ids)
+        stale = [
+            item_id for item_id in item_ids
+            if item_id not in cached
+            or stamps.get(item_id) is None
+            or cached[item_id]['last_updated'] != stamps[item_id]
+        ]
+        
+        # Changed items are extracted again; only those whose description
+        # fields changed need their description downloaded again
+        fresh = self.get_items(stale)
+        digests = {item.get('id'): description_hash(item) for item in fresh}
+        to_describe = [
+            item_id for item_id, digest in digests.items()
+            if item_id not in cached or cached[item_id]['content_hash'] != digest
+        ]
+        descriptions = dict(zip(to_describe, self._map(self._fetch_description, to_describe)))
+        
+        rows = []
+        failed = 0
+        for item in fresh:
+            item_id = item.get('id')
+            last_updated, digest = item.get('last_updated'), digests[item_id]
+            if item_id in descriptions:
+                description = descriptions[item_id]
+            else:
+                description = cached[item_id]['description']
+            if description is None:
+                # Not cached as synced: the next sync fetches the item and its description again
+                failed += 1
+                last_updated = digest = None
+                previous = cached.get(item_id)
+                description = previous['description'] if previous else 'N/A'
+            product = self._extract_product_info(item, description)
+            if product:
+                product.pop('description')
+                product.pop('created_date', None)
+                rows.append((item_id, last_updated, digest, product, description))
+        
+        self.cache.store_items(seller_id, rows)
+        removed = 0
+        if complete:
+            removed = self.cache.remove_missing(seller_id, item_ids)
+        else:
+            # A missing id may just be on a page that was not read: keep the
+            # cached items of the seller and return them as they were
+            listed = set(item_ids)
+            item_ids = item_ids + [item_id for item_id in self.cache.seller_item_ids(seller_id)
+                                   if item_id not in listed]
+            print("⚠️ Listagem de produtos incompleta: itens em cache não listados foram mantidos")
+        self.cache.commit()
+        
+        synced_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        states = self.cache.get_items(item_ids)
+        all_products = []
+        for item_id in item_ids:
+            state = states.get(item_id)
+            if state is None:
+                continue  # Listed but no longer available
+            product = dict(state['product'])
+            product['created_date'] = synced_at
+            product['description'] = state['description']
+            all_products.append(product)
+        
+        print(f"📊 {len(item_ids)} produtos: {len(item_ids) - len(stale)} sem alteração, "
+              f"{len(fresh)} atualizados/novos, {removed} removidos, "
+              f"{len(to_describe) - failed} descrições baixadas, {self.cache.hits - hits_before} respostas 304")
+        if failed:
+            print(f"⚠️ {failed} descrições não puderam ser baixadas: serão buscadas de novo na próxima sincronização")
+        print(f"✅ Total de produtos sincronizados: {len(all_products)}")
         return all_products
     
     def _get_item_detail(self, item_id: str) -> Optional[Dict]:
@@ -197,7 +751,7 @@ class MercadoLivreScraper:
         """
         try:
             url = f"{self.BASE_URL}/items/{item_id}"
-            response = self.session.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -208,12 +762,13 @@ class MercadoLivreScraper:
             print(f"⚠️ Erro ao buscar detalhes do item {item_id}: {e}")
             return None
     
-    def _extract_product_info(self, item: Dict) -> Optional[Dict]:
+    def _extract_product_info(self, item: Dict, description: Optional[str] = None) -> Optional[Dict]:
         """
         Extract relevant information from a product
         
         Args:
             item: Raw product data from API
+            description: Description already fetched (fetched now if None)
             
         Returns:
             Dictionary with product information
@@ -233,7 +788,8 @@ class MercadoLivreScraper:
             }
             
             # Get detailed description if needed
-            description = self._get_product_description(item.get('id'))
+            if description is None:
+                description = self._get_product_description(item.get('id'))
             product['description'] = description
             
             return product
@@ -250,21 +806,30 @@ class MercadoLivreScraper:
             item_id: Product ID
             
         Returns:
-            Product description text
+            Product description text ('N/A' if unavailable)
+        """
+        description = self._fetch_description(item_id)
+        return 'N/A' if description is None else description
+    
+    def _fetch_description(self, item_id: str) -> Optional[str]:
+        """
+        Get the full description of a product, telling failures apart
+        
+        Returns:
+            Description text, 'N/A' if the item has none, None if the request failed
         """
         try:
             url = f"{self.BASE_URL}/items/{item_id}/description"
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('plain_text', 'N/A')
-            else:
+            data = self._get_json(url, timeout=10, raise_errors=True)
+            return data.get('plain_text', 'N/A')
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
                 return 'N/A'
-                
+            print(f"⚠️ Erro ao buscar descrição do produto {item_id}: {e}")
+            return None
         except Exception as e:
             print(f"⚠️ Erro ao buscar descrição do produto {item_id}: {e}")
-            return 'N/A'
+            return None
     
     def save_to_json(self, products: List[Dict], filename: str):
         """
@@ -306,6 +871,17 @@ class MercadoLivreScraper:
 
 def main():
     """Main function to run the scraper"""
+    parser = argparse.ArgumentParser(description="Coleta os produtos de um vendedor do Mercado Livre")
+    parser.add_argument("seller_id", nargs="?", help="ID numérico ou nickname do vendedor")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Sincroniza só o que mudou desde a última execução (cache local)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Arquivo do cache da sincronização incremental")
+    parser.add_argument("--output", help="Arquivo JSON Lines gravado durante a coleta "
+                                         "(padrão: result_data/mercadolivre_<vendedor>_<data>.jsonl)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continua a coleta interrompida a partir do último checkpoint")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🛒 MercadoLivre Product Scraper")
     print("=" * 60)
@@ -314,28 +890,72 @@ def main():
     print("   Para encontrar o ID: acesse o perfil e veja na URL")
     
     # Get seller ID from user
-    seller_id = input("\n📝 Digite o ID numérico ou nickname do vendedor: ").strip()
+    seller_id = args.seller_id or input("\n📝 Digite o ID numérico ou nickname do vendedor: ").strip()
     
     if not seller_id:
         print("❌ ID do vendedor não pode estar vazio")
         return
     
+    resume = args.resume and not args.incremental
+    if args.resume and args.incremental:
+        print("⚠️ --resume não se aplica à sincronização incremental (o cache já evita baixar de novo)")
+    output = args.output
+    if resume and not output:
+        output = find_interrupted(RESULT_DIR, f"mercadolivre_{seller_id}_")
+        if not output:
+            print("⚠️ Nenhuma coleta interrompida deste vendedor. Iniciando do zero.")
+    if not output:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULT_DIR, f"mercadolivre_{seller_id}_{timestamp}.jsonl")
+    checkpoint = load_checkpoint(output) if resume else None
+    if checkpoint and checkpoint.get('state', {}).get('seller_id') != seller_id:
+        print(f"❌ O checkpoint de {output} é de outro vendedor: "
+              f"{checkpoint.get('state', {}).get('seller_id')}")
+        return
+    
     # Initialize scraper
-    scraper = MercadoLivreScraper(country_code="MLB")  # MLB = MercadoLivre Brasil
+    cache = HttpCache(args.cache) if args.incremental else None
+    scraper = MercadoLivreScraper(country_code="MLB", cache=cache)  # MLB = MercadoLivre Brasil
     
-    # Collect products
-    products = scraper.get_seller_items(seller_id)
+    # Collect products, written to the JSONL file batch by batch
+    sample = []
+    try:
+        with JsonlSink(output, resume=resume) as sink:
+            if sink.resumed:
+                print(f"↩️  Retomando coleta: {sink.written} produtos já salvos (posição {sink.state.get('position', 0)})")
+            
+            if cache is not None:
+                batches = [(scraper.sync_seller_items(seller_id), None)]
+            else:
+                batches = scraper.iter_seller_items(seller_id, start=sink.state.get('position', 0))
+            
+            for products, position in batches:
+                sink.write_batch(products, seller_id=seller_id, position=position)
+                sample.extend(products[:3 - len(sample)])
+            total = sink.written
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Coleta interrompida. Para continuar: python scripts/mercadolivre_scraper.py {seller_id} --resume")
+        return
+    except PageFetchError as e:
+        print(f"\n❌ {e}")
+        print(f"⏸️  Coleta interrompida. Para continuar: python scripts/mercadolivre_scraper.py {seller_id} --resume")
+        return
+    finally:
+        if cache is not None:
+            cache.close()
     
-    if not products:
+    if not total:
         print("⚠️ Nenhum produto encontrado para este vendedor")
         return
     
+    print(f"💾 {total} produtos salvos em: {output}")
+    
     # Display sample
     print("\n" + "=" * 60)
     print("📊 Amostra dos dados coletados:")
     print("=" * 60)
     
-    for i, product in enumerate(products[:3], 1):
+    for i, product in enumerate(sample, 1):
         print(f"\n{i}. {product['title']}")
         print(f"   💰 Preço: {product['currency_id']} {product['price']}")
         print(f"   📦 Disponível: {product['available_quantity']}")
@@ -349,16 +969,18 @@ def main():
     print("1. JSON")
     print("2. CSV")
     print("3. Ambos")
-    choice = input("Escolha (1-3): ").strip()
+    print("4. Apenas o JSON Lines já salvo")
+    choice = input("Escolha (1-4): ").strip()
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    base_filename = f"mercadolivre_{seller_id}_{timestamp}"
+    base_filename = os.path.splitext(output)[0]
     
     if choice in ['1', '3']:
-        scraper.save_to_json(products, f"{base_filename}.json")
+        export_json(output, f"{base_filename}.json")
+        print(f"💾 Dados salvos em: {base_filename}.json")
     
     if choice in ['2', '3']:
-        scraper.save_to_csv(products, f"{base_filename}.csv")
+        export_csv(output, f"{base_filename}.csv")
+        print(f"💾 Dados salvos em: {base_filename}.csv")
     
     print("\n✅ Processo concluído com sucesso!")
     print("=" * 60)
@@ -2,17 +2,27 @@
 MercadoLivre Product Scraper using Web Scraping
 Alternative method when API returns 403 errors
 Uses BeautifulSoup for simple scraping without browser automation
+
+The command line appends the products of each page to a JSON Lines file as
+they are scraped; --resume continues an interrupted run from the page after
+the last checkpoint.
 """
 
+import argparse
+import os
 import requests
 from bs4 import BeautifulSoup
 import json
 import csv
 import time
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
 import re
 
+from scraper_output import JsonlSink, PageFetchError, export_csv, export_json, find_interrupted, load_checkpoint
+
+RESULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'result_data')
+
 
 class MercadoLivreWebScraper:
     """Web scraper for MercadoLivre products"""
@@ -45,11 +55,37 @@ class MercadoLivreWebScraper:
             List of product dictionaries
         """
         all_products = []
+        try:
+            for _, products in self.iter_seller_pages(seller_nickname, max_pages):
+                all_products.extend(products)
+        except PageFetchError as e:
+            print(f"⚠️ {e}")
+            print("Continuando com os produtos já coletados...")
+        
+        print(f"\n✅ Total de produtos coletados: {len(all_products)}")
+        return all_products
+    
+    def iter_seller_pages(self, seller_nickname: str, max_pages: int = 10,
+                          start_page: int = 1) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Stream the listing pages of a seller, one page at a time
         
+        Args:
+            seller_nickname: Seller nickname
+            max_pages: Last page to scrape
+            start_page: First page (to resume an interrupted run)
+            
+        Yields:
+            (page number, products of the page)
+            
+        Raises:
+            PageFetchError: A page failed to load; the pages before it were
+                all yielded, so the run can resume from it
+        """
         print(f"🔍 Buscando produtos do vendedor: {seller_nickname}")
         print(f"📝 Método: Web Scraping (evita erro 403)")
         
-        for page in range(1, max_pages + 1):
+        for page in range(start_page, max_pages + 1):
             # Build search URL
             offset = (page - 1) * 48  # MercadoLivre shows 48 items per page
             
@@ -69,29 +105,29 @@ class MercadoLivreWebScraper:
                 
                 if response.status_code != 200:
                     print(f"❌ Erro: Status {response.status_code}")
-                    continue
+                    raise PageFetchError(f"Falha ao buscar a página {page}: status {response.status_code}")
                 
                 soup = BeautifulSoup(response.text, 'html.parser')
                 
                 # Find product listings
                 products = self._extract_products_from_page(soup)
                 
-                if not products:
-                    print(f"✓ Fim dos produtos (página {page})")
-                    break
-                
-                print(f"📦 Encontrados {len(products)} produtos nesta página")
-                all_products.extend(products)
-                
-                # Be nice to the server
-                time.sleep(2)
-                
+            except PageFetchError:
+                raise
             except Exception as e:
+                # Skipping the page would lose its products: stop where --resume can retry it
                 print(f"❌ Erro ao processar página {page}: {e}")
-                continue
-        
-        print(f"\n✅ Total de produtos coletados: {len(all_products)}")
-        return all_products
+                raise PageFetchError(f"Falha ao processar a página {page}: {e}") from e
+            
+            if not products:
+                print(f"✓ Fim dos produtos (página {page})")
+                break
+            
+            print(f"📦 Encontrados {len(products)} produtos nesta página")
+            yield page, products
+            
+            # Be nice to the server
+            time.sleep(2)
     
     def _extract_products_from_page(self, soup: BeautifulSoup) -> List[Dict]:
         """
@@ -262,24 +298,67 @@ class MercadoLivreWebScraper:
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Coleta os produtos de um vendedor do Mercado Livre (web scraping)")
+    parser.add_argument("seller", nargs="?", help="Nickname do vendedor")
+    parser.add_argument("--max-pages", type=int, default=5, help="Número máximo de páginas (padrão: 5)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continua a última coleta interrompida deste vendedor")
+    parser.add_argument("--output", help="Arquivo JSON Lines gravado durante a coleta "
+                                         "(padrão: result_data/ml_<vendedor>_<data>.jsonl)")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("🛒 MercadoLivre Product Scraper - Web Scraping Edition")
     print("=" * 70)
     print("\n✨ Este script usa web scraping para evitar erros 403 da API")
     print("💡 Funciona com o nickname do vendedor diretamente!\n")
     
-    seller_nickname = input("📝 Digite o nickname do vendedor: ").strip()
+    seller_nickname = args.seller or input("📝 Digite o nickname do vendedor: ").strip()
     
     if not seller_nickname:
         print("❌ Nickname não pode estar vazio")
         return
     
+    output = args.output
+    if args.resume and not output:
+        output = find_interrupted(RESULT_DIR, f"ml_{seller_nickname}_")
+        if not output:
+            print("⚠️ Nenhuma coleta interrompida deste vendedor. Iniciando do zero.")
+    checkpoint = load_checkpoint(output) if args.resume and output else None
+    if checkpoint and checkpoint.get('state', {}).get('seller') != seller_nickname:
+        print(f"❌ O checkpoint de {output} é de outro vendedor: {checkpoint.get('state', {}).get('seller')}")
+        return
+    if not output:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULT_DIR, f"ml_{seller_nickname}_{timestamp}.jsonl")
+    
     scraper = MercadoLivreWebScraper()
     
-    # Get products
-    products = scraper.get_seller_products(seller_nickname, max_pages=5)
+    # Get products, appended to the JSONL file page by page
+    sample = []
+    try:
+        with JsonlSink(output, resume=bool(checkpoint)) as sink:
+            start_page = sink.state.get('page', 0) + 1 if sink.resumed else 1
+            if sink.resumed:
+                print(f"↩️  Retomando coleta na página {start_page}: {sink.written} produtos já salvos")
+            
+            for page, products in scraper.iter_seller_pages(seller_nickname, args.max_pages, start_page):
+                sink.write_batch(products, seller=seller_nickname, page=page)
+                sample.extend(products[:5 - len(sample)])
+            total = sink.written
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Coleta interrompida. Para continuar: "
+              f"python scripts/mercadolivre_scraper_selenium.py {seller_nickname} --resume")
+        return
+    except PageFetchError as e:
+        print(f"\n❌ {e}")
+        print(f"⏸️  Coleta interrompida. Para continuar: "
+              f"python scripts/mercadolivre_scraper_selenium.py {seller_nickname} --resume")
+        return
+    
+    print(f"\n✅ Total de produtos coletados: {total}")
     
-    if not products:
+    if not total:
         print("\n⚠️ Nenhum produto encontrado")
         print("\n💡 Dicas:")
         print("1. Verifique se o nickname está correto")
@@ -287,34 +366,38 @@ def main():
         print("3. Veja se aparecem produtos")
         return
     
+    print(f"💾 Dados salvos em: {output}")
+    
     # Show sample
     print("\n" + "=" * 70)
     print("📊 Amostra dos dados coletados:")
     print("=" * 70)
     
-    for i, product in enumerate(products[:5], 1):
+    for i, product in enumerate(sample, 1):
         print(f"\n{i}. {product['title'][:60]}...")
         print(f"   💰 Preço: R$ {product['price']:.2f}")
         print(f"   🆔 ID: {product['id']}")
         print(f"   🚚 Frete grátis: {'Sim' if product['free_shipping'] else 'Não'}")
         print(f"   🔗 {product['link'][:60]}...")
     
-    # Save files
+    # Export the JSONL file to other formats
     print("\n" + "=" * 70)
     print("💾 Escolha o formato de exportação:")
     print("1. JSON")
     print("2. CSV")
     print("3. Ambos")
-    choice = input("Escolha (1-3): ").strip()
+    print("4. Apenas o JSON Lines já salvo")
+    choice = input("Escolha (1-4): ").strip()
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    base_filename = f"ml_{seller_nickname}_{timestamp}"
+    base_filename = os.path.splitext(output)[0]
     
     if choice in ['1', '3']:
-        scraper.save_to_json(products, f"{base_filename}.json")
+        export_json(output, f"{base_filename}.json")
+        print(f"💾 Dados salvos em: {base_filename}.json")
     
     if choice in ['2', '3']:
-        scraper.save_to_csv(products, f"{base_filename}.csv")
+        export_csv(output, f"{base_filename}.csv")
+        print(f"💾 Dados salvos em: {base_filename}.csv")
     
     print("\n✅ Processo concluído!")
     print("=" * 70)
@@ -1,6 +1,23 @@
 """
 MercadoLivre Product Scraper using Selenium
 This method works around 403 errors by using a real browser
+
+With workers > 1 the listing pages are spread over a pool of browsers: page 1
+is loaded first (it tells how many pages there are), then each browser takes
+the next free page until the last one. Results are merged in page order and
+deduplicated by item id. The pool is kept open and reused for every seller
+scraped with the same scraper.
+
+Pages are never waited on with fixed sleeps: every load waits until the
+document is complete, no fetch/XHR is in flight and the DOM stopped changing
+(a small script injected in every page tracks both), with a timeout learned
+from the load times seen so far. Images, fonts and trackers are blocked to
+make the pages lighter. Page loads are paced by a rate limit shared by all
+the browsers of the pool (``rate`` pages per second, --rate).
+
+The command line appends the products of each page to a JSON Lines file as
+they are scraped; --resume continues an interrupted run from the page after
+the last checkpoint.
 """
 
 from selenium import webdriver
@@ -9,35 +26,209 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 import time
 import json
 import csv
-from typing import List, Dict
+import os
+import queue
+import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Tuple
 from datetime import datetime
 
+# Add parent directory to path (rate_limit.py lives in the project root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rate_limit import RateLimiter
+from scraper_output import JsonlSink, PageFetchError, export_csv, export_json, find_interrupted, load_checkpoint
+
+
+LISTING_URL = "https://lista.mercadolivre.com.br/pagina/{seller}/"
+ITEMS_PER_PAGE = 50  # MercadoLivre shows ~50 items per page
+MAX_WORKERS = 8
+
+# Requests blocked in every browser (page weight, not needed to read listings)
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+    "*mercadolibre.com/tracks*", "*mercadolivre.com.br/tracks*", "*melidata*",
+]
+
+# Injected before any page script: counts fetch/XHR in flight and records
+# the last network activity and the last DOM change
+PAGE_WATCH_JS = '''
+(() => {
+    if (window.__scraperWatch) return;
+    const watch = window.__scraperWatch = {pending: 0, lastActivity: Date.now(), lastMutation: Date.now()};
+    const done = () => { watch.pending = Math.max(watch.pending - 1, 0); watch.lastActivity = Date.now(); };
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function () {
+            watch.pending++;
+            watch.lastActivity = Date.now();
+            return originalFetch.apply(this, arguments).finally(done);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        watch.pending++;
+        watch.lastActivity = Date.now();
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+    new MutationObserver(() => { watch.lastMutation = Date.now(); })
+        .observe(document, {childList: true, subtree: true});
+})();
+'''
+
+PAGE_SETTLED_JS = '''
+const quiet = arguments[0];
+const watch = window.__scraperWatch;
+if (document.readyState !== 'complete') return false;
+if (!watch) return true;
+const now = Date.now();
+return watch.pending === 0 && now - watch.lastActivity >= quiet && now - watch.lastMutation >= quiet;
+'''
+
+SETTLE_QUIET_MS = 250  # No request and no DOM change for this long = page ready
+POLL_FREQUENCY = 0.1
+
+
+def page_settled(quiet_ms: int = SETTLE_QUIET_MS):
+    """WebDriverWait condition: document complete, network idle and DOM stable"""
+    def condition(driver):
+        return driver.execute_script(PAGE_SETTLED_JS, quiet_ms)
+    return condition
+
+
+class AdaptiveTimeout:
+    """Wait timeout learned from the observed load times (thread-safe)"""
+
+    def __init__(self, initial: float = 10.0, minimum: float = 2.0, maximum: float = 30.0,
+                 factor: float = 3.0, window: int = 50):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Add an observed load time"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    @property
+    def value(self) -> float:
+        """factor x the 90th percentile of the recent loads, within [minimum, maximum]"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < 5:
+            return self.initial
+        p90 = samples[int(0.9 * (len(samples) - 1))]
+        return min(max(p90 * self.factor, self.minimum), self.maximum)
+
+    @property
+    def average(self) -> float:
+        """Mean of the recent load times"""
+        with self._lock:
+            return sum(self._samples) / len(self._samples) if self._samples else 0.0
+
+
+class DriverPool:
+    """Browsers shared by the scraping threads (one thread per browser at a time)"""
+
+    def __init__(self, drivers=()):
+        self._drivers = []
+        self._idle = queue.Queue()
+        for driver in drivers:
+            self.add(driver)
+
+    def __len__(self):
+        return len(self._drivers)
+
+    def add(self, driver):
+        """Put a new browser in the pool"""
+        self._drivers.append(driver)
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        """Borrow an idle browser, waiting for one if all are busy"""
+        driver = self._idle.get()
+        try:
+            yield driver
+        finally:
+            self._idle.put(driver)
+
+    def quit(self):
+        """Close every browser of the pool"""
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._drivers = []
+        self._idle = queue.Queue()
+
 
 class MercadoLivreSeleniumScraper:
     """Selenium-based scraper for MercadoLivre"""
     
-    def __init__(self, headless: bool = False, user_data_dir: str = None):
+    MAX_EMPTY_PAGES = 3  # Stop after 3 consecutive empty pages
+    
+    def __init__(self, headless: bool = False, user_data_dir: str = None, workers: int = 1,
+                 block_resources: bool = True, rate: float = 2.0):
         """
         Initialize the scraper
         
         Args:
             headless: Run browser in headless mode (no window)
             user_data_dir: Path to Chrome user data directory for persistent sessions
+            workers: Number of browsers scraping listing pages in parallel
+            block_resources: Block images, fonts and trackers
+            rate: Listing pages loaded per second, shared by all browsers
+                (be nice to the server; 0 = unlimited)
         """
         print("🚀 Inicializando navegador...")
         
+        self.headless = headless
+        self.workers = min(max(workers, 1), MAX_WORKERS)
+        self.block_resources = block_resources
+        self.rate_limiter = RateLimiter(rate)
+        self.load_timeout = AdaptiveTimeout()
+        self._driver_path = None
+        
+        try:
+            self.driver = self._create_driver(user_data_dir)
+            print("✅ Navegador inicializado com sucesso")
+            
+        except Exception as e:
+            print(f"❌ Erro ao inicializar navegador: {e}")
+            print("\n💡 Certifique-se de ter instalado:")
+            print("   pip3 install selenium webdriver-manager")
+            raise
+        
+        # Extra browsers are only started when a parallel scrape needs them
+        self.pool = DriverPool([self.driver])
+    
+    def _create_driver(self, user_data_dir: str = None):
+        """Start a Chrome instance with the anti-detection options"""
         options = Options()
         
-        if headless:
+        if self.headless:
             options.add_argument('--headless')
         
         # Use persistent user data directory to save login session
         if user_data_dir:
-            import os
             # Create directory if it doesn't exist
             os.makedirs(user_data_dir, exist_ok=True)
             options.add_argument(f'--user-data-dir={user_data_dir}')
@@ -53,28 +244,91 @@ class MercadoLivreSeleniumScraper:
         # User agent
         options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         
+        # Resolve the chromedriver once for all the browsers of the pool
+        if self._driver_path is None:
+            self._driver_path = ChromeDriverManager().install()
+        
+        driver = webdriver.Chrome(
+            service=Service(self._driver_path),
+            options=options
+        )
+        
+        # Remove automation flags
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': '''
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                })
+            '''
+        })
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': PAGE_WATCH_JS})
+        
+        driver.execute_cdp_cmd('Network.enable', {})
+        self._set_blocking(driver, self.block_resources)
+        
+        return driver
+    
+    def _set_blocking(self, driver, enabled: bool):
+        """Turn the blocking of images, fonts and trackers on or off"""
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS if enabled else []})
+    
+    def _load(self, driver, url: str) -> bool:
+        """
+        Open a page and wait until it settles (document complete, network
+        idle, DOM stable), at most the adaptive timeout
+        
+        Returns:
+            True if the page settled, False on timeout
+        """
+        started = time.monotonic()
+        driver.get(url)
+        settled = self._wait_settled(driver, self.load_timeout.value)
+        self.load_timeout.record(time.monotonic() - started)
+        return settled
+    
+    def _wait_settled(self, driver, timeout: float, quiet_ms: int = SETTLE_QUIET_MS) -> bool:
+        """Wait for the current page to settle; False on timeout"""
         try:
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=options
-            )
-            
-            # Remove automation flags
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': '''
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    })
-                '''
-            })
-            
-            print("✅ Navegador inicializado com sucesso")
-            
-        except Exception as e:
-            print(f"❌ Erro ao inicializar navegador: {e}")
-            print("\n💡 Certifique-se de ter instalado:")
-            print("   pip3 install selenium webdriver-manager")
-            raise
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(page_settled(quiet_ms))
+            return True
+        except TimeoutException:
+            return False
+    
+    def _ensure_pool(self):
+        """
+        Start the missing browsers of the pool
+        
+        Chrome can't open the same profile twice, so the extra browsers use
+        temporary profiles and receive the cookies of the main one (login).
+        """
+        missing = self.workers - len(self.pool)
+        if missing <= 0:
+            return
+        
+        print(f"🚀 Inicializando mais {missing} navegador(es)...")
+        if 'mercadolivre' not in self.driver.current_url:
+            self.driver.get("https://lista.mercadolivre.com.br/")
+        cookies = [c for c in self.driver.get_cookies() if 'mercadolivre' in c.get('domain', '')]
+        
+        def start(_):
+            driver = self._create_driver()
+            driver.get("https://lista.mercadolivre.com.br/")
+            for cookie in cookies:
+                try:
+                    driver.add_cookie(cookie)
+                except Exception:
+                    continue
+            return driver
+        
+        with ThreadPoolExecutor(max_workers=missing) as executor:
+            futures = [executor.submit(start, i) for i in range(missing)]
+            for future in futures:
+                try:
+                    self.pool.add(future.result())
+                except Exception as e:
+                    print(f"⚠️ Erro ao inicializar navegador extra: {e}")
+        
+        print(f"✅ {len(self.pool)} navegador(es) prontos")
     
     def check_and_wait_for_login(self, seller_nickname: str):
         """
@@ -86,10 +340,9 @@ class MercadoLivreSeleniumScraper:
         print("\n🔐 Verificando se é necessário fazer login...")
         
         # Try to access seller page (Brazil store format)
-        test_url = f"https://lista.mercadolivre.com.br/pagina/{seller_nickname}/"
-        self.driver.get(test_url)
-        time.sleep(3)
-        
+        test_url = self._page_url(seller_nickname, 1)
+        self._load(self.driver, test_url)
+            
         # Check if we're redirected to login or verification page
         current_url = self.driver.current_url
         page_source = self.driver.page_source.lower()
@@ -117,11 +370,14 @@ class MercadoLivreSeleniumScraper:
             print("   fazer login novamente nas próximas execuções!")
             print("\n" + "=" * 70)
             
+            # The login page may need images (captcha)
+            self._set_blocking(self.driver, False)
+            self.driver.refresh()
             input("\n⏸️  Pressione ENTER após fazer login... ")
+            self._set_blocking(self.driver, self.block_resources)
             
             # Verify login was successful
-            self.driver.get(test_url)
-            time.sleep(3)
+            self._load(self.driver, test_url)
             
             current_url = self.driver.current_url
             if 'login' in current_url or 'account-verification' in current_url:
@@ -145,90 +401,279 @@ class MercadoLivreSeleniumScraper:
             List of product dictionaries
         """
         all_products = []
-        page = 1
-        consecutive_empty_pages = 0  # Counter for empty pages
-        MAX_EMPTY_PAGES = 3  # Stop after 3 consecutive empty pages
+        try:
+            for _, products in self.iter_seller_pages(seller_nickname, max_pages):
+                all_products.extend(products)
+        except PageFetchError as e:
+            print(f"⚠️ {e}")
+            print("Continuando com os produtos já coletados...")
         
+        print(f"\n✅ Total de produtos coletados: {len(all_products)}")
+        return all_products
+    
+    def iter_seller_pages(self, seller_nickname: str, max_pages: int = None,
+                          start_page: int = 1) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Stream the listing pages of a seller, in page order
+        
+        Only the pages being scraped are kept in memory, so the products can
+        be written out as they come (see scraper_output.JsonlSink).
+        
+        Args:
+            seller_nickname: Seller nickname
+            max_pages: Last page to scrape (None = all pages)
+            start_page: First page (to resume an interrupted run)
+            
+        Yields:
+            (page number, products of the page)
+            
+        Raises:
+            PageFetchError: A page failed to load; the pages before it were
+                all yielded, so the run can resume from it
+        """
         print(f"\n🔍 Buscando produtos do vendedor: {seller_nickname}")
         if max_pages:
             print(f"📄 Limite: {max_pages} páginas")
         else:
             print(f"📄 Modo: TODAS as páginas (até o fim)")
+        if start_page > 1:
+            print(f"↩️  Começando na página {start_page}")
+        
+        if self.workers > 1 and max_pages != start_page:
+            yield from self._iter_pages_parallel(seller_nickname, max_pages, start_page)
+        else:
+            yield from self._iter_pages_sequential(seller_nickname, max_pages, start_page)
+        
+        print(f"⏱️  Carregamento médio: {self.load_timeout.average:.2f}s por página "
+              f"(timeout atual: {self.load_timeout.value:.1f}s)")
+    
+    def _iter_pages_sequential(self, seller_nickname: str, max_pages: int = None,
+                               start_page: int = 1) -> Iterator[Tuple[int, List[Dict]]]:
+        """Walk the listing pages one after the other with the main browser"""
+        collected = 0
+        page = start_page
+        consecutive_empty_pages = 0  # Counter for empty pages
         
         while True:
             # Check if we reached max_pages limit
             if max_pages and page > max_pages:
                 print(f"\n✓ Limite de {max_pages} páginas atingido")
                 break
-            # Build URL (Brazil store page format)
-            offset = (page - 1) * 50  # MercadoLivre shows ~50 items per page
-            if page == 1:
-                url = f"https://lista.mercadolivre.com.br/pagina/{seller_nickname}/"
-            else:
-                url = f"https://lista.mercadolivre.com.br/pagina/{seller_nickname}/_Desde_{offset + 1}"
             
             print(f"\n📄 Carregando página {page}...")
             
             try:
-                self.driver.get(url)
-                time.sleep(3)  # Wait for page to load
-                
-                # Scroll to load lazy images
-                self._scroll_page()
-                
-                # Extract products
-                products = self._extract_products_from_current_page()
-                
-                if not products:
-                    consecutive_empty_pages += 1
-                    print(f"⚠️ Página {page} vazia ({consecutive_empty_pages}/{MAX_EMPTY_PAGES})")
-                    
-                    if consecutive_empty_pages >= MAX_EMPTY_PAGES:
-                        print(f"✓ Parando após {MAX_EMPTY_PAGES} páginas vazias consecutivas")
-                        break
-                    
-                    # Try next page anyway (might be a loading issue)
-                    page += 1
-                    time.sleep(3)
-                    continue
-                
-                # Reset empty page counter
-                consecutive_empty_pages = 0
-                
-                print(f"📦 Encontrados {len(products)} produtos nesta página")
-                print(f"📊 Total acumulado: {len(all_products) + len(products)} produtos")
-                all_products.extend(products)
+                products, has_next = self._scrape_page(self.driver, seller_nickname, page)
+            except Exception as e:
+                print(f"⚠️ Erro na página {page}: {e}")
+                raise PageFetchError(f"Falha ao carregar a página {page}: {e}") from e
+            
+            if not products:
+                consecutive_empty_pages += 1
+                print(f"⚠️ Página {page} vazia ({consecutive_empty_pages}/{self.MAX_EMPTY_PAGES})")
                 
-                # Check if there's a next page
-                if not self._has_next_page():
-                    print("✓ Última página alcançada - não há botão 'Próxima'")
+                if consecutive_empty_pages >= self.MAX_EMPTY_PAGES:
+                    print(f"✓ Parando após {self.MAX_EMPTY_PAGES} páginas vazias consecutivas")
                     break
                 
-                # Increment page counter
+                # Try next page anyway (might be a loading issue)
+                yield page, []
                 page += 1
-                
-                time.sleep(2)  # Be nice to the server
-                
-            except Exception as e:
-                print(f"⚠️ Erro na página {page}: {e}")
-                print("Continuando com os produtos já coletados...")
+                continue
+            
+            # Reset empty page counter
+            consecutive_empty_pages = 0
+            
+            collected += len(products)
+            print(f"📦 Encontrados {len(products)} produtos nesta página")
+            print(f"📊 Total acumulado: {collected} produtos")
+            yield page, products
+            
+            # Check if there's a next page
+            if not has_next:
+                print("✓ Última página alcançada - não há botão 'Próxima'")
                 break
+            
+            # Increment page counter
+            page += 1
+    
+    def _iter_pages_parallel(self, seller_nickname: str, max_pages: int = None,
+                             start_page: int = 1) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Spread the listing pages over the browser pool
         
-        print(f"\n✅ Total de produtos coletados: {len(all_products)}")
-        return all_products
+        The first page is loaded first to learn the page count; afterwards
+        every browser takes the next page nobody took yet, so fast and slow
+        pages balance out. Pages are handed out in order (browsers never run
+        more than a few pages ahead of the consumer) and products are
+        deduplicated by item id. The scrape stops at the last page (no "next"
+        button or page count), at max_pages or after MAX_EMPTY_PAGES empty
+        pages in a row. A page that fails to load raises PageFetchError once
+        every page before it has been yielded.
+        """
+        self._ensure_pool()
+        
+        counts = {}  # page number -> products found (0 = empty)
+        ready = {}  # scraped pages not handed out yet
+        failed = {}  # page number -> error, for the pages that failed to load
+        cond = threading.Condition()
+        state = {
+            'next_page': start_page + 1,
+            'next_yield': start_page,
+            'last_page': max_pages or float('inf'),
+            'active': 0,
+            'stopped': False,
+        }
+        max_ahead = 2 * len(self.pool)
+        
+        def stop_page():
+            # Last page before a run of MAX_EMPTY_PAGES empty pages
+            for page in sorted(counts):
+                if all(counts.get(p) == 0 for p in range(page, page + self.MAX_EMPTY_PAGES)):
+                    return min(page - 1, state['last_page'])
+            return state['last_page']
+        
+        print(f"\n📄 Carregando página {start_page}...")
+        try:
+            products, has_next = self._scrape_page(self.driver, seller_nickname, start_page)
+        except Exception as e:
+            print(f"⚠️ Erro na página {start_page}: {e}")
+            raise PageFetchError(f"Falha ao carregar a página {start_page}: {e}") from e
+        counts[start_page] = len(products)
+        ready[start_page] = products
+        if products and not has_next:
+            state['last_page'] = start_page
+        else:
+            page_count = self._page_count(self.driver)
+            if page_count:
+                state['last_page'] = min(state['last_page'], page_count)
+                print(f"📚 {page_count} páginas encontradas")
+        
+        def worker():
+            try:
+                with self.pool.driver() as driver:
+                    while True:
+                        with cond:
+                            # Don't run too far ahead of the pages handed out
+                            while (not state['stopped']
+                                   and state['next_page'] > state['next_yield'] + max_ahead):
+                                cond.wait()
+                            page = state['next_page']
+                            if state['stopped'] or failed or page > stop_page():
+                                return
+                            state['next_page'] += 1
+                        
+                        try:
+                            products, has_next = self._scrape_page(driver, seller_nickname, page)
+                        except Exception as e:
+                            # Not an empty page: the run stops there and can be resumed
+                            print(f"⚠️ Erro na página {page}: {e}")
+                            with cond:
+                                failed[page] = e
+                                cond.notify_all()
+                            return
+                        
+                        with cond:
+                            counts[page] = len(products)
+                            ready[page] = products
+                            if products and not has_next:
+                                state['last_page'] = min(state['last_page'], page)
+                            cond.notify_all()
+                        
+                        if products:
+                            print(f"📦 Página {page}: {len(products)} produtos")
+                        else:
+                            print(f"⚠️ Página {page} vazia")
+            finally:
+                with cond:
+                    state['active'] -= 1
+                    cond.notify_all()
+        
+        print(f"🧵 Distribuindo páginas entre {len(self.pool)} navegadores...")
+        state['active'] = len(self.pool)
+        executor = ThreadPoolExecutor(max_workers=len(self.pool))
+        for _ in range(len(self.pool)):
+            executor.submit(worker)
+        
+        seen = set()
+        try:
+            while True:
+                with cond:
+                    page = state['next_yield']
+                    while page not in ready and page not in failed and state['active']:
+                        cond.wait()
+                    if page in failed and page <= stop_page():
+                        raise PageFetchError(f"Falha ao carregar a página {page}: {failed[page]}")
+                    # Pages past the end may repeat the last one
+                    if page not in ready or page > stop_page():
+                        break
+                    products = ready.pop(page)
+                    state['next_yield'] = page + 1
+                    cond.notify_all()
+                
+                unique = []
+                for product in products:
+                    key = product.get('id')
+                    if not key or key == 'N/A':
+                        key = product.get('link')
+                    if key not in seen:
+                        seen.add(key)
+                        unique.append(product)
+                yield page, unique
+        finally:
+            with cond:
+                state['stopped'] = True
+                cond.notify_all()
+            executor.shutdown(wait=True)
+    
+    def _page_url(self, seller_nickname: str, page: int) -> str:
+        """URL of a listing page of the seller (Brazil store page format)"""
+        url = LISTING_URL.format(seller=seller_nickname)
+        if page == 1:
+            return url
+        offset = (page - 1) * ITEMS_PER_PAGE
+        return f"{url}_Desde_{offset + 1}"
     
-    def _scroll_page(self):
+    def _scrape_page(self, driver, seller_nickname: str, page: int) -> Tuple[List[Dict], bool]:
+        """
+        Load a listing page and extract its products
+        
+        Returns:
+            (products, whether there is a next page)
+        """
+        self.rate_limiter.acquire()  # Be nice to the server
+        self._load(driver, self._page_url(seller_nickname, page))
+        
+        # Scroll to load lazy images
+        self._scroll_page(driver)
+        
+        products = self._extract_products_from_current_page(driver)
+        return products, self._has_next_page(driver)
+    
+    def _page_count(self, driver) -> int:
+        """Number of listing pages shown by the pagination ("1 de 42"), 0 if unknown"""
+        try:
+            text = driver.find_element(By.CLASS_NAME, "andes-pagination__page-count").text
+            # The total is the last number: "1 de 42" is the current page first
+            numbers = re.findall(r'\d+', text.replace('.', ''))
+            return int(numbers[-1]) if numbers else 0
+        except Exception:
+            return 0
+    
+    def _scroll_page(self, driver=None):
         """Scroll the page to load lazy-loaded content"""
+        driver = driver or self.driver
         try:
-            # Scroll in steps
+            # Scroll in steps, each one waits for the lazy content it triggered
             for i in range(3):
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 3 * {});".format(i + 1))
-                time.sleep(0.5)
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 3 * {});".format(i + 1))
+                self._wait_settled(driver, self.load_timeout.minimum, quiet_ms=150)
         except Exception as e:
             print(f"⚠️ Erro ao fazer scroll: {e}")
     
-    def _has_next_page(self) -> bool:
+    def _has_next_page(self, driver=None) -> bool:
         """Check if there is a next page button"""
+        driver = driver or self.driver
         try:
             # Try multiple selectors for next page button
             selectors = [
@@ -240,7 +685,7 @@ class MercadoLivreSeleniumScraper:
             
             for selector_type, selector_value in selectors:
                 try:
-                    next_buttons = self.driver.find_elements(selector_type, selector_value)
+                    next_buttons = driver.find_elements(selector_type, selector_value)
                     if next_buttons:
                         button = next_buttons[0]
                         # Check if button is enabled and visible
@@ -254,18 +699,19 @@ class MercadoLivreSeleniumScraper:
             print(f"⚠️ Erro ao verificar próxima página: {e}")
             return False
     
-    def _extract_products_from_current_page(self) -> List[Dict]:
+    def _extract_products_from_current_page(self, driver=None) -> List[Dict]:
         """Extract products from the current page"""
+        driver = driver or self.driver
         products = []
         
         try:
-            # Wait for products to load
-            WebDriverWait(self.driver, 10).until(
+            # The page already settled: products are there or won't come
+            WebDriverWait(driver, 2, poll_frequency=POLL_FREQUENCY).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "ui-search-layout__item"))
             )
             
             # Find product items
-            items = self.driver.find_elements(By.CLASS_NAME, "ui-search-layout__item")
+            items = driver.find_elements(By.CLASS_NAME, "ui-search-layout__item")
             
             for item in items:
                 try:
@@ -326,16 +772,16 @@ class MercadoLivreSeleniumScraper:
                     except:
                         pass
             
-            # Image
+            # Image (lazy images keep the real URL in data-src until they load)
             try:
-                image = item.find_element(By.TAG_NAME, "img").get_attribute("src")
+                img = item.find_element(By.TAG_NAME, "img")
+                image = img.get_attribute("data-src") or img.get_attribute("src")
             except:
                 image = "N/A"
             
             # Extract ID from link or data attributes
             product_id = "N/A"
             if link and link != "N/A":
-                import re
                 match = re.search(r'MLB-?(\d+)', link)
                 if match:
                     product_id = f"MLB{match.group(1)}"
@@ -396,8 +842,7 @@ class MercadoLivreSeleniumScraper:
             Product description
         """
         try:
-            self.driver.get(product_link)
-            time.sleep(2)
+            self._load(self.driver, product_link)
             
             # Try to find description
             try:
@@ -411,12 +856,9 @@ class MercadoLivreSeleniumScraper:
             return "N/A"
     
     def close(self):
-        """Close the browser"""
-        try:
-            self.driver.quit()
-            print("\n✅ Navegador fechado")
-        except:
-            pass
+        """Close the browsers"""
+        self.pool.quit()
+        print("\n✅ Navegador fechado")
     
     def save_to_json(self, products: List[Dict], filename: str):
         """Save products to JSON file"""
@@ -446,7 +888,17 @@ class MercadoLivreSeleniumScraper:
 
 def main():
     """Main function"""
-    import os
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Coleta os produtos de um vendedor do Mercado Livre com o Chrome")
+    parser.add_argument("seller", nargs="?", help="Nickname do vendedor")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continua a última coleta interrompida deste vendedor")
+    parser.add_argument("--output", help="Arquivo JSON Lines gravado durante a coleta "
+                                         "(padrão: result_data/ml_<vendedor>_<data>.jsonl)")
+    parser.add_argument("--rate", type=float, default=2.0,
+                        help="Máximo de páginas por segundo, somando todos os navegadores (0 = sem limite, padrão 2)")
+    args = parser.parse_args()
     
     print("=" * 70)
     print("🛒 MercadoLivre Product Scraper - Selenium Edition")
@@ -455,12 +907,27 @@ def main():
     print("💾 Sua sessão será salva e você não precisará fazer login novamente!")
     print("⚠️  Certifique-se de ter instalado: pip3 install selenium webdriver-manager\n")
     
-    seller_nickname = input("📝 Digite o nickname do vendedor: ").strip()
+    seller_nickname = args.seller or input("📝 Digite o nickname do vendedor: ").strip()
     
     if not seller_nickname:
         print("❌ Nickname não pode estar vazio")
         return
     
+    # Products are written to result_data while they are collected
+    result_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'result_data')
+    output = args.output
+    if args.resume and not output:
+        output = find_interrupted(result_dir, f"ml_{seller_nickname}_")
+        if not output:
+            print("⚠️ Nenhuma coleta interrompida deste vendedor. Iniciando do zero.")
+    checkpoint = load_checkpoint(output) if args.resume and output else None
+    if checkpoint and checkpoint.get('state', {}).get('seller') != seller_nickname:
+        print(f"❌ O checkpoint de {output} é de outro vendedor: {checkpoint.get('state', {}).get('seller')}")
+        return
+    if not output:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(result_dir, f"ml_{seller_nickname}_{timestamp}.jsonl")
+    
     # Ask for headless mode
     headless_input = input("\n🖥️  Executar em modo invisível? (s/N): ").strip().lower()
     headless = headless_input == 's'
@@ -473,6 +940,14 @@ def main():
             print("❌ Operação cancelada")
             return
     
+    # Ask for parallel browsers
+    workers_input = input(f"\n🧵 Quantos navegadores em paralelo? (1-{MAX_WORKERS}, padrão 1): ").strip()
+    try:
+        workers = int(workers_input) if workers_input else 1
+    except ValueError:
+        print("⚠️ Valor inválido. Usando 1 navegador.")
+        workers = 1
+    
     scraper = None
     
     try:
@@ -480,74 +955,97 @@ def main():
         script_dir = os.path.dirname(os.path.abspath(__file__))
         user_data_dir = os.path.join(script_dir, 'chrome_profile')
         
-        scraper = MercadoLivreSeleniumScraper(headless=headless, user_data_dir=user_data_dir)
+        scraper = MercadoLivreSeleniumScraper(headless=headless, user_data_dir=user_data_dir, workers=workers,
+                                              rate=args.rate)
         
         # Check if login is needed and wait for manual login
         if not headless:
             scraper.check_and_wait_for_login(seller_nickname)
         
-        # Ask how many pages to scrape
-        print("\n" + "=" * 70)
-        print("📄 Quantas páginas deseja coletar?")
-        print("=" * 70)
-        print("1. TODAS as páginas (recomendado)")
-        print("2. Número específico de páginas")
-        page_choice = input("\nEscolha (1-2): ").strip()
-        
-        max_pages = None  # Default: all pages
-        if page_choice == '2':
-            try:
-                max_pages = int(input("Digite o número de páginas: ").strip())
-                print(f"✓ Será coletado até {max_pages} páginas")
-            except ValueError:
-                print("⚠️ Valor inválido. Coletando TODAS as páginas.")
-                max_pages = None
+        if checkpoint:
+            # Same page limit as the interrupted run
+            max_pages = checkpoint['state'].get('max_pages')
         else:
-            print("✓ Será coletado TODAS as páginas disponíveis")
+            # Ask how many pages to scrape
+            print("\n" + "=" * 70)
+            print("📄 Quantas páginas deseja coletar?")
+            print("=" * 70)
+            print("1. TODAS as páginas (recomendado)")
+            print("2. Número específico de páginas")
+            page_choice = input("\nEscolha (1-2): ").strip()
+            
+            max_pages = None  # Default: all pages
+            if page_choice == '2':
+                try:
+                    max_pages = int(input("Digite o número de páginas: ").strip())
+                    print(f"✓ Será coletado até {max_pages} páginas")
+                except ValueError:
+                    print("⚠️ Valor inválido. Coletando TODAS as páginas.")
+                    max_pages = None
+            else:
+                print("✓ Será coletado TODAS as páginas disponíveis")
         
-        # Get products
-        products = scraper.get_seller_products(seller_nickname, max_pages=max_pages)
+        # Get products, appended to the JSONL file page by page
+        sample = []
+        with JsonlSink(output, resume=bool(checkpoint)) as sink:
+            start_page = sink.state.get('page', 0) + 1 if sink.resumed else 1
+            if sink.resumed:
+                print(f"\n↩️  Retomando coleta: {sink.written} produtos já salvos")
+            
+            for page, products in scraper.iter_seller_pages(seller_nickname, max_pages, start_page):
+                sink.write_batch(products, seller=seller_nickname, page=page, max_pages=max_pages)
+                sample.extend(products[:5 - len(sample)])
+            total = sink.written
         
-        if not products:
+        print(f"\n✅ Total de produtos coletados: {total}")
+        
+        if not total:
             print("\n⚠️ Nenhum produto encontrado")
             return
         
+        print(f"💾 Dados salvos em: {output}")
+        
         # Show sample
         print("\n" + "=" * 70)
         print("📊 Amostra dos dados coletados:")
         print("=" * 70)
         
-        for i, product in enumerate(products[:5], 1):
+        for i, product in enumerate(sample, 1):
             print(f"\n{i}. {product['title'][:60]}")
             print(f"   💰 Preço: R$ {product['price']:.2f}")
             print(f"   🆔 ID: {product['id']}")
             print(f"   🚚 Frete grátis: {'Sim' if product['free_shipping'] else 'Não'}")
         
-        # Save files
+        # Export the JSONL file to other formats
         print("\n" + "=" * 70)
         print("💾 Escolha o formato de exportação:")
         print("1. JSON")
         print("2. CSV")
         print("3. Ambos")
-        choice = input("Escolha (1-3): ").strip()
-        
-        # Create result_data directory if it doesn't exist
-        result_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'result_data')
-        os.makedirs(result_dir, exist_ok=True)
+        print("4. Apenas o JSON Lines já salvo")
+        choice = input("Escolha (1-4): ").strip()
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        base_filename = f"ml_{seller_nickname}_{timestamp}"
+        base_filename = os.path.splitext(output)[0]
         
         if choice in ['1', '3']:
-            json_path = os.path.join(result_dir, f"{base_filename}.json")
-            scraper.save_to_json(products, json_path)
+            export_json(output, f"{base_filename}.json")
+            print(f"💾 Dados salvos em: {base_filename}.json")
         
         if choice in ['2', '3']:
-            csv_path = os.path.join(result_dir, f"{base_filename}.csv")
-            scraper.save_to_csv(products, csv_path)
+            export_csv(output, f"{base_filename}.csv")
+            print(f"💾 Dados salvos em: {base_filename}.csv")
         
         print("\n✅ Processo concluído!")
         
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Coleta interrompida. Para continuar: "
+              f"python scripts/mercadolivre_selenium_scraper.py {seller_nickname} --resume")
+        
+    except PageFetchError as e:
+        print(f"\n❌ {e}")
+        print(f"⏸️  Coleta interrompida. Para continuar: "
+              f"python scripts/mercadolivre_selenium_scraper.py {seller_nickname} --resume")
+        
     except Exception as e:
         print(f"\n❌ Erro: {e}")
         
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Run the publication workers
+
+Delivers the jobs queued by POST /api/publications. Each process claims jobs
+from the database and sends them with a pool of threads, so several processes
+(on one or more machines) can share the same queue.
+
+Usage:
+    python scripts/publication_worker.py                 # 1 process, until Ctrl+C
+    python scripts/publication_worker.py --processes 4 --threads 32
+    python scripts/publication_worker.py --drain         # exit when the queue is empty
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.publishing import PublicationWorker
+
+
+def run_worker(index, processes, threads, drain, config_name):
+    """Run one worker process until stopped (or until the queue is empty)"""
+    app = create_app(config_name)
+    # Each process gets its share of the per-network limits
+    worker = PublicationWorker(app, threads=threads, share=1 / processes)
+
+    def stop(signum, frame):
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    processed = worker.run(drain=drain)
+    print(f"📤 Worker {index + 1}/{processes} ({worker.worker_id}): {processed} envio(s) processado(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Envia as publicações enfileiradas para as redes sociais")
+    parser.add_argument("--processes", type=int, default=1, help="Número de processos (padrão: 1)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads de envio por processo (padrão: PUBLICATION_WORKER_THREADS)")
+    parser.add_argument("--drain", action="store_true", help="Encerra quando não houver jobs disponíveis")
+    parser.add_argument("--config", default=None, help="Configuração do app (development, production...)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    processes = max(args.processes, 1)
+    print(f"🚀 Iniciando {processes} worker(s) de publicação...")
+
+    if processes == 1:
+        run_worker(0, 1, args.threads, args.drain, args.config)
+        return
+
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(index, processes, args.threads, args.drain, args.config),
+            name=f"publication-worker-{index + 1}",
+        )
+        for index in range(processes)
+    ]
+    for process in workers:
+        process.start()
+
+    def stop(signum, frame):
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the children directly
+
+    for process in workers:
+        process.join()
+    print("✅ Workers encerrados.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Rebuild the full-text search index of offers
+
+The index is kept in sync automatically on offer/product writes; run this
+after restoring a backup or importing data with raw SQL.
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.search import create_search_index, is_supported, rebuild_search_index
+
+
+def rebuild():
+    """Recreate the search table (if missing) and reindex every offer"""
+
+    app = create_app()
+
+    with app.app_context():
+        if not is_supported(db.engine):
+            print(f"⚠️  Banco '{db.engine.dialect.name}' sem índice de busca nativo; a busca usa ILIKE.")
+            return
+
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+            count = rebuild_search_index(connection)
+
+        print(f"✅ Índice de busca reconstruído: {count} oferta(s) indexada(s).")
+
+
+if __name__ == '__main__':
+    rebuild()
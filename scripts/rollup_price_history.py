@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Downsample the price history of offers
+
+Rolls up the hours and days completed since the last run into hourly and
+daily buckets (min, max and last price), then deletes raw points and hourly
+buckets past PRICE_HISTORY_RAW_DAYS / PRICE_HISTORY_HOURLY_DAYS. Run it from
+cron (hourly is enough); a run only reads what changed since the previous one.
+
+Usage:
+    python scripts/rollup_price_history.py
+    python scripts/rollup_price_history.py --no-prune     # keep every raw point
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.price_history import rollup_price_history
+
+
+def rollup(prune=True):
+    """Roll up the completed hours/days and apply the retention"""
+
+    app = create_app()
+
+    with app.app_context():
+        print("📈 Agregando o histórico de preços...")
+        started = time.perf_counter()
+        result = rollup_price_history(prune=prune)
+
+        print(f"🕐 {result['hour']} agregado(s) por hora gravado(s)")
+        print(f"📅 {result['day']} agregado(s) por dia gravado(s)")
+        if prune:
+            pruned = result['pruned']
+            print(f"🗑️  {pruned['raw']} ponto(s) bruto(s) e {pruned['hour']} agregado(s) por hora "
+                  f"removido(s) pela retenção")
+        print(f"✅ Concluído em {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Agrega o histórico de preços por hora e por dia")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Não remove os pontos antigos (ignora PRICE_HISTORY_RAW_DAYS/HOURLY_DAYS)")
+    args = parser.parse_args()
+    rollup(prune=not args.no_prune)
@@ -0,0 +1,211 @@
+"""
+Streaming output for the MercadoLivre scrapers
+
+Products are appended to a JSON Lines file as soon as they are extracted, so
+memory does not grow with the catalog and a crash loses at most one batch.
+
+Every ``sync_every`` products the file is flushed and fsynced and a checkpoint
+(``<output>.checkpoint``) is written atomically with the scraper position
+(page/offset) and the size of the file at that moment. ``--resume`` reads the
+checkpoint, truncates the file to that size (dropping lines written after the
+last checkpoint, which will be scraped again) and continues from the saved
+position. The checkpoint is removed when the run completes.
+
+A page that can't be fetched (after the retries) raises PageFetchError
+instead of being skipped: the run stops with its checkpoint kept, so
+--resume fetches that page again rather than leaving a hole in the output.
+
+The JSONL file can be imported directly with import_scraper_results.py, or
+converted to JSON/CSV with export_json/export_csv (streamed as well).
+"""
+
+import csv
+import glob
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+# Products written between two fsyncs/checkpoints
+DEFAULT_SYNC_EVERY = 200
+
+
+class PageFetchError(Exception):
+    """A page or batch of products could not be fetched; the run can be resumed from it"""
+
+
+def checkpoint_path(path: str) -> str:
+    """Checkpoint file of an output file"""
+    return f"{path}.checkpoint"
+
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    """Checkpoint of an interrupted run of ``path`` (None if there is none)"""
+    try:
+        with open(checkpoint_path(path), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def find_interrupted(directory: str, prefix: str) -> Optional[str]:
+    """
+    Most recent ``<prefix><YYYYmmdd>_<HHMMSS>.jsonl`` file of ``directory``
+    that still has a checkpoint (None if every run completed)
+    """
+    pattern = re.compile(re.escape(prefix) + r'\d{8}_\d{6}\.jsonl\.checkpoint$')
+    candidates = [
+        path for path in glob.glob(os.path.join(glob.escape(directory), '*.jsonl.checkpoint'))
+        if pattern.match(os.path.basename(path))
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)[:-len('.checkpoint')]
+
+
+def _fsync_dir(path: str):
+    """Persist a rename in the directory (no-op where directories can't be opened)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JsonlSink:
+    """Append products to a JSON Lines file with batched fsync and checkpoints"""
+
+    def __init__(self, path: str, resume: bool = False, sync_every: int = DEFAULT_SYNC_EVERY):
+        """
+        Open the output file
+
+        Args:
+            path: JSON Lines file
+            resume: Continue the run recorded in the checkpoint (otherwise the
+                file is overwritten)
+            sync_every: Products written between two fsyncs/checkpoints
+        """
+        self.path = path
+        self.sync_every = max(sync_every, 1)
+        self.state = {}
+        self.written = 0
+        self._unsynced = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        checkpoint = load_checkpoint(path) if resume and os.path.exists(path) else None
+        if checkpoint:
+            self.state = checkpoint.get('state', {})
+            self.written = checkpoint.get('written', 0)
+            self._file = open(path, 'r+b')
+            # Lines after the last checkpoint are scraped again
+            self._file.truncate(checkpoint.get('size', 0))
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, 'wb')
+        self.resumed = bool(checkpoint)
+        # End of the last complete batch: what a checkpoint covers
+        self._batch_end = self._file.tell()
+        self._batch_written = self.written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(completed=exc_type is None)
+
+    def _write(self, product: Dict):
+        line = json.dumps(product, ensure_ascii=False, default=str) + '\n'
+        self._file.write(line.encode('utf-8'))
+        self.written += 1
+        self._unsynced += 1
+
+    def write_batch(self, products, **state):
+        """
+        Append the products of one page/batch and record the scraper position
+        reached after it (saved with the next checkpoint)
+        """
+        for product in products:
+            self._write(product)
+        self.state.update(state)
+        self._batch_end = self._file.tell()
+        self._batch_written = self.written
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """fsync the file and write the checkpoint (up to the last complete batch)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        checkpoint = {
+            'state': self.state,
+            'written': self._batch_written,
+            'size': self._batch_end,
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        temp_path = checkpoint_path(self.path) + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, checkpoint_path(self.path))
+        _fsync_dir(self.path)
+        self._unsynced = 0
+
+    def close(self, completed: bool = True):
+        """
+        Sync and close the file
+
+        Args:
+            completed: The run finished: the checkpoint is removed. Otherwise
+                it is kept for --resume.
+        """
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+        if completed:
+            try:
+                os.remove(checkpoint_path(self.path))
+            except FileNotFoundError:
+                pass
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Stream the products of a JSON Lines file"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_json(jsonl_path: str, json_path: str) -> int:
+    """Write the products of a JSONL file as a JSON array, one at a time"""
+    count = 0
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for product in iter_jsonl(jsonl_path):
+            f.write(',\n  ' if count else '\n  ')
+            json.dump(product, f, ensure_ascii=False)
+            count += 1
+        f.write('\n]\n' if count else ']\n')
+    return count
+
+
+def export_csv(jsonl_path: str, csv_path: str) -> int:
+    """Write the products of a JSONL file as CSV (columns of the first product)"""
+    count = 0
+    writer = None
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        for product in iter_jsonl(jsonl_path):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(product.keys()), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow(product)
+            count += 1
+    return count
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Catalog Import Test Script
+
+Checks the bulk import of scraper results on an in-memory SQLite database:
+JSON arrays, JSON Lines and CSV files are streamed and upserted into
+products, offers and sellers, a second import updates prices instead of
+duplicating rows, the search index follows the imported offers, sellers
+are created once per slug and only cached after their chunk commits, and
+the throughput stays above 10k rows/s.
+Run from the project root: python scripts/test_catalog_import.py
+"""
+
+import csv
+import io
+import json
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.catalog_import as catalog_import
+from app import create_app
+from app.catalog_import import CatalogImporter, _iter_json_array, seller_name_from_filename
+from app.extensions import db
+from app.models import Offer, Product, Seller
+from app.search import apply_search
+
+
+class Colors:
+    """ANSI color codes"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+
+def print_header(text):
+    """Print colored header"""
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{text:^60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+
+def print_test(name, passed, message=""):
+    """Print test result"""
+    status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+    print(f"  {status} - {name}")
+    if message:
+        print(f"         {message}")
+
+
+def make_app():
+    """Testing app with an empty schema"""
+    app = create_app("testing")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def scraped_products(count, price_offset=0):
+    """Records in the API scraper format"""
+    return [
+        {
+            "id": f"MLB{index}",
+            "title": f"Produto Importado {index}",
+            "price": 10 + index + price_offset,
+            "currency_id": "BRL",
+            "permalink": f"https://produto.mercadolivre.com.br/MLB-{index}",
+            "thumbnail": f"https://http2.mlstatic.com/{index}.jpg",
+            "description": "N/A" if index % 2 else f"Descrição {index}",
+        }
+        for index in range(count)
+    ]
+
+
+def test_file_formats():
+    """Test 1: JSON, JSONL and CSV Are Streamed"""
+    print_header("TEST 1: File Formats")
+    failures = 0
+
+    # JSON array split across tiny reads
+    text = json.dumps(scraped_products(5), ensure_ascii=False, indent=2)
+    records = list(_iter_json_array(io.StringIO(text), read_size=7))
+    passed = [r["id"] for r in records] == [f"MLB{i}" for i in range(5)]
+    failures += not passed
+    print_test("JSON array streamed in small reads", passed, f"{len(records)} record(s)")
+
+    passed = seller_name_from_filename("result_data/ml_loja_oficial_20251119_203045.json") == "loja_oficial"
+    failures += not passed
+    print_test("Seller taken from the file name", passed)
+
+    app = make_app()
+    with tempfile.TemporaryDirectory() as folder, app.app_context():
+        selenium_rows = [
+            {"id": "MLB900", "title": "Fone Bluetooth", "price": "R$ 1.299,90", "currency_id": "BRL",
+             "link": "https://produto.mercadolivre.com.br/MLB-900", "image": "", "condition": "new"},
+            {"id": "MLB901", "title": "", "price": "10", "link": "https://produto.mercadolivre.com.br/MLB-901"},
+        ]
+        csv_path = Path(folder) / "ml_fones_20251119_203045.csv"
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["id", "title", "price", "currency_id", "link", "image", "condition"])
+            writer.writeheader()
+            writer.writerows(selenium_rows)
+
+        jsonl_path = Path(folder) / "produtos.jsonl"
+        jsonl_path.write_text("\n".join(json.dumps(r) for r in scraped_products(3)) + "\n", encoding="utf-8")
+
+        importer = CatalogImporter()
+        importer.import_file(csv_path)
+        importer.default_seller = "Loja JSONL"
+        importer.import_file(jsonl_path)
+
+        offer = Offer.query.filter_by(offer_url="https://produto.mercadolivre.com.br/MLB-900").one()
+        passed = offer.price == Decimal("1299.90") and offer.vendor_name == "fones" and offer.seller_id
+        failures += not passed
+        print_test("CSV imported with the seller of the file", passed, f"{offer.vendor_name}: {offer.price}")
+
+        passed = importer.stats.skipped == 1 and Offer.query.count() == 4
+        failures += not passed
+        print_test("Records without title skipped", passed, str(importer.stats.as_dict()))
+
+    return failures
+
+
+def test_upsert_and_throughput():
+    """Test 2: Upsert Keyed on Slug and URL, 10k rows/s"""
+    print_header("TEST 2: Upsert and Throughput")
+    failures = 0
+    count = 20000
+
+    app = make_app()
+    with app.app_context():
+        importer = CatalogImporter(default_seller="Loja Rápida")
+        started = time.perf_counter()
+        importer.import_records(scraped_products(count))
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed
+
+        passed = Product.query.count() == count and Offer.query.count() == count and Seller.query.count() == 1
+        failures += not passed
+        print_test("Products, offers and seller created", passed,
+                   f"{Product.query.count()} products, {Offer.query.count()} offers")
+
+        passed = rate >= 10000
+        failures += not passed
+        print_test("Throughput ≥ 10k rows/s", passed, f"{rate:,.0f} rows/s ({elapsed:.2f}s, {importer.stats.chunks} chunks)")
+
+        # Admin edits are kept; prices follow the new file
+        product = Product.query.filter_by(slug="produto-importado-1").one()
+        product.name = "Nome Editado"
+        product.image_url = "/static/uploads/products/ab/cd/local.jpg"
+        db.session.commit()
+
+        CatalogImporter(default_seller="Loja Rápida").import_records(scraped_products(count, price_offset=5))
+        db.session.expire_all()
+
+        passed = Offer.query.count() == count
+        failures += not passed
+        print_test("Re-import updates instead of duplicating", passed, f"{Offer.query.count()} offers")
+
+        offer = Offer.query.filter_by(offer_url="https://produto.mercadolivre.com.br/MLB-1").one()
+        passed = offer.price == Decimal("16.00")
+        failures += not passed
+        print_test("Price updated", passed, str(offer.price))
+
+        product = db.session.get(Product, product.id)
+        passed = product.name == "Nome Editado" and product.image_url.startswith("/static/uploads/")
+        failures += not passed
+        print_test("Edited name and uploaded image kept", passed, f"{product.name} - {product.image_url}")
+
+        found = apply_search(Offer.query.join(Product), "importado 1234").all()
+        passed = any(o.offer_url.endswith("MLB-1234") for o in found)
+        failures += not passed
+        print_test("Imported offers are searchable", passed, f"{len(found)} result(s)")
+
+    return failures
+
+
+def test_sellers():
+    """Test 3: Sellers Deduplicated by Slug, Cached After Commit"""
+    print_header("TEST 3: Sellers")
+    failures = 0
+
+    app = make_app()
+    with app.app_context():
+        importer = CatalogImporter()
+        importer.import_records([
+            {"title": "Produto A", "price": 10, "permalink": "https://loja.example/a", "seller": "Loja Ágil"},
+            {"title": "Produto B", "price": 20, "permalink": "https://loja.example/b", "seller": "loja agil"},
+        ])
+        sellers = Seller.query.all()
+        seller_ids = {offer.seller_id for offer in Offer.query.all()}
+        passed = len(sellers) == 1 and seller_ids == {sellers[0].id} and importer.stats.sellers == 1
+        failures += not passed
+        print_test("Names with the same slug share one seller", passed,
+                   f"{[s.name for s in sellers]}, offer seller ids {seller_ids}")
+
+        # A chunk failing after its sellers were written rolls them back
+        importer = CatalogImporter(default_seller="Loja Revertida")
+        index_offers = catalog_import.index_offers
+        catalog_import.index_offers = lambda *args: 1 / 0
+        try:
+            importer.import_records([{"title": "Produto C", "price": 5, "permalink": "https://loja.example/c"}])
+        except ZeroDivisionError:
+            pass
+        finally:
+            catalog_import.index_offers = index_offers
+        passed = not importer._seller_ids and Seller.query.filter_by(name="Loja Revertida").first() is None
+        failures += not passed
+        print_test("Rolled back chunk leaves no cached seller id", passed, str(importer._seller_ids))
+
+        importer.import_records([{"title": "Produto C", "price": 5, "permalink": "https://loja.example/c"}])
+        seller = Seller.query.filter_by(name="Loja Revertida").first()
+        offer = Offer.query.filter_by(offer_url="https://loja.example/c").first()
+        passed = seller is not None and offer is not None and offer.seller_id == seller.id
+        failures += not passed
+        print_test("Next chunk creates the seller again", passed,
+                   f"seller {seller.id if seller else None}, offer seller {offer.seller_id if offer else None}")
+
+    return failures
+
+
+def run_all_tests():
+    """Run all catalog import tests"""
+    print(f"\n{Colors.GREEN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}")
+    print(f"{Colors.GREEN}║              CATALOG IMPORT - TEST SUITE                  ║{Colors.RESET}")
+    print(f"{Colors.GREEN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}")
+
+    failures = test_file_formats()
+    failures += test_upsert_and_throughput()
+    failures += test_sellers()
+
+    color = Colors.GREEN if not failures else Colors.RED
+    print(f"\n{color}{'='*60}{Colors.RESET}")
+    print(f"{color}{failures} failed check(s){Colors.RESET}")
+    print(f"{color}{'='*60}{Colors.RESET}\n")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_all_tests() else 0)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Crawl Sellers Test Script
+
+Checks the multi-seller crawl without network access: the shared rate limit
+serves the sellers round-robin and pauses for everybody on a 429, and the
+orchestrator stops at a checkpoint, keeps the checkpoint of a seller whose
+page failed, and --resume skips the sellers already finished while
+continuing the others where they stopped. The MercadoLivre API is replaced
+by an in-memory session.
+Run from the project root: python scripts/test_crawl_sellers.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add scripts folder to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import requests
+
+from crawl_sellers import MANIFEST_NAME, CrawlOrchestrator, FairRateLimiter
+from scraper_output import checkpoint_path, iter_jsonl
+
+
+class Colors:
+    """ANSI color codes"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+
+def print_header(text):
+    """Print colored header"""
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{text:^60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+
+def print_test(name, passed, message=""):
+    """Print test result"""
+    status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+    print(f"  {status} - {name}")
+    if message:
+        print(f"         {message}")
+
+
+class FakeResponse:
+    """The parts of requests.Response the scraper reads"""
+
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {}
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error")
+
+
+class FakeSession:
+    """
+    In-memory MercadoLivre API: ``catalog`` maps each seller to its number of
+    items; ``hooks`` maps (seller, offset) to a callable run when that search
+    page is requested (to stop the crawl or fail the page)
+    """
+
+    def __init__(self, catalog, hooks=None):
+        self.catalog = catalog
+        self.hooks = hooks or {}
+        self.searches = {seller: 0 for seller in catalog}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        params = params or {}
+        if url.endswith('/description'):
+            return FakeResponse(200, {'plain_text': 'Descrição'})
+        if 'nickname' in params:
+            return FakeResponse(200, {'results': []})
+        if '/search' not in url:
+            return FakeResponse(404, {})
+
+        seller, offset = params['seller_id'], params['offset']
+        with self._lock:
+            self.searches[seller] += 1
+        hook = self.hooks.pop((seller, offset), None)
+        if hook:
+            hook()
+        total = self.catalog[seller]
+        results = [
+            {'id': f"{seller}-{index}", 'title': f"Produto {index}", 'price': 10 + index,
+             'permalink': f"https://produto.mercadolivre.com.br/{seller}-{index}"}
+            for index in range(offset, min(offset + params['limit'], total))
+        ]
+        return FakeResponse(200, {'paging': {'total': total}, 'results': results})
+
+
+def fail_page():
+    raise requests.exceptions.ConnectionError("conexão perdida")
+
+
+def crawl(orchestrator, session):
+    """Run the orchestrator on the fake API, without its output"""
+    orchestrator.session = session
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = orchestrator.run(report=lambda *args: None)
+    return {progress.seller: progress for progress in results}
+
+
+def test_rate_limiter():
+    """Test 1: Round-Robin Tokens and Host Pause"""
+    print_header("TEST 1: Fair Rate Limiter")
+    failures = 0
+
+    limiter = FairRateLimiter(rate=20, burst=1)
+    limiter.acquire('grande')  # Empty the bucket: every request below waits its turn
+    order = []
+    order_lock = threading.Lock()
+
+    def request(seller):
+        limiter.acquire(seller)
+        with order_lock:
+            order.append(seller)
+
+    threads = [threading.Thread(target=request, args=('grande',)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while len(limiter._queues.get('grande', ())) < 4:
+        time.sleep(0.001)
+    small = [threading.Thread(target=request, args=('pequeno',)) for _ in range(2)]
+    for thread in small:
+        thread.start()
+    for thread in threads + small:
+        thread.join()
+
+    passed = order[:4] == ['grande', 'pequeno', 'grande', 'pequeno']
+    failures += not passed
+    print_test("Sellers take turns whatever their number of threads", passed, str(order))
+
+    limiter = FairRateLimiter(rate=0)
+    limiter.pause(0.3)
+    started = time.monotonic()
+    limiter.acquire('qualquer')
+    waited = time.monotonic() - started
+    passed = waited >= 0.25
+    failures += not passed
+    print_test("A pause (429) holds every seller", passed, f"waited {waited:.2f}s")
+
+    return failures
+
+
+def test_stop_and_resume():
+    """Test 2: Stop at a Checkpoint, Resume Only What Is Left"""
+    print_header("TEST 2: Stop and Resume")
+    failures = 0
+    catalog = {'loja_a': 150, 'loja_c': 100, 'loja_b': 300}
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Sellers run one at a time, in order: loja_a finishes, loja_c loses
+        # its second page and loja_b is stopped during its third page
+        first = CrawlOrchestrator(list(catalog), concurrency=1, rate=0, workers=1, result_dir=folder)
+        session = FakeSession(catalog, hooks={('loja_c', 50): fail_page, ('loja_b', 100): first.stop})
+        results = crawl(first, session)
+
+        statuses = {seller: progress.status for seller, progress in results.items()}
+        passed = statuses == {'loja_a': 'concluído', 'loja_c': 'falhou', 'loja_b': 'interrompido'}
+        failures += not passed
+        print_test("Finished, failed and stopped sellers", passed, str(statuses))
+
+        kept = [os.path.exists(checkpoint_path(results[s].output)) for s in ('loja_a', 'loja_c', 'loja_b')]
+        passed = kept == [False, True, True]
+        failures += not passed
+        print_test("Checkpoint kept for the failed and stopped sellers", passed, str(kept))
+
+        with open(os.path.join(folder, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)['sellers']
+        passed = list(manifest) == ['loja_a']
+        failures += not passed
+        print_test("Manifest records the finished seller", passed, str(list(manifest)))
+
+        # --resume: loja_a is skipped, the others continue from their checkpoint
+        second = CrawlOrchestrator(list(catalog), concurrency=1, rate=0, workers=1, result_dir=folder, resume=True)
+        session = FakeSession(catalog)
+        resumed = crawl(second, session)
+
+        passed = resumed['loja_a'].status == 'já concluído' and session.searches['loja_a'] == 0
+        failures += not passed
+        print_test("Finished seller not crawled again", passed,
+                   f"{resumed['loja_a'].status}, {session.searches['loja_a']} search request(s)")
+
+        for seller in ('loja_c', 'loja_b'):
+            ids = [product['id'] for product in iter_jsonl(resumed[seller].output)]
+            passed = (
+                resumed[seller].status == 'concluído'
+                and resumed[seller].output == results[seller].output
+                and ids == [f"{seller}-{index}" for index in range(catalog[seller])]
+                and not os.path.exists(checkpoint_path(resumed[seller].output))
+            )
+            failures += not passed
+            print_test(f"{seller} completed in the same file, no gap or repeat", passed,
+                       f"{resumed[seller].status}, {len(ids)}/{catalog[seller]} products")
+
+        # Without --resume a new crawl starts from scratch
+        fresh = CrawlOrchestrator(list(catalog), concurrency=1, rate=0, workers=1, result_dir=folder)
+        passed = fresh.manifest == {} and not CrawlOrchestrator(
+            list(catalog), result_dir=folder, resume=True).manifest
+        failures += not passed
+        print_test("A run without --resume starts a new manifest", passed)
+
+    return failures
+
+
+def run_all_tests():
+    """Run all crawl sellers tests"""
+    print(f"\n{Colors.GREEN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}")
+    print(f"{Colors.GREEN}║              CRAWL SELLERS - TEST SUITE                   ║{Colors.RESET}")
+    print(f"{Colors.GREEN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}")
+
+    failures = test_rate_limiter()
+    failures += test_stop_and_resume()
+
+    color = Colors.GREEN if not failures else Colors.RED
+    print(f"\n{color}{'='*60}{Colors.RESET}")
+    print(f"{color}{failures} failed check(s){Colors.RESET}")
+    print(f"{color}{'='*60}{Colors.RESET}\n")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_all_tests() else 0)
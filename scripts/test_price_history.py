@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Price History Test Script
+
+Checks the price history on an in-memory SQLite database: offer writes and
+bulk imports append a point only when the price changes, the rollup job
+builds hourly and daily min/max/last buckets once, the retention deletes
+only what was rolled up, series read the same at every resolution (stored
+buckets plus the data after the last rollup) and /api/offers/<id>/history
+serves them with range queries.
+Run from the project root: python scripts/test_price_history.py
+"""
+
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, select
+
+from app import create_app
+from app.catalog_import import CatalogImporter
+from app.extensions import db
+from app.models import Offer, Product, price_history, price_rollups
+from app.price_history import price_series, record_prices, rollup_price_history
+
+
+class Colors:
+    """ANSI color codes"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+
+def print_header(text):
+    """Print colored header"""
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{text:^60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+
+def print_test(name, passed, message=""):
+    """Print test result"""
+    status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+    print(f"  {status} - {name}")
+    if message:
+        print(f"         {message}")
+
+
+def make_app():
+    """Testing app with an empty schema"""
+    app = create_app("testing")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def make_offer(price="100.00", url="https://loja.example/produto"):
+    """Offer saved through the ORM"""
+    product = Product(name="Produto Histórico", slug=f"produto-{url.rsplit('/', 1)[-1]}")
+    offer = Offer(product=product, vendor_name="Loja", price=Decimal(price), offer_url=url)
+    db.session.add(offer)
+    db.session.commit()
+    return offer
+
+
+def points(offer_id):
+    """Raw points of an offer: [(ts, cents)]"""
+    return db.session.execute(
+        select(price_history.c.ts, price_history.c.price)
+        .where(price_history.c.offer_id == offer_id)
+        .order_by(price_history.c.ts)
+    ).all()
+
+
+def test_recording():
+    """Test 1: Points Appended on Price Changes Only"""
+    print_header("TEST 1: Recording")
+    failures = 0
+
+    app = make_app()
+    with app.app_context():
+        offer = make_offer("100.00")
+        passed = [price for _, price in points(offer.id)] == [10000]
+        failures += not passed
+        print_test("New offer gets its first point (in cents)", passed, str(points(offer.id)))
+
+        offer.price = Decimal("89.90")
+        db.session.commit()
+        offer.vendor_name = "Outra Loja"
+        offer.price = Decimal("89.90")
+        db.session.commit()
+        passed = [price for _, price in points(offer.id)] == [10000, 8990]
+        failures += not passed
+        print_test("Only real price changes are recorded", passed, str([price for _, price in points(offer.id)]))
+
+        # Import: one new offer, one repriced, one unchanged
+        importer = CatalogImporter(default_seller="Loja Importada")
+        records = [
+            {"title": "Importado A", "price": 10, "permalink": "https://loja.example/a"},
+            {"title": "Importado B", "price": 20, "permalink": "https://loja.example/b"},
+        ]
+        importer.import_records(records)
+        records[0]["price"] = 9.5
+        importer.import_records(records)
+        imported = Offer.query.filter_by(offer_url="https://loja.example/a").one()
+        passed = (
+            [price for _, price in points(imported.id)] == [1000, 950]
+            and importer.stats.price_changes == 3
+        )
+        failures += not passed
+        print_test("Import records new and repriced offers", passed,
+                   f"{importer.stats.price_changes} point(s), A: {[price for _, price in points(imported.id)]}")
+
+        offer_id = offer.id
+        db.session.delete(offer)
+        db.session.commit()
+        passed = not points(offer_id)
+        failures += not passed
+        print_test("Deleting the offer deletes its history", passed)
+
+    return failures
+
+
+def test_rollup_and_series():
+    """Test 2: Hourly/Daily Rollups, Retention and Series"""
+    print_header("TEST 2: Rollups and Series")
+    failures = 0
+
+    app = make_app()
+    with app.app_context():
+        offer = make_offer("50.00")
+        db.session.execute(price_history.delete())
+        day = datetime(2026, 1, 10)
+        # Day 10: 08:05 50.00, 08:40 45.00, 08:50 47.00, 14:00 60.00; day 11: 09:00 55.00
+        changes = [
+            (day + timedelta(hours=8, minutes=5), "50.00"),
+            (day + timedelta(hours=8, minutes=40), "45.00"),
+            (day + timedelta(hours=8, minutes=50), "47.00"),
+            (day + timedelta(hours=14), "60.00"),
+            (day + timedelta(days=1, hours=9), "55.00"),
+        ]
+        for ts, price in changes:
+            record_prices(db.session.connection(), [(offer.id, Decimal(price))], ts)
+        db.session.commit()
+
+        now = day + timedelta(days=1, hours=9, minutes=30)
+        result = rollup_price_history(now=now, prune=False)
+        hourly = db.session.execute(
+            select(price_rollups.c.bucket, price_rollups.c.min_price, price_rollups.c.max_price,
+                   price_rollups.c.last_price, price_rollups.c.samples)
+            .where(price_rollups.c.period == "hour").order_by(price_rollups.c.bucket)
+        ).all()
+        passed = [tuple(row) for row in hourly] == [
+            (day + timedelta(hours=8), 4500, 5000, 4700, 3),
+            (day + timedelta(hours=14), 6000, 6000, 6000, 1),
+        ]
+        failures += not passed
+        print_test("Hourly min/max/last of complete hours", passed, str([tuple(row) for row in hourly]))
+
+        daily = db.session.execute(
+            select(price_rollups.c.min_price, price_rollups.c.max_price, price_rollups.c.last_price)
+            .where(price_rollups.c.period == "day")
+        ).all()
+        passed = result["day"] == 1 and [tuple(row) for row in daily] == [(4500, 6000, 6000)]
+        failures += not passed
+        print_test("Daily bucket from the hourly ones", passed, str([tuple(row) for row in daily]))
+
+        again = rollup_price_history(now=now, prune=False)
+        passed = again["hour"] == 0 and again["day"] == 0
+        failures += not passed
+        print_test("Second run writes nothing", passed, str(again))
+
+        start, end = day, day + timedelta(days=2)
+        raw = price_series(offer.id, start, end, "raw")
+        by_hour = price_series(offer.id, start, end, "hour")
+        by_day = price_series(offer.id, start, end, "day")
+        passed = (
+            len(raw) == 5
+            and [bucket["last"] for bucket in by_hour] == [47.0, 60.0, 55.0]
+            and [(bucket["min"], bucket["last"]) for bucket in by_day] == [(45.0, 60.0), (55.0, 55.0)]
+        )
+        failures += not passed
+        print_test("Series include the data after the last rollup", passed,
+                   f"raw {len(raw)}, hour {[b['last'] for b in by_hour]}, day {[(b['min'], b['last']) for b in by_day]}")
+
+        pruned = rollup_price_history(now=now + timedelta(days=400))["pruned"]
+        remaining = db.session.scalar(select(func.count()).select_from(price_history))
+        by_day_after = price_series(offer.id, start, end, "day")
+        passed = pruned["raw"] == 5 and remaining == 0 and by_day_after == by_day
+        failures += not passed
+        print_test("Retention keeps the daily series", passed, f"{pruned}, {remaining} raw point(s) left")
+
+    return failures
+
+
+def test_api():
+    """Test 3: /api/offers/<id>/history"""
+    print_header("TEST 3: History API")
+    failures = 0
+
+    app = make_app()
+    with app.app_context():
+        offer = make_offer("10.00")
+        offer.price = Decimal("12.50")
+        db.session.commit()
+        offer_id = offer.id
+
+    client = app.test_client()
+    response = client.get(f"/api/offers/{offer_id}/history")
+    data = response.get_json()
+    passed = (
+        response.status_code == 200
+        and data["resolution"] == "hour"
+        and data["points"][-1]["last"] == 12.5
+        and data["points"][-1]["min"] == 10.0
+    )
+    failures += not passed
+    print_test("Last 30 days served hourly by default", passed, f"{response.status_code} {data}")
+
+    today = datetime.utcnow().date().isoformat()
+    response = client.get(f"/api/offers/{offer_id}/history?from={today}&resolution=raw")
+    passed = response.status_code == 200 and [p["price"] for p in response.get_json()["points"]] == [10.0, 12.5]
+    failures += not passed
+    print_test("Raw points of a range", passed, str(response.get_json()))
+
+    checks = [
+        (f"/api/offers/{offer_id}/history?resolution=minute", 400),
+        (f"/api/offers/{offer_id}/history?from=ontem", 400),
+        (f"/api/offers/{offer_id}/history?from=2026-02-01&to=2026-01-01", 400),
+        ("/api/offers/999999/history", 404),
+    ]
+    for url, status in checks:
+        response = client.get(url)
+        passed = response.status_code == status
+        failures += not passed
+        print_test(f"{url} → {status}", passed, str(response.status_code))
+
+    return failures
+
+
+def run_all_tests():
+    """Run all price history tests"""
+    print(f"\n{Colors.GREEN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}")
+    print(f"{Colors.GREEN}║              PRICE HISTORY - TEST SUITE                   ║{Colors.RESET}")
+    print(f"{Colors.GREEN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}")
+
+    failures = test_recording()
+    failures += test_rollup_and_series()
+    failures += test_api()
+
+    color = Colors.GREEN if not failures else Colors.RED
+    print(f"\n{color}{'='*60}{Colors.RESET}")
+    print(f"{color}{failures} failed check(s){Colors.RESET}")
+    print(f"{color}{'='*60}{Colors.RESET}\n")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_all_tests() else 0)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Publication Queue Test Script
+
+Checks the asynchronous publication pipeline on an in-memory SQLite database:
+the API only enqueues jobs, the worker drains a burst of publications in
+parallel within the per-network limits, failed deliveries are retried, a
+worker can't record the outcome of a job requeued away from it, the file
+adapter writes one JSON line per message, and scheduled publications are
+sent when due even with a large schedule.
+Run from the project root: python scripts/test_publication_queue.py
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Offer,
+    Product,
+    Publication,
+    PublicationJob,
+    PublicationJobStatus,
+    RoleEnum,
+    Template,
+    User,
+)
+from app.publishing import (
+    PublicationAdapter,
+    PublicationError,
+    PublicationScheduler,
+    JobResult,
+    PublicationWorker,
+    RateLimiter,
+    claim_jobs,
+    record_results,
+    register_adapter,
+    requeue_stale_jobs,
+)
+
+
+class Colors:
+    """ANSI color codes"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+
+def print_header(text):
+    """Print colored header"""
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{text:^60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+
+def print_test(name, passed, message=""):
+    """Print test result"""
+    status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+    print(f"  {status} - {name}")
+    if message:
+        print(f"         {message}")
+
+
+DELIVERY_TIME = 0.02  # Seconds per simulated network call
+
+
+class SlowAdapter(PublicationAdapter):
+    """Simulates a network round-trip and records the peak concurrency per network"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+
+    def publish(self, message):
+        with self.lock:
+            self.running[message.network] = self.running.get(message.network, 0) + 1
+            self.peak[message.network] = max(self.peak.get(message.network, 0), self.running[message.network])
+        time.sleep(DELIVERY_TIME)
+        with self.lock:
+            self.running[message.network] -= 1
+        return f"post-{message.job_id}"
+
+
+class FlakyAdapter(PublicationAdapter):
+    """Fails the first attempt of every job; 'blocked' network always refuses"""
+
+    def publish(self, message):
+        if message.network == "blocked":
+            raise PublicationError("HTTP 403", retryable=False)
+        if message.attempt == 1:
+            raise PublicationError("HTTP 503")
+        return None
+
+
+slow_adapters = []
+register_adapter("slow", lambda config: slow_adapters.append(SlowAdapter(config)) or slow_adapters[-1])
+register_adapter("flaky", FlakyAdapter)
+
+
+def make_app(**config):
+    """Testing app with an empty schema, an editor token and one offer/template"""
+    app = create_app("testing")
+    app.config.update({"PUBLICATION_POLL_INTERVAL": 0.05, "PUBLICATION_RETRY_DELAY": 0, **config})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        editor = User(email="editor@example.com", display_name="Editor", role=RoleEnum.EDITOR)
+        editor.set_password("editor")
+        offer = Offer(
+            product=Product(name="Cafeteira", slug="cafeteira"),
+            vendor_name="Loja",
+            price=Decimal("199.90"),
+            offer_url="https://example.com/cafeteira",
+            created_by=editor,
+        )
+        template = Template(name="Padrão", slug="padrao", body="{product_name} por {price}",
+                            channels="instagram,telegram")
+        db.session.add_all([editor, offer, template])
+        token = editor.issue_token()
+        db.session.commit()
+        ids = {"offer_id": offer.id, "template_id": template.id, "token": token.token}
+        db.session.remove()
+    return app, ids
+
+
+def publish(client, ids, **payload):
+    return client.post(
+        "/api/publications",
+        headers={"Authorization": f"Bearer {ids['token']}"},
+        json={"offer_id": ids["offer_id"], "template_id": ids["template_id"], **payload},
+    )
+
+
+def test_api_enqueues():
+    """Test 1: POST /api/publications returns immediately with job ids"""
+    print_header("TEST 1: API Enqueues Jobs")
+
+    app, ids = make_app()
+    client = app.test_client()
+    failures = 0
+
+    response = publish(client, ids)
+    data = response.get_json() or {}
+    passed = response.status_code == 202 and len(data.get("job_ids", [])) == 2
+    failures += not passed
+    print_test("202 with one job per template channel", passed, f"status {response.status_code}, jobs {data.get('job_ids')}")
+
+    with app.app_context():
+        jobs = PublicationJob.query.all()
+        passed = all(job.status == PublicationJobStatus.PENDING for job in jobs) and \
+            Publication.query.one().published_at is None
+        failures += not passed
+        print_test("Jobs pending, publication not yet published", passed)
+
+        captions = {job.network: job.caption for job in jobs}
+        passed = all("Cafeteira" in caption for caption in captions.values())
+        failures += not passed
+        print_test("Caption rendered per network", passed, str(captions))
+
+    response = publish(client, ids, channels=[])
+    passed = response.status_code == 400
+    failures += not passed
+    print_test("No channels rejected", passed, f"status {response.status_code}")
+
+    invalid = {
+        "channels as a string": {"channels": "telegram"},
+        "non-string channel": {"channels": ["telegram", 3]},
+        "missing offer_id": {"offer_id": None},
+        "non-integer template_id": {"template_id": "1"},
+    }
+    for name, payload in invalid.items():
+        response = publish(client, ids, **payload)
+        passed = response.status_code == 400 and "message" in (response.get_json() or {})
+        failures += not passed
+        print_test(f"Invalid input rejected: {name}", passed, f"status {response.status_code}")
+
+    app, ids = make_app(PUBLICATION_ADAPTERS="telegram=inexistente")
+    response = publish(app.test_client(), ids)
+    passed = response.status_code == 400 and "telegram" in response.get_json()["message"]
+    failures += not passed
+    print_test("Network without a known adapter rejected", passed, f"status {response.status_code}")
+    with app.app_context():
+        passed = Publication.query.count() == 0
+        failures += not passed
+        print_test("Nothing enqueued for a rejected request", passed)
+
+    return failures
+
+
+def test_burst_drains_in_parallel():
+    """Test 2: A burst of 500 publications is delivered in parallel"""
+    print_header("TEST 2: Burst of 500 Publications")
+
+    app, ids = make_app(
+        PUBLICATION_DEFAULT_ADAPTER="slow",
+        PUBLICATION_WORKER_THREADS=16,
+        PUBLICATION_NETWORK_CONCURRENCY=4,
+        PUBLICATION_NETWORK_RATE=0,
+        PUBLICATION_NETWORK_LIMITS="telegram=8",
+    )
+    client = app.test_client()
+    failures = 0
+
+    for _ in range(250):
+        publish(client, ids, caption="Oferta!")
+    serial_time = 500 * DELIVERY_TIME
+
+    started = time.perf_counter()
+    processed = PublicationWorker(app).run(drain=True)
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        done = PublicationJob.query.filter_by(status=PublicationJobStatus.DONE).count()
+        published = Publication.query.filter(Publication.published_at.isnot(None)).count()
+
+    passed = processed == done == 500 and published == 250
+    failures += not passed
+    print_test("Every job delivered", passed, f"{done} done, {published} publications published")
+
+    passed = elapsed < serial_time / 4
+    failures += not passed
+    print_test("Faster than one call at a time", passed, f"{elapsed:.2f}s (serial: {serial_time:.2f}s)")
+
+    peak = slow_adapters[-1].peak
+    passed = peak.get("instagram", 0) <= 4 and peak.get("telegram", 0) <= 8
+    failures += not passed
+    print_test("Per-network concurrency respected", passed, f"peak {peak}")
+
+    return failures
+
+
+def test_retries_and_failures():
+    """Test 3: Retryable errors are retried, permanent ones fail"""
+    print_header("TEST 3: Retries")
+
+    app, ids = make_app(PUBLICATION_DEFAULT_ADAPTER="flaky")
+    client = app.test_client()
+    failures = 0
+
+    publish(client, ids, channels=["telegram", "blocked"], caption="Oferta!")
+    PublicationWorker(app).run(drain=True)
+
+    with app.app_context():
+        jobs = {job.network: job for job in PublicationJob.query.all()}
+        telegram, blocked = jobs["telegram"], jobs["blocked"]
+
+        passed = telegram.status == PublicationJobStatus.DONE and telegram.attempts == 2
+        failures += not passed
+        print_test("Temporary error retried", passed, f"{telegram.status.value} after {telegram.attempts} attempt(s)")
+
+        passed = blocked.status == PublicationJobStatus.FAILED and blocked.attempts == 1
+        failures += not passed
+        print_test("Permanent error not retried", passed, f"{blocked.status.value}: {blocked.last_error}")
+
+    # A slow worker's job is requeued and claimed again: its late outcome is dropped
+    publish(client, ids, channels=["whatsapp"], caption="Oferta!")
+    with app.app_context():
+        slow = claim_jobs("lento", "whatsapp", 1)[0]
+        requeue_stale_jobs(timeout=-1)
+        fast = claim_jobs("rapido", "whatsapp", 1)[0]
+        lost = record_results("lento", [JobResult(slow.job_id, slow.publication_id, slow.attempt, error="timeout")])
+        job = db.session.get(PublicationJob, slow.job_id)
+        passed = lost == 1 and job.status == PublicationJobStatus.RUNNING and job.locked_by == "rapido"
+        failures += not passed
+        print_test("Outcome of a job no longer ours is dropped", passed,
+                   f"{lost} dropped, {job.status.value} by {job.locked_by}")
+
+        lost = record_results("rapido", [JobResult(fast.job_id, fast.publication_id, fast.attempt, external_id="ok")])
+        db.session.expire_all()
+        job = db.session.get(PublicationJob, fast.job_id)
+        passed = lost == 0 and job.status == PublicationJobStatus.DONE and job.locked_by is None
+        failures += not passed
+        print_test("Owner records its outcome", passed, f"{job.status.value}, attempts {job.attempts}")
+
+    return failures
+
+
+def test_file_adapter_and_rate_limit():
+    """Test 4: File adapter output and token bucket pacing"""
+    print_header("TEST 4: File Adapter and Rate Limit")
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as outbox:
+        app, ids = make_app(PUBLICATION_DEFAULT_ADAPTER="file", PUBLICATION_OUTBOX_DIR=outbox)
+        client = app.test_client()
+        for _ in range(3):
+            publish(client, ids, channels=["whatsapp"], caption="Oferta!")
+        PublicationWorker(app).run(drain=True)
+
+        lines = (Path(outbox) / "whatsapp.jsonl").read_text(encoding="utf-8").splitlines()
+        messages = [json.loads(line) for line in lines]
+        passed = len(messages) == 3 and all(m["offer_url"] == "https://example.com/cafeteira" for m in messages)
+        failures += not passed
+        print_test("One JSON line per message", passed, f"{len(messages)} line(s)")
+
+    limiter = RateLimiter(rate=50, burst=1)
+    started = time.perf_counter()
+    for _ in range(11):
+        limiter.acquire()
+    elapsed = time.perf_counter() - started
+    passed = 0.18 <= elapsed < 0.5
+    failures += not passed
+    print_test("11 calls at 50/s take ~0.2s", passed, f"{elapsed:.3f}s")
+
+    return failures
+
+
+def test_scheduled_publications():
+    """Test 5: Scheduled publications wait, then go out on time"""
+    print_header("TEST 5: Scheduled Publications")
+
+    # Long poll interval: only the scheduler can wake the worker on time
+    app, ids = make_app(PUBLICATION_DEFAULT_ADAPTER="slow", PUBLICATION_POLL_INTERVAL=5)
+    client = app.test_client()
+    failures = 0
+
+    due_at = datetime.utcnow() + timedelta(seconds=1)
+    response = publish(client, ids, channels=["telegram"], caption="Oferta!",
+                       scheduled_for=due_at.isoformat() + "Z")
+    passed = response.status_code == 202 and response.get_json()["jobs"][0]["status"] == "scheduled"
+    failures += not passed
+    print_test("Future publication queued as scheduled", passed, f"status {response.status_code}")
+
+    with app.app_context():
+        # 20,000 posts further in the future
+        publication_id = Publication.query.one().id
+        later = datetime.utcnow() + timedelta(days=1)
+        db.session.execute(insert(PublicationJob), [
+            {
+                "publication_id": publication_id,
+                "network": "telegram",
+                "caption": "Depois",
+                "status": PublicationJobStatus.SCHEDULED,
+                "attempts": 0,
+                "available_at": later + timedelta(seconds=index),
+            }
+            for index in range(20000)
+        ])
+        # Due one second after the (slow) insert, not after the request
+        due_at = datetime.utcnow() + timedelta(seconds=1)
+        PublicationJob.query.filter_by(caption="Oferta!").update({"available_at": due_at})
+        db.session.commit()
+
+        started = time.perf_counter()
+        until_due = PublicationScheduler().tick()
+        elapsed = time.perf_counter() - started
+        passed = until_due is not None and 0 < until_due <= 1 and elapsed < 0.05
+        failures += not passed
+        print_test("Next due time found with 20,000 scheduled", passed,
+                   f"due in {until_due:.2f}s, tick took {elapsed * 1000:.1f}ms")
+        db.session.remove()
+
+    worker = PublicationWorker(app)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    time.sleep(2)
+    worker.stop()
+    thread.join()
+
+    with app.app_context():
+        job = PublicationJob.query.filter_by(caption="Oferta!").one()
+        waiting = PublicationJob.query.filter_by(status=PublicationJobStatus.SCHEDULED).count()
+        delay = (job.finished_at - due_at).total_seconds() if job.finished_at else None
+        passed = job.status == PublicationJobStatus.DONE and delay is not None and 0 <= delay < 0.5
+        failures += not passed
+        print_test("Sent when due", passed, f"{job.status.value}, {delay}s after scheduled time")
+
+        passed = waiting == 20000
+        failures += not passed
+        print_test("Future posts left scheduled", passed, f"{waiting} still scheduled")
+
+    return failures
+
+
+def run_all_tests():
+    """Run all publication queue tests"""
+    print(f"\n{Colors.GREEN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}")
+    print(f"{Colors.GREEN}║            PUBLICATION QUEUE - TEST SUITE                 ║{Colors.RESET}")
+    print(f"{Colors.GREEN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}")
+
+    failures = test_api_enqueues()
+    failures += test_burst_drains_in_parallel()
+    failures += test_retries_and_failures()
+    failures += test_file_adapter_and_rate_limit()
+    failures += test_scheduled_publications()
+
+    color = Colors.GREEN if not failures else Colors.RED
+    print(f"\n{color}{'='*60}{Colors.RESET}")
+    print(f"{color}{failures} failed check(s){Colors.RESET}")
+    print(f"{color}{'='*60}{Colors.RESET}\n")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_all_tests() else 0)
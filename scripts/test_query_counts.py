@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Query Count Test Script for API List Endpoints
+
+Checks that every list endpoint (and the batch caption endpoint) serializes
+its rows in a constant number of SQL queries (no N+1), by comparing the query
+count for a small and a large dataset on an in-memory SQLite database.
+Run from the project root: python scripts/test_query_counts.py
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Coupon,
+    Namespace,
+    NamespaceScope,
+    Offer,
+    Product,
+    Publication,
+    RoleEnum,
+    Seller,
+    SocialNetworkConfig,
+    Template,
+    User,
+    Wishlist,
+)
+
+
+class Colors:
+    """ANSI color codes"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+
+def print_header(text):
+    """Print colored header"""
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{text:^60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+
+def print_test(name, passed, message=""):
+    """Print test result"""
+    status = f"{Colors.GREEN}✓ PASS{Colors.RESET}" if passed else f"{Colors.RED}✗ FAIL{Colors.RESET}"
+    print(f"  {status} - {name}")
+    if message:
+        print(f"         {message}")
+
+
+# (endpoint, needs admin token)
+LIST_ENDPOINTS = [
+    ("/api/offers?limit=200", False),
+    ("/api/users", True),
+    ("/api/wishlists", True),
+    ("/api/templates", False),
+    ("/api/namespaces", False),
+    ("/api/publications", True),
+    ("/", False),  # home page statistics
+]
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed(size):
+    """Create `size` rows for each listed model and return an admin token"""
+    db.drop_all()
+    db.create_all()
+
+    admin = User(email="admin@example.com", display_name="Admin", role=RoleEnum.ADMIN)
+    admin.set_password("admin")
+    db.session.add(admin)
+
+    seller = Seller(name="Loja", slug="loja")
+    networks = [SocialNetworkConfig(network=name) for name in ("instagram", "whatsapp")]
+    db.session.add(seller)
+    db.session.add(Coupon(seller=seller, code="LOJA10", discount_type="percentage", discount_value=10))
+    db.session.add_all(networks)
+
+    for index in range(size):
+        product = Product(name=f"Produto {index}", slug=f"produto-{index}")
+        offer = Offer(
+            product=product,
+            vendor_name="Loja",
+            price=Decimal("10.00") + index,
+            seller=seller,
+            created_by=admin,
+        )
+        template = Template(name=f"Template {index}", slug=f"template-{index}", body="{product_name}")
+        template.social_networks = networks
+        user = User(email=f"user{index}@example.com", display_name=f"User {index}")
+        user.set_password("secret")
+        db.session.add_all([
+            offer,
+            template,
+            user,
+            Wishlist(owner=user, name=f"Lista {index}"),
+            Namespace(name=f"ns_{index}", label=f"NS {index}", scope=NamespaceScope.OFFER),
+            Publication(offer=offer, template=template, caption="Legenda"),
+        ])
+
+    token = admin.issue_token()
+    db.session.commit()
+    return token.token
+
+
+def measure(client, token, url, needs_auth, json=None):
+    """Return (status_code, number_of_queries) for a GET (or POST with `json`) request"""
+    headers = {"Authorization": f"Bearer {token}"} if needs_auth else {}
+    db.session.expunge_all()
+    with count_queries() as statements:
+        if json is None:
+            response = client.get(url, headers=headers)
+        else:
+            response = client.post(url, headers=headers, json=json)
+    return response.status_code, len(statements)
+
+
+def test_list_endpoints_constant_queries():
+    """Test 1: List endpoints issue a constant number of queries"""
+    print_header("TEST 1: Constant Query Count per List Endpoint")
+
+    app = create_app("testing")
+    client = app.test_client()
+    failures = 0
+
+    with app.app_context():
+        results = {}
+        for size in (3, 30):
+            token = seed(size)
+            for url, needs_auth in LIST_ENDPOINTS:
+                results.setdefault(url, []).append(measure(client, token, url, needs_auth))
+
+        for url, ((small_status, small), (large_status, large)) in results.items():
+            passed = small_status == large_status == 200 and small == large
+            failures += not passed
+            print_test(url, passed, f"{small} queries for 3 rows, {large} queries for 30 rows")
+
+        db.drop_all()
+
+    return failures
+
+
+def caption_payload():
+    """Batch caption request for every offer on four networks"""
+    return {
+        "template_id": Template.query.first().id,
+        "offer_ids": [offer.id for offer in Offer.query.all()],
+        "networks": ["instagram", "whatsapp", "telegram", "facebook"],
+    }
+
+
+def test_batch_captions_constant_queries():
+    """Test 2: Batch caption rendering issues a constant number of queries"""
+    print_header("TEST 2: Batch Caption Rendering")
+
+    app = create_app("testing")
+    client = app.test_client()
+    failures = 0
+
+    with app.app_context():
+        results = []
+        for size in (3, 30):
+            token = seed(size)
+            results.append(measure(client, token, "/api/captions/render", True, caption_payload()))
+
+        (small_status, small), (large_status, large) = results
+        passed = small_status == large_status == 200 and small == large
+        failures += not passed
+        print_test("/api/captions/render", passed, f"{small} queries for 3 offers, {large} queries for 30 offers")
+
+        token = seed(250)
+        payload = caption_payload()
+        started = time.perf_counter()
+        response = client.post("/api/captions/render", headers={"Authorization": f"Bearer {token}"}, json=payload)
+        elapsed = time.perf_counter() - started
+        count = len(response.get_json()["captions"]) if response.status_code == 200 else 0
+        passed = count == 1000
+        failures += not passed
+        print_test("1000 captions in one request", passed, f"{count} captions in {elapsed:.3f}s")
+
+        db.drop_all()
+
+    return failures
+
+
+def run_all_tests():
+    """Run all query count tests"""
+    print(f"\n{Colors.GREEN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}")
+    print(f"{Colors.GREEN}║         API LIST ENDPOINTS - QUERY COUNT SUITE            ║{Colors.RESET}")
+    print(f"{Colors.GREEN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}")
+
+    failures = test_list_endpoints_constant_queries()
+    failures += test_batch_captions_constant_queries()
+
+    color = Colors.GREEN if not failures else Colors.RED
+    print(f"\n{color}{'='*60}{Colors.RESET}")
+    print(f"{color}{failures} endpoint(s) with N+1 queries{Colors.RESET}")
+    print(f"{color}{'='*60}{Colors.RESET}\n")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_all_tests() else 0)
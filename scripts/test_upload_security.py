@@ -8,19 +8,31 @@ Run from the project root: python scripts/test_upload_security.py
 
 import io
 import os
+import shutil
 import sys
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from werkzeug.datastructures import FileStorage
+
+from app.utils import upload
 from app.utils.upload import (
     allowed_file,
     validate_image_content,
     validate_image_with_pil,
     generate_secure_filename,
+    create_image_variants,
+    build_srcset,
+    delete_image,
+    save_image,
+    save_product_image,
     ALLOWED_EXTENSIONS,
-    MAX_FILE_SIZE
+    COPY_CHUNK_SIZE,
+    IMAGE_VARIANTS,
+    MAX_FILE_SIZE,
+    MAX_IMAGE_PIXELS,
 )
 
 
@@ -233,7 +245,11 @@ def test_upload_module():
             'validate_image_with_pil',
             'generate_secure_filename',
             'save_image',
+            'save_product_image',
+            'load_image',
             'delete_image',
+            'create_image_variants',
+            'image_reference_count',
         ]
         
         for func_name in required_funcs:
@@ -244,6 +260,259 @@ def test_upload_module():
         print_test("Upload module imports", False, str(e))
 
 
+def test_image_variants():
+    """Test 9: Resized WebP/JPEG Variants"""
+    print_header("TEST 9: Image Variants")
+    
+    from PIL import Image
+    
+    folder = Path('app/static/uploads/test_variants')
+    folder.mkdir(parents=True, exist_ok=True)
+    try:
+        # Large photo-like PNG with transparency
+        original = folder / 'original.png'
+        image = Image.effect_noise((2000, 1500), 64).convert('RGBA')
+        image.putpixel((0, 0), (0, 0, 0, 0))
+        image.save(original)
+        
+        variants = create_image_variants('/static/uploads/test_variants/original.png')
+        print_test("Variants generated", variants is not None)
+        if not variants:
+            return
+        
+        for name, box in IMAGE_VARIANTS.items():
+            entry = variants[name]
+            fits = entry['width'] <= box[0] and entry['height'] <= box[1]
+            files = all(Path('app/' + entry[key].lstrip('/')).is_file() for key in ('webp', 'jpeg'))
+            print_test(f"'{name}' fits {box[0]}x{box[1]}", fits and files,
+                       f"{entry['width']}x{entry['height']}")
+        
+        card_bytes = Path('app/' + variants['card']['webp'].lstrip('/')).stat().st_size
+        original_bytes = original.stat().st_size
+        print_test("Card WebP ≥10x smaller than original", card_bytes * 10 <= original_bytes,
+                   f"{card_bytes} bytes vs {original_bytes} bytes")
+        
+        srcset = build_srcset(variants, 'webp')
+        print_test("srcset lists every width", srcset.count('w,') == len(IMAGE_VARIANTS) - 1, srcset)
+        
+        # Small images are not upscaled and give one srcset candidate
+        small = folder / 'small.jpg'
+        Image.new('RGB', (100, 80), (200, 30, 30)).save(small)
+        small_variants = create_image_variants('/static/uploads/test_variants/small.jpg')
+        not_upscaled = all(entry['width'] == 100 for entry in small_variants.values())
+        print_test("Small image not upscaled", not_upscaled and ',' not in build_srcset(small_variants))
+        
+        delete_image('/static/uploads/test_variants/original.png', grace_period=0)
+        leftovers = [path.name for path in folder.glob('original*')]
+        print_test("delete_image removes variants", not leftovers, ', '.join(leftovers))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO that records how many bytes were read"""
+    
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+    
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def test_single_decode_validation():
+    """Test 10: Streaming Size Limit, Bomb Limit and Single Decode"""
+    print_header("TEST 10: Single-Decode Validation")
+    
+    from PIL import Image
+    
+    subfolder = 'test_validation'
+    folder = Path(upload.UPLOAD_ROOT) / subfolder
+    try:
+        # Oversized body: rejected after reading just past the limit
+        stream = CountingStream(b'\xff' * (MAX_FILE_SIZE * 2))
+        success, _, error = save_image(FileStorage(stream=stream, filename='big.jpg'), subfolder)
+        stopped_early = stream.bytes_read <= MAX_FILE_SIZE + COPY_CHUNK_SIZE
+        print_test("Oversized upload rejected while streaming", not success and stopped_early,
+                   f"{stream.bytes_read:,} of {MAX_FILE_SIZE * 2:,} bytes read - {error}")
+        
+        # Decompression bomb: tiny file, huge dimensions
+        bomb = io.BytesIO()
+        Image.new('1', (10000, 10000)).save(bomb, 'PNG')
+        success, _, error = save_image(FileStorage(stream=io.BytesIO(bomb.getvalue()), filename='bomb.png'), subfolder)
+        print_test("Decompression bomb rejected", not success,
+                   f"{len(bomb.getvalue()):,} bytes, {10000 * 10000:,} px > {MAX_IMAGE_PIXELS:,} px - {error}")
+        
+        # Truncated image
+        photo = io.BytesIO()
+        Image.effect_noise((400, 300), 64).convert('RGB').save(photo, 'JPEG')
+        truncated = photo.getvalue()[:len(photo.getvalue()) // 2]
+        success, _, error = save_image(FileStorage(stream=io.BytesIO(truncated), filename='cut.jpg'), subfolder)
+        print_test("Truncated image rejected", not success, error)
+        
+        # Valid upload: one Image.open for validation and variants
+        opens = []
+        original_open = upload.Image.open
+        
+        def counting_open(*args, **kwargs):
+            opens.append(args[0])
+            return original_open(*args, **kwargs)
+        
+        upload.Image.open = counting_open
+        try:
+            success, path, variants, error = save_product_image(
+                FileStorage(stream=io.BytesIO(photo.getvalue()), filename='photo.png'), subfolder
+            )
+        finally:
+            upload.Image.open = original_open
+        print_test("Valid image saved with variants", success and bool(variants), error or path)
+        print_test("Decoded only once", len(opens) == 1, f"Image.open called {len(opens)} time(s)")
+        print_test("Extension follows detected format", bool(path) and path.endswith('.jpg'), path)
+        print_test("No temporary files left", not list(folder.glob('.upload-*')))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def test_content_addressed_storage():
+    """Test 11: Deduplicated Content-Addressed Storage"""
+    print_header("TEST 11: Content-Addressed Storage")
+    
+    import hashlib
+    from PIL import Image
+    
+    from app import create_app
+    from app.extensions import db
+    from app.models import Product
+    
+    subfolder = 'test_dedupe'
+    folder = Path(upload.UPLOAD_ROOT) / subfolder
+    app = create_app('testing')
+    try:
+        with app.app_context():
+            db.create_all()
+            
+            photo = io.BytesIO()
+            Image.effect_noise((800, 600), 64).convert('RGB').save(photo, 'JPEG')
+            data = photo.getvalue()
+            digest = hashlib.sha256(data).hexdigest()
+            
+            success, path, variants, error = save_product_image(
+                FileStorage(stream=io.BytesIO(data), filename='first.jpg'), subfolder
+            )
+            expected = f"/static/uploads/{subfolder}/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+            print_test("Stored under its SHA-256", success and path == expected, error or path)
+            
+            first = Product(name='Primeiro', slug='dedupe-primeiro', image_url=path, image_variants=variants)
+            db.session.add(first)
+            db.session.commit()
+            
+            # Same bytes again: no decode, no resize, no new file
+            opens = []
+            original_open = upload.Image.open
+            
+            def counting_open(*args, **kwargs):
+                opens.append(args[0])
+                return original_open(*args, **kwargs)
+            
+            upload.Image.open = counting_open
+            try:
+                success, second_path, second_variants, error = save_product_image(
+                    FileStorage(stream=io.BytesIO(data), filename='copy.png'), subfolder
+                )
+            finally:
+                upload.Image.open = original_open
+            print_test("Duplicate reuses the stored file", success and second_path == path, second_path)
+            print_test("Duplicate reuses the variants", second_variants == variants and not opens,
+                       f"Image.open called {len(opens)} time(s)")
+            
+            stored = [p for p in folder.rglob('*') if p.is_file()]
+            print_test("One original on disk", len([p for p in stored if p.stem == digest]) == 1,
+                       f"{len(stored)} file(s) including variants")
+            
+            second = Product(name='Segundo', slug='dedupe-segundo', image_url=path, image_variants=variants)
+            db.session.add(second)
+            db.session.commit()
+            
+            # Last reference decides
+            first.image_url = None
+            kept = not delete_image(path) and upload._web_to_fs_path(path).is_file()
+            print_test("Kept while another product uses it", kept)
+            
+            # Unreferenced, but just reused by an upload whose product may not be committed yet
+            second.image_url = None
+            kept = not delete_image(path) and upload._web_to_fs_path(path).is_file()
+            print_test("Recently reused image left to the collector", kept)
+            
+            deleted = delete_image(path, grace_period=0) and not upload._web_to_fs_path(path).exists()
+            leftovers = [p.name for p in folder.rglob(f'{digest}*')]
+            print_test("Deleted with its variants after the last reference", deleted and not leftovers,
+                       ', '.join(leftovers))
+            
+            db.session.rollback()
+            db.drop_all()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def test_orphan_collector():
+    """Test 12: Orphaned Image Garbage Collector"""
+    print_header("TEST 12: Orphan Collector")
+    
+    from PIL import Image
+    
+    from app import create_app
+    from app.extensions import db
+    from app.models import Product
+    from app.utils.upload import collect_orphan_images
+    
+    subfolder = 'test_gc'
+    folder = Path(upload.UPLOAD_ROOT) / subfolder
+    app = create_app('testing')
+    try:
+        with app.app_context():
+            db.create_all()
+            
+            paths = []
+            for color in ('red', 'green', 'blue'):
+                data = io.BytesIO()
+                Image.new('RGB', (300, 200), color).save(data, 'PNG')
+                success, path, variants, error = save_product_image(
+                    FileStorage(stream=io.BytesIO(data.getvalue()), filename=f'{color}.png'), subfolder
+                )
+                paths.append(path)
+            
+            # Only the first image is used by a product
+            db.session.add(Product(name='Usada', slug='gc-usada', image_url=paths[0]))
+            db.session.commit()
+            (folder / '.upload-abandoned.tmp').write_bytes(b'partial')
+            
+            stats = collect_orphan_images(subfolder, grace_period=3600)
+            print_test("Recent orphans kept during grace period", stats['deleted'] == 0 and stats['recent'] > 0,
+                       f"{stats['recent']} recent orphan file(s)")
+            
+            stats = collect_orphan_images(subfolder, grace_period=0, dry_run=True)
+            exists = all(upload._web_to_fs_path(path).is_file() for path in paths)
+            print_test("Dry run deletes nothing", exists and stats['deleted'] > 0,
+                       f"{stats['deleted']} file(s), {stats['reclaimed_bytes']:,} bytes")
+            
+            stats = collect_orphan_images(subfolder, grace_period=0)
+            orphans_gone = not any(upload._web_to_fs_path(path).exists() for path in paths[1:])
+            print_test("Orphans and their variants deleted", orphans_gone and stats['reclaimed_bytes'] > 0,
+                       f"{stats['deleted']} file(s), {stats['reclaimed_bytes']:,} bytes reclaimed")
+            
+            referenced = [p for p in folder.rglob('*') if p.is_file()]
+            print_test("Referenced image and variants kept",
+                       upload._web_to_fs_path(paths[0]).is_file() and len(referenced) == 1 + len(upload.variant_paths(paths[0])),
+                       f"{len(referenced)} file(s) left")
+            print_test("Abandoned temporary upload deleted", not (folder / '.upload-abandoned.tmp').exists())
+            
+            db.drop_all()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
 def run_all_tests():
     """Run all security tests"""
     print(f"\n{Colors.GREEN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}")
@@ -258,6 +527,10 @@ def run_all_tests():
     test_allowed_extensions()
     test_directory_structure()
     test_permissions()
+    test_image_variants()
+    test_single_decode_validation()
+    test_content_addressed_storage()
+    test_orphan_collector()
     
     print(f"\n{Colors.GREEN}{'='*60}{Colors.RESET}")
     print(f"{Colors.GREEN}All security tests completed!{Colors.RESET}")